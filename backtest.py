@@ -0,0 +1,389 @@
+import argparse
+import csv
+import glob
+import json
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from match_record import as_records
+from odds_analytics import BOOKS, DOUBLE_CHANCE, factorize
+
+# Marchés à sélection texte : (clé de la sélection, clé de la cote)
+TEXT_MARKETS = {
+    'correct_score': ('score', 'odds'),
+    'ht_ft_tips': ('1', 'X'),
+    'goalscorer': ('1', 'X'),
+}
+# Marchés sur ligne et colonne du fichier de résultats qui les règle
+LINE_MARKETS = {'goals': None, 'corners': 'corners', 'cards': 'cards'}
+OUTCOME_CODES = {'1': 0, 'X': 1, '2': 2}
+SCORE_RE = re.compile(r'^\s*(\d+)\s*[:\-]\s*(\d+)\s*$')
+CALIBRATION_BINS = np.linspace(0.0, 1.0, 11)
+# Colonnes numériques du fichier de résultats (les autres sont optionnelles)
+RESULT_COLUMNS = ('home_goals', 'away_goals', 'ht_home_goals', 'ht_away_goals', 'corners', 'cards')
+
+# (pris le, coup d'envoi, ligue, domicile, extérieur, marché, clés, valeurs)
+Prediction = Tuple[str, Optional[datetime], str, str, str, str, Tuple[str, ...], Tuple[Any, ...]]
+
+
+def team_key(home: str, away: str = '') -> str:
+    """Équipes normalisées (minuscules, lettres et chiffres) pour la jointure"""
+    return re.sub(r'[^0-9a-z]', '', (home + away).lower())
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class Results:
+    """Scores finaux, en colonnes NumPy indexées par (date, équipes).
+
+    Le fichier (CSV ou JSON) contient une ligne par match avec `date`,
+    `home_team`, `away_team`, `home_goals`, `away_goals` et, si disponibles,
+    `ht_home_goals`, `ht_away_goals`, `corners`, `cards` et `scorers`
+    (buteurs séparés par des `;`).
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.index: Dict[str, int] = {}
+        columns = {name: [] for name in RESULT_COLUMNS}
+        self.scorers: List[set] = []
+        for row in rows:
+            key = f"{str(row['date'])[:10]}|{team_key(row['home_team'], row['away_team'])}"
+            self.index[key] = len(self.scorers)
+            for name in RESULT_COLUMNS:
+                columns[name].append(_number(row.get(name)))
+            scorers = row.get('scorers') or []
+            if isinstance(scorers, str):
+                scorers = scorers.split(';')
+            self.scorers.append({name.strip().lower() for name in scorers if name.strip()})
+        for name in RESULT_COLUMNS:
+            setattr(self, name, np.array(columns[name], dtype=float))
+
+    def __len__(self) -> int:
+        return len(self.scorers)
+
+    @classmethod
+    def load(cls, path: str) -> 'Results':
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            if path.endswith('.csv'):
+                return cls(list(csv.DictReader(f)))
+            data = json.load(f)
+        return cls(data['results'] if isinstance(data, dict) else data)
+
+    def lookup(self, keys: Iterable[str]) -> np.ndarray:
+        """Ligne du résultat de chaque clé, -1 si le match n'a pas de résultat"""
+        return np.array([self.index.get(key, -1) for key in keys], dtype=np.intp)
+
+
+def snapshot_predictions(snapshots: Iterable[Dict[str, Any]]) -> Iterator[Prediction]:
+    """Prédictions de snapshots au format de `prepare_data` / des fichiers JSON"""
+    for data in snapshots:
+        taken_at = data['metadata']['timestamp']
+        for record in as_records(data['matches'], datetime.fromisoformat(taken_at)):
+            yield (taken_at, record.kickoff, record.league, record.home_team, record.away_team,
+                   record.prediction_type, record.odds_keys, record.odds_values)
+
+
+def history_predictions(store, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Prediction]:
+    """Prédictions de l'historique SQLite, regroupées par snapshot, match et marché"""
+    books: Dict[tuple, Tuple[List[str], List[Any]]] = {}
+    for taken_at, kickoff, league, home, away, market, selection, price, value in store.scan(start, end):
+        keys, values = books.setdefault((taken_at, kickoff, league, home, away or '', market), ([], []))
+        keys.append(selection)
+        values.append(price if price is not None else value)
+    for (taken_at, kickoff, league, home, away, market), (keys, values) in books.items():
+        yield (taken_at, datetime.fromisoformat(kickoff) if kickoff else None, league, home, away,
+               market, tuple(keys), tuple(values))
+
+
+class Backtest:
+    """Prédictions jointes aux résultats et réglées en colonnes NumPy.
+
+    Pour chaque match et marché, seule la dernière prédiction prise avant
+    le coup d'envoi est retenue, et la sélection jouée est la plus courte
+    cote du marché (ou la sélection affichée pour les scores exacts,
+    mi-temps/fin de match et buteurs). Mise unitaire ; un draw no bet sur
+    un nul ou une ligne entière atteinte est remboursé.
+    """
+
+    def __init__(self, predictions: Iterable[Prediction], results: Results):
+        predictions = list(predictions)
+        count = len(predictions)
+        taken, kickoffs, leagues, homes, aways, markets, keys, values = list(zip(*predictions)) or [()] * 8
+
+        # Clés de jointure (jour|équipes) calculées une fois par coup d'envoi et par paire d'équipes
+        kickoff_list, kickoff = factorize(kickoffs, count)
+        kickoff_iso = np.array([k.isoformat() if k else '' for k in kickoff_list] or [''], dtype=str)
+        days, kickoff_day = factorize((k.date().isoformat() if k else '' for k in kickoff_list), len(kickoff_list))
+        pairs, pair = factorize(zip(homes, aways), count)
+        teams, pair_teams = factorize((team_key(home, away) for home, away in pairs), len(pairs))
+        joined, match = np.unique(kickoff_day[kickoff] * max(len(teams), 1) + pair_teams[pair], return_inverse=True)
+        match = match.reshape(-1)
+
+        # Prédictions prises avant le coup d'envoi ; par match et marché, la dernière (à égalité, la dernière lue)
+        taken_list, taken_code = factorize(taken, count)
+        taken_iso = np.array(taken_list or [''], dtype=str)
+        has_kickoff = np.array([k is not None for k in kickoff_list] or [False], dtype=bool)[kickoff]
+        valid = np.flatnonzero(has_kickoff & (taken_iso[taken_code] <= kickoff_iso[kickoff]))
+        taken_rank = np.argsort(np.argsort(taken_iso, kind='stable'), kind='stable')
+        order = valid[np.lexsort((valid, taken_rank[taken_code[valid]]))]
+        market_list, market = factorize(markets, count)
+        book = match * max(len(market_list), 1) + market
+        books, slot = np.unique(book[order], return_inverse=True)
+        slot = slot.reshape(-1)
+        kept = np.zeros(len(books), dtype=np.intp)
+        kept[slot] = order
+        # Ordre de première apparition, comme l'ancien dictionnaire : les sommes restent identiques
+        first = np.zeros(len(books), dtype=np.intp)
+        first[slot[::-1]] = np.arange(len(order))[::-1]
+        kept = kept[np.argsort(first, kind='stable')]
+
+        league_list, league = factorize(leagues, count)
+        self.markets: List[str] = sorted({market_list[code] for code in np.unique(market[kept])})
+        self.leagues: List[str] = sorted({league_list[code] for code in np.unique(league[kept])})
+        market_rank = np.array([self.markets.index(m) if m in self.markets else -1 for m in market_list] or [-1])
+        league_rank = np.array([self.leagues.index(l) if l in self.leagues else -1 for l in league_list] or [-1])
+        self.market = market_rank[market[kept]].astype(np.intp)
+        self.league = league_rank[league[kept]].astype(np.intp)
+        size = len(kept)
+
+        # Une ligne par cote des prédictions retenues, rattachée à sa prédiction (`owner`)
+        lengths = np.fromiter((len(keys[i]) for i in kept), dtype=np.intp, count=size)
+        owner = np.repeat(np.arange(size), lengths)
+        total = int(lengths.sum())
+        selection_list, selection = factorize((key for i in kept for key in keys[i]), total)
+        flat_values = [value for i in kept for value in values[i]]
+        numeric = np.fromiter((value if isinstance(value, float) else np.nan for value in flat_values),
+                              dtype=float, count=total)
+
+        # Rôle de chaque (marché, sélection) : colonne du livre, ligne, sélection texte ou cote texte
+        column = np.full((max(len(self.markets), 1), max(len(selection_list), 1)), -1, dtype=np.intp)
+        LINE, PICK, PRICE = 3, 4, 5
+        for m, name in enumerate(self.markets):
+            for j, key in enumerate(BOOKS.get(name, ((), 0))[0]):
+                if key in selection_list:
+                    column[m, selection_list.index(key)] = j
+            if name in BOOKS and 'line' in selection_list:
+                column[m, selection_list.index('line')] = LINE
+            if name in TEXT_MARKETS:
+                pick_key, price_key = TEXT_MARKETS[name]
+                if price_key in selection_list:
+                    column[m, selection_list.index(price_key)] = PRICE
+                if pick_key in selection_list:
+                    column[m, selection_list.index(pick_key)] = PICK
+        role = column[self.market[owner], selection] if total else np.zeros(0, dtype=np.intp)
+
+        prices = np.full((size, 3), np.nan)
+        rows = np.flatnonzero(role < LINE)
+        rows = rows[role[rows] >= 0]
+        prices[owner[rows], role[rows]] = numeric[rows]
+        self.line = np.full(size, np.nan)
+        rows = np.flatnonzero(role == LINE)
+        self.line[owner[rows]] = numeric[rows]
+        self.text_price = np.full(size, np.nan)
+        rows = np.flatnonzero(role == PRICE)
+        self.text_price[owner[rows]] = numeric[rows]
+
+        # Sélections texte décodées une fois par valeur distincte : score exact, mi-temps/fin de match, buteur
+        rows = np.flatnonzero(role == PICK)
+        picks, pick = factorize((str(flat_values[r] or '') for r in rows), len(rows))
+        scores = np.full((len(picks) + 1, 2), np.nan)
+        outcomes = np.full((len(picks) + 1, 2), -1, dtype=np.intp)
+        for code, text in enumerate(picks):
+            score = SCORE_RE.match(text)
+            if score:
+                scores[code] = score.groups()
+            halves = text.split('/')
+            if len(halves) == 2 and all(half in OUTCOME_CODES for half in halves):
+                outcomes[code] = [OUTCOME_CODES[half] for half in halves]
+        pick_of = np.full(size, len(picks), dtype=np.intp)
+        pick_of[owner[rows]] = pick
+        self.pick_scores = scores[pick_of]
+        self.pick_outcomes = outcomes[pick_of]
+        self.pick_names = np.array([text.strip().lower() for text in picks] + [''], dtype=str)[pick_of]
+
+        matches = np.array([f"{days[code // max(len(teams), 1)]}|{teams[code % max(len(teams), 1)]}"
+                            for code in joined] or [''], dtype=str)
+        self.result = results.lookup(matches)[match[kept]] if size else np.zeros(0, dtype=np.intp)
+        self.results = results
+
+        # Sélection jouée : plus courte cote du livre, sinon la sélection texte
+        self.pick = np.where(np.isnan(prices), np.inf, prices).argmin(axis=1)
+        self.price = np.where(np.isnan(self.text_price), prices[np.arange(size), self.pick], self.text_price)
+
+    def __len__(self) -> int:
+        return len(self.market)
+
+    def _is(self, market: str) -> np.ndarray:
+        return self.market == self.markets.index(market) if market in self.markets else np.zeros(len(self), bool)
+
+    def settle(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(réglé, gagné, remboursé) de chaque prédiction"""
+        found = self.result >= 0
+        row = np.where(found, self.result, 0)
+
+        def column(name: str) -> np.ndarray:
+            values = getattr(self.results, name)
+            return np.where(found, values[row], np.nan) if len(values) else np.full(len(self), np.nan)
+
+        home, away = column('home_goals'), column('away_goals')
+        ht_home, ht_away = column('ht_home_goals'), column('ht_away_goals')
+        full_time = np.where(home > away, 0, np.where(home == away, 1, 2))
+        half_time = np.where(ht_home > ht_away, 0, np.where(ht_home == ht_away, 1, 2))
+        scored = ~np.isnan(home) & ~np.isnan(away)
+
+        settled = np.zeros(len(self), bool)
+        won = np.zeros(len(self), bool)
+        push = np.zeros(len(self), bool)
+
+        rows = self._is('1x2') & scored
+        settled |= rows
+        won |= rows & (self.pick == full_time)
+
+        rows = self._is('double_chance') & scored
+        settled |= rows
+        won |= rows & (DOUBLE_CHANCE[self.pick, full_time] == 1)
+
+        rows = self._is('draw_no_bet') & scored
+        settled |= rows
+        won |= rows & (((self.pick == 0) & (full_time == 0)) | ((self.pick == 1) & (full_time == 2)))
+        push |= rows & (full_time == 1)
+
+        rows = self._is('both_teams_to_score') & scored
+        settled |= rows
+        won |= rows & ((self.pick == 0) == ((home > 0) & (away > 0)))
+
+        for market, source in LINE_MARKETS.items():
+            total = home + away if source is None else column(source)
+            rows = self._is(market) & ~np.isnan(total) & ~np.isnan(self.line)
+            settled |= rows
+            won |= rows & np.where(self.pick == 0, total > self.line, total < self.line)
+            push |= rows & (total == self.line)
+
+        rows = self._is('correct_score') & scored & ~np.isnan(self.pick_scores[:, 0])
+        settled |= rows
+        won |= rows & (self.pick_scores[:, 0] == home) & (self.pick_scores[:, 1] == away)
+
+        rows = self._is('ht_ft_tips') & scored & ~np.isnan(ht_home) & (self.pick_outcomes[:, 0] >= 0)
+        settled |= rows
+        won |= rows & (self.pick_outcomes[:, 0] == half_time) & (self.pick_outcomes[:, 1] == full_time)
+
+        # Buteurs : seule comparaison de chaînes, limitée aux matches réglables
+        rows = np.flatnonzero(self._is('goalscorer') & found)
+        has_scorers = np.array([bool(self.results.scorers[self.result[i]]) or home[i] + away[i] == 0
+                                for i in rows], dtype=bool)
+        rows = rows[has_scorers]
+        settled[rows] = True
+        won[rows] = [self.pick_names[i] in self.results.scorers[self.result[i]] for i in rows]
+
+        settled &= ~np.isnan(self.price)
+        return settled, won & settled, push & settled
+
+    def report(self) -> Dict[str, Any]:
+        """Taux de réussite, ROI et calibration par marché et par ligue"""
+        settled, won, push = self.settle()
+        profit = np.where(won, self.price - 1.0, np.where(push, 0.0, -1.0))
+        probability = 1.0 / self.price
+        decided = settled & ~push
+
+        def aggregate(groups: np.ndarray, size: int) -> Dict[str, np.ndarray]:
+            return {
+                'bets': np.bincount(groups[settled], minlength=size),
+                'decided': np.bincount(groups[decided], minlength=size),
+                'hits': np.bincount(groups[won], minlength=size),
+                'profit': np.bincount(groups[settled], profit[settled], minlength=size),
+                'probability': np.bincount(groups[decided], probability[decided], minlength=size),
+                'brier': np.bincount(groups[decided], (probability - won)[decided] ** 2, minlength=size),
+            }
+
+        def stats(totals: Dict[str, np.ndarray], i: int) -> Dict[str, Any]:
+            bets, decided_bets = int(totals['bets'][i]), int(totals['decided'][i])
+            entry = {'bets': bets, 'hits': int(totals['hits'][i])}
+            if bets:
+                entry['roi'] = round(float(totals['profit'][i] / bets), 4)
+            if decided_bets:
+                entry['hit_rate'] = round(float(totals['hits'][i] / decided_bets), 4)
+                entry['implied'] = round(float(totals['probability'][i] / decided_bets), 4)
+                entry['brier'] = round(float(totals['brier'][i] / decided_bets), 4)
+            return entry
+
+        market_count, league_count = len(self.markets), max(len(self.leagues), 1)
+        by_market = aggregate(self.market, market_count)
+        pairs = self.market * league_count + self.league
+        by_pair = aggregate(pairs, market_count * league_count)
+        bins = np.clip(np.digitize(probability, CALIBRATION_BINS) - 1, 0, len(CALIBRATION_BINS) - 2)
+        bins = np.where(np.isnan(probability), 0, bins)
+        cells = self.market * (len(CALIBRATION_BINS) - 1) + bins
+        by_bin = aggregate(cells, market_count * (len(CALIBRATION_BINS) - 1))
+
+        report = {'predictions': len(self), 'settled': int(settled.sum()), 'markets': {}}
+        for m, market in enumerate(self.markets):
+            entry = stats(by_market, m)
+            entry['leagues'] = {
+                league: stats(by_pair, m * league_count + l)
+                for l, league in enumerate(self.leagues) if by_pair['bets'][m * league_count + l]
+            }
+            entry['calibration'] = []
+            for b in range(len(CALIBRATION_BINS) - 1):
+                cell = m * (len(CALIBRATION_BINS) - 1) + b
+                if by_bin['decided'][cell]:
+                    label = f"{CALIBRATION_BINS[b]:.1f}-{CALIBRATION_BINS[b + 1]:.1f}"
+                    entry['calibration'].append({'bin': label, **stats(by_bin, cell)})
+            report['markets'][market] = entry
+        return report
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"{report['settled']} prédiction(s) réglée(s) sur {report['predictions']}")
+    print(f"{'Marché':<22} {'Ligue':<32} {'Paris':>6} {'Réussite':>9} {'ROI':>8} {'Brier':>7}")
+    for market, entry in report['markets'].items():
+        rows = [('(toutes)', entry)] + list(entry['leagues'].items())
+        for league, stats in rows:
+            if not stats['bets']:
+                continue
+            hit_rate = f"{stats['hit_rate']:.1%}" if 'hit_rate' in stats else '-'
+            brier = f"{stats['brier']:.3f}" if 'brier' in stats else '-'
+            print(f"{market:<22} {league[:32]:<32} {stats['bets']:>6} {hit_rate:>9} {stats['roi']:>+8.1%} {brier:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Évalue les prédictions passées sur les résultats finaux")
+    parser.add_argument('results', help="fichier de résultats (.csv ou .json)")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--snapshots', default='football_predictions_*.json',
+                        help="snapshots JSON à évaluer (défaut : football_predictions_*.json)")
+    source.add_argument('--db', help="lit les prédictions dans l'historique SQLite (voir history_store.py)")
+    source.add_argument('--delta-dir', help="lit les prédictions d'un dossier base + deltas (voir snapshot_delta.py)")
+    parser.add_argument('--start', help="date de début incluse (AAAA-MM-JJ), avec --db")
+    parser.add_argument('--end', help="date de fin exclue (AAAA-MM-JJ), avec --db")
+    parser.add_argument('-o', '--output', help="écrit aussi le rapport complet dans ce fichier JSON")
+    args = parser.parse_args()
+
+    results = Results.load(args.results)
+    if args.db:
+        from history_store import HistoryStore
+        with HistoryStore(args.db) as store:
+            backtest = Backtest(history_predictions(store, args.start, args.end), results)
+    elif args.delta_dir:
+        from snapshot_delta import DeltaStore
+        backtest = Backtest(snapshot_predictions(DeltaStore(args.delta_dir).iter_snapshots()), results)
+    else:
+        def load(paths):
+            for path in paths:
+                with open(path, 'r', encoding='utf-8') as f:
+                    yield json.load(f)
+        backtest = Backtest(snapshot_predictions(load(sorted(glob.glob(args.snapshots)))), results)
+
+    report = backtest.report()
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+        print(f"[SAVE JSON]... ✓ Rapport sauvegardé dans {args.output}")
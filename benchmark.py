@@ -0,0 +1,300 @@
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from crawl_archive import ArchivedResult
+from crawl_result_handler import CrawlResultHandler
+from html_result_handler import HtmlResultHandler
+from match_record import json_default, serializable
+
+RESULTS_FILE = 'benchmark_results.json'
+# Mesures de référence versionnées, une par version de Python et nombre de processus
+BASELINE_FILE = os.path.join('benchmarks', 'baseline.json')
+# Un scraping réel : 82 matches pour chacun des 11 types de prédiction
+BASE_MATCHES = 82
+SCALES = (1, 10, 100, 1000)
+# 1000x (~900 000 matches) demande plusieurs Go et plusieurs minutes : à lancer explicitement
+DEFAULT_SCALES = (1, 10, 100)
+# L'analyse BeautifulSoup est ~20x plus lente que celle du markdown : le chemin HTML s'arrête à 10x
+HTML_MAX_SCALE = 10
+# Écarts tolérés avant de signaler une régression
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.10
+# En dessous de cet écart (en secondes), une différence de temps est du bruit
+MIN_TIME_DELTA = 0.05
+REFERENCE = datetime(2025, 2, 1)
+PREDICTION_TYPES = ('1x2', 'ht_ft_tips', 'draw_no_bet', 'double_chance', 'special', 'goalscorer',
+                    'both_teams_to_score', 'correct_score', 'cards', 'corners', 'goals')
+
+LEAGUE_NAMES = ['England - Premier League', 'England - Championship', 'Spain - La Liga',
+                'Italy - Serie A', 'Germany - Bundesliga', 'France - Ligue 1',
+                'Netherlands - Eredivisie', 'Portugal - Primeira Liga', 'Scotland - Premiership',
+                'Turkiye - Super Lig', 'Belgium - First Division A', 'Argentina - Liga Profesional']
+TEAM_WORDS = ['Forest', 'Rovers', 'United', 'City', 'Athletic', 'Albion', 'Wanderers', 'Town',
+              'Sporting', 'Real', 'Dynamo', 'Olympic', 'Racing', 'Union', 'Inter', 'Academica']
+TEAM_PLACES = ['Northfield', 'Eastbrook', 'Westmoor', 'Southgate', 'Kingsport', 'Redhill',
+               'Lakeside', 'Stonebridge', 'Ashford', 'Millbrook', 'Oakham', 'Riverton']
+SPECIALS = ['A Penalty in the Match', 'Own Goal', 'First 10 Minutes Over 0.5 Goals', 'Red Card']
+
+
+def _price(rng: random.Random, low: float = 1.2, high: float = 9.0) -> str:
+    value = rng.uniform(low, high)
+    return f"{value:.1f}" if value >= 10 else f"{value:.2f}"
+
+
+def _columns(prediction_type: str, rng: random.Random) -> List[str]:
+    """Colonnes de cotes d'une ligne, telles que les affiche chaque page"""
+    if prediction_type in ('1x2', 'double_chance'):
+        return [_price(rng), _price(rng, 2.5, 5.0), _price(rng)]
+    if prediction_type in ('draw_no_bet', 'both_teams_to_score'):
+        return [_price(rng), _price(rng)]
+    if prediction_type in ('goals', 'corners', 'cards'):
+        return [rng.choice(['2.5', '4.5', '10.5']), _price(rng, 1.5, 2.5), _price(rng, 1.5, 2.5)]
+    if prediction_type == 'correct_score':
+        return [f"{rng.randint(0, 3)}:{rng.randint(0, 3)}", _price(rng, 6.0, 25.0)]
+    if prediction_type == 'ht_ft_tips':
+        return [f"{rng.choice('1X2')}/{rng.choice('1X2')}", _price(rng, 2.0, 20.0)]
+    if prediction_type == 'goalscorer':
+        return [f"{rng.choice(TEAM_PLACES)} {rng.choice(TEAM_WORDS)}", _price(rng, 2.0, 12.0)]
+    return [rng.choice(SPECIALS), _price(rng, 2.0, 8.0)]
+
+
+def _synthetic_rows(prediction_type: str, matches: int, seed: int = 0) -> Iterator[Tuple]:
+    """Lignes d'une page avec `matches` matches, réparties en ligues et en jours :
+    (ligue,) pour un intitulé, (coup d'envoi, domicile, extérieur, colonnes) pour un match"""
+    rng = random.Random(f"{seed}:{prediction_type}")
+    per_league = 8
+    for start in range(0, matches, per_league):
+        day = REFERENCE + timedelta(days=(start // (per_league * len(LEAGUE_NAMES))) % 120)
+        yield (LEAGUE_NAMES[(start // per_league) % len(LEAGUE_NAMES)],)
+        for _ in range(min(per_league, matches - start)):
+            kickoff = day.replace(hour=rng.randint(12, 21), minute=rng.choice((0, 15, 30, 45)))
+            home = f"{rng.choice(TEAM_PLACES)} {rng.choice(TEAM_WORDS)}"
+            away = f"{rng.choice(TEAM_PLACES)} {rng.choice(TEAM_WORDS)}"
+            yield kickoff.strftime('%d/%m %H:%M'), home, away, _columns(prediction_type, rng)
+
+
+def synthetic_markdown(prediction_type: str, matches: int, seed: int = 0) -> str:
+    """Markdown au format de crawl4ai avec `matches` matches, répartis en ligues et en jours"""
+    lines = ['Kick Off | Match | Tip', '---|---|---']
+    for row in _synthetic_rows(prediction_type, matches, seed):
+        if len(row) == 1:
+            if len(lines) > 2:
+                lines.append('')
+            lines.append(f"{row[0]} | Tip | Odds")
+        else:
+            kickoff, home, away, columns = row
+            lines.append(' | '.join([kickoff, home + away, *columns]))
+    lines.append('')
+    return '\n'.join(lines)
+
+
+def synthetic_html(prediction_type: str, matches: int, seed: int = 0) -> str:
+    """Page HTML équivalente à `synthetic_markdown` : en-tête en <thead>, ligues en ligne
+    `colspan`, chaque équipe dans son propre élément"""
+    lines = ['<html><body><table>',
+             '<thead><tr><th>Kick Off</th><th>Match</th><th>Tip</th><th>Odds</th></tr></thead><tbody>']
+    for row in _synthetic_rows(prediction_type, matches, seed):
+        if len(row) == 1:
+            lines.append(f'<tr class="league"><td colspan="2"><a href="#">{row[0]}</a></td>'
+                         f'<td>Tip</td><td>Odds</td></tr>')
+        else:
+            kickoff, home, away, columns = row
+            lines.append(f'<tr><td>{kickoff}</td><td><div class="teams"><span>{home}</span>'
+                         f'<span>{away}</span></div></td>'
+                         + ''.join(f'<td><span>{value}</span></td>' for value in columns) + '</tr>')
+    lines.append('</tbody></table></body></html>')
+    return '\n'.join(lines)
+
+
+def synthetic_results(scale: int, seed: int = 0) -> Dict[str, ArchivedResult]:
+    """Pages synthétiques de tous les types, comme les retourne `scrape_all`"""
+    return {
+        prediction_type: ArchivedResult(
+            f"https://example.invalid/{prediction_type}", success=True,
+            markdown=synthetic_markdown(prediction_type, BASE_MATCHES * scale, seed)
+        )
+        for prediction_type in PREDICTION_TYPES
+    }
+
+
+def _quiet(function: Callable[[], Any]) -> Any:
+    """Exécute `function` sans les lignes [DEBUG] des handlers"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return function()
+
+
+def measure(function: Callable[[], Any], repeat: int) -> Tuple[float, int, Any]:
+    """(meilleur temps en secondes, pic mémoire en octets, résultat) d'une étape.
+
+    Le temps est mesuré sans tracemalloc, qui ralentit les allocations ;
+    le pic mémoire est mesuré sur une passe séparée.
+    """
+    best = float('inf')
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        start = time.perf_counter()
+        result = _quiet(function)
+        best = min(best, time.perf_counter() - start)
+        del result
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = _quiet(function)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak, result
+
+
+def run_scale(scale: int, repeat: int, workers: int = 1) -> Dict[str, Any]:
+    results = synthetic_results(scale)
+    json_handler, html_handler = CrawlResultHandler(), HtmlResultHandler()
+
+    def parse():
+        return [json_handler._parse_matches(result.markdown, prediction_type)
+                for prediction_type, result in results.items()]
+
+    stages = {}
+    seconds, peak, _ = measure(parse, repeat)
+    stages['parse'] = {'seconds': round(seconds, 4), 'peak_bytes': peak}
+    if scale <= HTML_MAX_SCALE:
+        pages = {prediction_type: synthetic_html(prediction_type, BASE_MATCHES * scale)
+                 for prediction_type in PREDICTION_TYPES}
+
+        def parse_html():
+            return [json_handler._parse_matches_html(html, prediction_type)
+                    for prediction_type, html in pages.items()]
+
+        seconds, peak, _ = measure(parse_html, repeat)
+        stages['parse_html'] = {'seconds': round(seconds, 4), 'peak_bytes': peak}
+        del pages
+    seconds, peak, data = measure(lambda: json_handler.prepare_data(results, workers, now=REFERENCE), repeat)
+    stages['prepare'] = {'seconds': round(seconds, 4), 'peak_bytes': peak}
+    seconds, peak, text = measure(
+        lambda: json.dumps(serializable(data), indent=4, ensure_ascii=False, default=json_default), repeat
+    )
+    stages['json'] = {'seconds': round(seconds, 4), 'peak_bytes': peak, 'output_bytes': len(text.encode('utf-8'))}
+    del text
+    seconds, peak, html = measure(lambda: html_handler.generate_html(data), repeat)
+    stages['html'] = {'seconds': round(seconds, 4), 'peak_bytes': peak, 'output_bytes': len(html.encode('utf-8'))}
+    return {'matches': data['metadata']['total_matches'], 'stages': stages}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any], time_tolerance: float = TIME_TOLERANCE,
+            memory_tolerance: float = MEMORY_TOLERANCE) -> List[str]:
+    """Régressions de `current` par rapport à `previous`, échelle par échelle"""
+    regressions = []
+    for scale, run in current['scales'].items():
+        before = previous.get('scales', {}).get(scale)
+        if not before:
+            continue
+        for stage, now in run['stages'].items():
+            then = before['stages'].get(stage)
+            if not then:
+                continue
+            if (now['seconds'] > then['seconds'] * (1 + time_tolerance)
+                    and now['seconds'] - then['seconds'] > MIN_TIME_DELTA):
+                regressions.append(f"{scale}x {stage} : {then['seconds']:.3f}s -> {now['seconds']:.3f}s")
+            if now['peak_bytes'] > then['peak_bytes'] * (1 + memory_tolerance):
+                regressions.append(f"{scale}x {stage} : pic {then['peak_bytes'] / 1e6:.1f} Mo "
+                                   f"-> {now['peak_bytes'] / 1e6:.1f} Mo")
+    return regressions
+
+
+def load_runs(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('runs', [])
+
+
+def save_runs(path: str, runs: List[Dict[str, Any]]):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'runs': runs}, f, indent=4)
+
+
+def _same_conditions(run: Dict[str, Any], other: Dict[str, Any]) -> bool:
+    return run.get('python') == other.get('python') and run.get('workers') == other.get('workers')
+
+
+def baseline_for(current: Dict[str, Any], baseline: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Référence mesurée dans les mêmes conditions que `current`, sinon la dernière de la référence"""
+    return next((run for run in reversed(baseline) if _same_conditions(run, current)),
+                baseline[-1] if baseline else None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mesure l'analyse, la préparation et le rendu à grande échelle")
+    parser.add_argument('--scales', default=','.join(map(str, DEFAULT_SCALES)),
+                        help=f"multiples du volume d'un scraping réel, parmi {', '.join(map(str, SCALES))} ou autres "
+                             f"(défaut : {','.join(map(str, DEFAULT_SCALES))})")
+    parser.add_argument('--repeat', type=int, default=3, help="passes chronométrées par étape (défaut : 3)")
+    parser.add_argument('--workers', type=int, default=1, help="processus d'analyse de prepare_data (défaut : 1)")
+    parser.add_argument('--output', default=RESULTS_FILE,
+                        help=f"historique des mesures (défaut : {RESULTS_FILE})")
+    parser.add_argument('--tolerance', type=float, default=TIME_TOLERANCE,
+                        help=f"ralentissement toléré avant régression (défaut : {TIME_TOLERANCE})")
+    parser.add_argument('--no-save', action='store_true', help="n'ajoute pas la mesure à l'historique")
+    parser.add_argument('--baseline', default=BASELINE_FILE,
+                        help=f"mesures de référence à comparer (défaut : {BASELINE_FILE})")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="remplace la référence de cette version de Python et de ce nombre de processus")
+    args = parser.parse_args()
+
+    current = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'workers': args.workers,
+        'scales': {}
+    }
+    print(f"{'Échelle':>8} {'Matches':>9} {'Étape':<10} {'Temps':>9} {'Pic mémoire':>12}")
+    for scale in (int(value) for value in args.scales.split(',')):
+        run = run_scale(scale, args.repeat, args.workers)
+        current['scales'][str(scale)] = run
+        for stage, values in run['stages'].items():
+            print(f"{scale:>7}x {run['matches']:>9} {stage:<10} {values['seconds']:>8.3f}s "
+                  f"{values['peak_bytes'] / 1e6:>9.1f} Mo")
+
+    # Comparer à la référence versionnée, et non à l'historique local
+    baseline = load_runs(args.baseline)
+    previous = baseline_for(current, baseline)
+    regressions = compare(current, previous, args.tolerance) if previous else []
+    if previous and not _same_conditions(previous, current):
+        print(f"[BENCHMARK]... Référence mesurée avec Python {previous.get('python')} et {previous.get('workers')} "
+              f"processus : comparaison indicative")
+
+    if not args.no_save:
+        save_runs(args.output, load_runs(args.output) + [current])
+        print(f"[SAVE JSON]... ✓ Mesures ajoutées à {args.output}")
+    if args.update_baseline:
+        save_runs(args.baseline, [run for run in baseline if not _same_conditions(run, current)] + [current])
+        print(f"[SAVE JSON]... ✓ Référence mise à jour dans {args.baseline}")
+        regressions = []
+
+    if regressions:
+        print(f"[ERROR] Régressions par rapport à la référence du {previous['timestamp']} ({previous.get('commit')}) :")
+        for regression in regressions:
+            print(f"    {regression}")
+        sys.exit(1)
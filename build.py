@@ -1,37 +1,181 @@
+import argparse
+import json
 import os
+import re
 import shutil
+from datetime import datetime
 
-def build():
-    # Créer le dossier dist s'il n'existe pas
-    os.makedirs('dist', exist_ok=True)
-    
-    # Chercher les fichiers HTML de prédictions
-    html_files = [f for f in os.listdir('.') if f.startswith('football_predictions_') and f.endswith('.html')]
-    
-    if html_files:
-        # Si on trouve des fichiers, prendre le plus récent
-        latest_html = max(html_files, key=os.path.getctime)
-        shutil.copy2(latest_html, 'dist/index.html')
-        print(f"Copié {latest_html} vers dist/index.html")
+from build_manifest import BuildManifest, hash_bytes, hash_file, hash_tree
+from html_result_handler import SEARCH_DIR, SEARCH_PREFIX, HtmlResultHandler
+from match_record import as_records
+from odds_analytics import analyze
+from snapshot_delta import DeltaStore
+
+DIST_DIR = 'dist'
+# À incrémenter quand la transformation (rendu, minification) change
+BUILD_VERSION = 2
+SNAPSHOT_RE = re.compile(r'^football_predictions_(\d{8}_\d{6})\.(html|json)$')
+
+DEFAULT_HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Football Predictions</title>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+</head>
+<body>
+    <h1>Football Predictions</h1>
+    <p>Les prédictions seront bientôt disponibles.</p>
+</body>
+</html>
+"""
+
+def snapshot_timestamp(path):
+    """Date d'un snapshot, lue dans son nom de fichier ou à défaut dans ses métadonnées JSON.
+
+    La date de modification des fichiers n'est pas utilisée : après un
+    `git checkout` elle ne reflète pas la date du snapshot.
+    """
+    match = SNAPSHOT_RE.match(os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1), '%Y%m%d_%H%M%S')
+    if path.endswith('.html'):
+        # Page sans date dans son nom : se fier au JSON du même snapshot
+        path = path[:-len('.html')] + '.json'
+    if os.path.exists(path) and path.endswith('.json'):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return datetime.fromisoformat(json.load(f)['metadata']['timestamp'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+    return None
+
+def latest_snapshot(directory='.', extension='.html'):
+    """Retourne le fichier (page HTML ou JSON) du snapshot le plus récent, ou None"""
+    dated = []
+    for name in os.listdir(directory):
+        if name.startswith('football_predictions_') and name.endswith(extension):
+            timestamp = snapshot_timestamp(os.path.join(directory, name))
+            if timestamp is not None:
+                dated.append((timestamp, name))
+    return os.path.join(directory, max(dated)[1]) if dated else None
+
+def search_index_for(html_path):
+    """Index de recherche d'une page écrit dans SEARCH_DIR (voir `HtmlResultHandler.save_result`), ou None"""
+    match = SNAPSHOT_RE.match(os.path.basename(html_path))
+    if not match:
+        return None
+    path = os.path.join(SEARCH_DIR, f"{SEARCH_PREFIX}_{match.group(1)}.json")
+    return path if os.path.exists(path) else None
+
+def minify_html(html):
+    """Minification prudente : indentation et lignes vides supprimées.
+
+    Les retours à la ligne sont conservés pour ne pas casser les
+    commentaires `//` des scripts intégrés.
+    """
+    return '\n'.join(line.strip() for line in html.splitlines() if line.strip()) + '\n'
+
+def render_site(data, output_dir=DIST_DIR):
+    """Génère le site multi-pages (assets et fragments hashés) d'un snapshot JSON"""
+    reference = datetime.fromisoformat(data['metadata']['timestamp'])
+    data['matches'] = list(as_records(data['matches'], reference))
+    if 'analytics' not in data:
+        data['analytics'] = analyze(data)
+    return HtmlResultHandler().save_site(data, output_dir)
+
+def build(site_dir=None, force=False, delta_dir=None):
+    """Construit dist/ : le site multi-pages du dernier snapshot.
+
+    Sources, par ordre de préférence : un site déjà généré (`site_dir`),
+    le dernier snapshot du dossier de deltas (`delta_dir`, voir
+    `snapshot_delta.py`), le JSON du dernier snapshot, sa page HTML seule
+    si le JSON manque, ou une page par défaut. Les snapshots sont rendus
+    en site multi-pages. Netlify compresse lui-même les réponses : aucune
+    variante .gz/.br n'est produite.
+    """
+    latest_html = latest_snapshot()
+    latest_json = latest_snapshot(extension='.json')
+    use_site = bool(site_dir and os.path.exists(os.path.join(site_dir, 'index.html')))
+    delta_chain = DeltaStore(delta_dir).chain() if delta_dir and not use_site else []
+    if latest_json and latest_html and snapshot_timestamp(latest_html) > snapshot_timestamp(latest_json):
+        # Page plus récente que le dernier JSON (JSON non écrit) : elle est publiée seule
+        latest_json = None
+    latest_search = search_index_for(latest_html) if latest_html and not latest_json else None
+
+    # Ne pas reconstruire dist/ si la source et le procédé n'ont pas changé
+    manifest = BuildManifest()
+    if use_site:
+        source_hash = hash_tree(site_dir)
+    elif delta_chain:
+        source_hash = ''.join(hash_file(path) for _, _, path in delta_chain)
+    elif latest_json:
+        source_hash = hash_file(latest_json)
+    elif latest_html:
+        source_hash = hash_file(latest_html) + (hash_file(latest_search) if latest_search else '')
+    else:
+        source_hash = 'default'
+
+    input_hash = hash_bytes(f"{BUILD_VERSION}:{source_hash}".encode('utf-8'))
+    if not force and manifest.is_up_to_date('dist', input_hash):
+        print(f"{DIST_DIR}/ est à jour, rien à reconstruire")
+        return
+
+    # Repartir d'un dossier dist propre
+    shutil.rmtree(DIST_DIR, ignore_errors=True)
+    os.makedirs(DIST_DIR, exist_ok=True)
+
+    if use_site and os.path.exists(os.path.join(site_dir, 'index.html')):
+        # Version multi-pages : les assets ont déjà des noms hashés
+        shutil.copytree(site_dir, DIST_DIR, dirs_exist_ok=True)
+        print(f"Copié le site {site_dir}/ vers {DIST_DIR}/")
+    elif delta_chain:
+        render_site(DeltaStore(delta_dir).rebuild())
+        print(f"Généré le site du snapshot {delta_chain[-1][0]} de {delta_dir}/ dans {DIST_DIR}/")
+    elif latest_json:
+        with open(latest_json, 'r', encoding='utf-8') as f:
+            render_site(json.load(f))
+        print(f"Généré le site de {latest_json} dans {DIST_DIR}/")
+    elif latest_html:
+        shutil.copy2(latest_html, os.path.join(DIST_DIR, 'index.html'))
+        print(f"Copié {latest_html} vers {DIST_DIR}/index.html")
+        if latest_search:
+            # La page charge son index de recherche sous le même chemin relatif
+            target = os.path.join(DIST_DIR, os.path.relpath(latest_search, os.path.dirname(latest_html) or '.'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(latest_search, target)
+            print(f"Copié {latest_search} vers {DIST_DIR}/")
     else:
         # Si aucun fichier n'est trouvé, créer une page par défaut
-        default_html = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Football Predictions</title>
-            <meta charset="utf-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1">
-        </head>
-        <body>
-            <h1>Football Predictions</h1>
-            <p>Les prédictions seront bientôt disponibles.</p>
-        </body>
-        </html>
-        """
-        with open('dist/index.html', 'w', encoding='utf-8') as f:
-            f.write(default_html)
-        print("Créé une page par défaut dans dist/index.html")
+        with open(os.path.join(DIST_DIR, 'index.html'), 'w', encoding='utf-8') as f:
+            f.write(DEFAULT_HTML)
+        print(f"Créé une page par défaut dans {DIST_DIR}/index.html")
+
+    total = 0
+    for root, _, files in os.walk(DIST_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.endswith('.html'):
+                with open(path, 'r', encoding='utf-8') as f:
+                    html = f.read()
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(minify_html(html))
+            total += os.path.getsize(path)
+
+    print(f"Build terminé : {total} octets")
+
+    manifest.record('dist', input_hash, [DIST_DIR])
+    manifest.save()
 
 if __name__ == "__main__":
-    build() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Construit le dossier dist/ publié sur Netlify")
+    parser.add_argument('--site-dir', default=None,
+                        help="publie le site multi-pages déjà généré dans ce dossier (voir `test.py --site-dir`) "
+                             "au lieu de le générer depuis le dernier snapshot JSON")
+    parser.add_argument('--delta-dir', default=None,
+                        help="publie le dernier snapshot de ce dossier de deltas (voir `test.py --delta-dir`)")
+    parser.add_argument('--force', action='store_true',
+                        help="reconstruit dist/ même si le manifeste l'indique à jour")
+    args = parser.parse_args()
+    build(args.site_dir, args.force, args.delta_dir)
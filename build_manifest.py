@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, List
+
+from match_record import json_default
+
+MANIFEST_FILE = 'build_manifest.json'
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_data(data: Any) -> str:
+    """Hash stable d'une structure JSON (clés triées, `MatchRecord` acceptés)"""
+    text = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=json_default)
+    return hash_bytes(text.encode('utf-8'))
+
+
+def hash_tree(directory: str) -> str:
+    """Hash du contenu d'un dossier (chemins relatifs et contenus des fichiers)"""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, directory).encode('utf-8'))
+            digest.update(hash_file(path).encode('ascii'))
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """Manifeste des hashes des entrées et des sorties de chaque étape.
+
+    Une étape dont l'entrée a le même hash qu'au dernier passage, et dont
+    toutes les sorties existent encore avec le contenu enregistré, n'a pas
+    besoin d'être refaite. Le manifeste est un fichier JSON local, non
+    versionné : il décrit des sorties qui ne le sont pas non plus.
+    """
+
+    def __init__(self, path: str = MANIFEST_FILE):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get('entries', {})
+            except (OSError, ValueError) as e:
+                print(f"[ERROR] Manifeste illisible, reconstruit : {e}")
+
+    def is_up_to_date(self, step: str, input_hash: str) -> bool:
+        entry = self.entries.get(step)
+        if not entry or entry.get('input') != input_hash:
+            return False
+        for path, output_hash in entry.get('outputs', {}).items():
+            if not os.path.exists(path):
+                return False
+            current = hash_tree(path) if os.path.isdir(path) else hash_file(path)
+            if current != output_hash:
+                return False
+        return True
+
+    def outputs(self, step: str) -> List[str]:
+        return list(self.entries.get(step, {}).get('outputs', {}))
+
+    def record(self, step: str, input_hash: str, outputs: Iterable[str]):
+        self.entries[step] = {
+            'input': input_hash,
+            'outputs': {
+                path: hash_tree(path) if os.path.isdir(path) else hash_file(path)
+                for path in outputs
+            }
+        }
+
+    def save(self):
+        # Écriture atomique : un arrêt pendant l'écriture ne perd pas le manifeste
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'entries': self.entries}, f, indent=4, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,136 @@
+import argparse
+import gzip
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from http_fetcher import HttpResult
+
+ARCHIVE_VERSION = 1
+
+
+class ArchivedResult(HttpResult):
+    """Page relue depuis une archive, avec les attributs de `CrawlResult` utilisés par les handlers.
+
+    Le markdown enregistré (celui de crawl4ai) est restitué tel quel ;
+    pour une page récupérée en HTTP, il est recalculé à partir du HTML
+    comme pour `HttpResult`.
+    """
+
+    def __init__(self, url: str, html: str = '', success: bool = False,
+                 error_message: Optional[str] = None, status_code: Optional[int] = None,
+                 markdown: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None):
+        super().__init__(url, html, success, error_message, status_code)
+        self._markdown = markdown
+        self.metadata = metadata or {}
+
+
+def _markdown_text(result) -> Optional[str]:
+    """Markdown d'un `CrawlResult` (chaîne ou objet de crawl4ai), None s'il se déduit du HTML"""
+    if isinstance(result, HttpResult):
+        return result._markdown
+    markdown = getattr(result, 'markdown', None)
+    if markdown is None:
+        return None
+    return getattr(markdown, 'raw_markdown', None) or str(markdown)
+
+
+def page_record(key: str, result) -> Dict[str, Any]:
+    """Page sérialisable en JSON : type, URL, statut, markdown, HTML et métadonnées"""
+    return {
+        'key': key,
+        'url': getattr(result, 'url', None),
+        'success': bool(getattr(result, 'success', False)),
+        'status_code': getattr(result, 'status_code', None),
+        'error_message': getattr(result, 'error_message', None),
+        'markdown': _markdown_text(result),
+        'html': getattr(result, 'html', None) or '',
+        'metadata': getattr(result, 'metadata', None) or {}
+    }
+
+
+def page_result(page: Dict[str, Any]) -> ArchivedResult:
+    """Résultat reconstruit à partir de `page_record`"""
+    return ArchivedResult(
+        page['url'], page['html'], page['success'], page['error_message'],
+        page['status_code'], page['markdown'], page['metadata']
+    )
+
+
+def save_archive(results: Dict[str, Any], path: str, base_url: Optional[str] = None,
+                 recorded_at: Optional[datetime] = None) -> str:
+    """Enregistre les résultats de `scrape_all` dans une archive JSON Lines compressée (gzip).
+
+    La première ligne décrit l'enregistrement, puis chaque ligne contient
+    une page : type, URL, statut, markdown, HTML et métadonnées.
+    """
+    recorded_at = recorded_at or datetime.now()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as f:
+        f.write(json.dumps({
+            'version': ARCHIVE_VERSION,
+            'recorded_at': recorded_at.isoformat(),
+            'base_url': base_url,
+            'pages': len(results)
+        }, ensure_ascii=False) + '\n')
+        for key, result in results.items():
+            f.write(json.dumps(page_record(key, result), ensure_ascii=False, default=str) + '\n')
+    return path
+
+
+def load_archive(path: str) -> Tuple[Dict[str, ArchivedResult], Dict[str, Any]]:
+    """Relit une archive : (type -> résultat dans l'ordre d'enregistrement, en-tête)"""
+    results = {}
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('version') != ARCHIVE_VERSION:
+            raise ValueError(f"Version d'archive non supportée : {header.get('version')}")
+        for line in f:
+            page = json.loads(line)
+            results[page['key']] = page_result(page)
+    return results, header
+
+
+def recorded_at(header: Dict[str, Any]) -> datetime:
+    """Date de l'enregistrement, référence des dates des matches rejoués"""
+    return datetime.fromisoformat(header['recorded_at'])
+
+
+if __name__ == "__main__":
+    from crawl_result_handler import CrawlResultHandler
+    from html_result_handler import HtmlResultHandler
+    from match_record import json_default, serializable
+
+    parser = argparse.ArgumentParser(description="Rejoue une archive de scraping sans navigateur ni réseau")
+    parser.add_argument('archive', help="archive enregistrée avec `test.py --record`")
+    parser.add_argument('--workers', type=int, default=1, help="processus d'analyse (défaut : 1)")
+    parser.add_argument('--repeat', type=int, default=1, help="nombre de passes, pour mesurer (défaut : 1)")
+    parser.add_argument('--json', help="écrit le JSON obtenu dans ce fichier")
+    parser.add_argument('--html', help="écrit la page HTML obtenue dans ce fichier")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results, header = load_archive(args.archive)
+    print(f"[REPLAY]... {len(results)} page(s) enregistrée(s) le {header['recorded_at']} "
+          f"relue(s) en {time.perf_counter() - start:.3f}s")
+
+    json_handler, html_handler = CrawlResultHandler(), HtmlResultHandler()
+    for _ in range(max(1, args.repeat)):
+        start = time.perf_counter()
+        data = json_handler.prepare_data(results, args.workers, now=recorded_at(header))
+        parsed = time.perf_counter()
+        html = html_handler.generate_html(data)
+        rendered = time.perf_counter()
+        print(f"[REPLAY]... {data['metadata']['total_matches']} matches : analyse {parsed - start:.3f}s, "
+              f"rendu {rendered - parsed:.3f}s")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(serializable(data), f, indent=4, ensure_ascii=False, default=json_default)
+        print(f"[SAVE JSON]... ✓ Résultats sauvegardés dans {args.json}")
+    if args.html:
+        with open(args.html, 'w', encoding='utf-8') as f:
+            f.write(html)
+        print(f"[SAVE HTML]... ✓ Page HTML générée dans {args.html}")
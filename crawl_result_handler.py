@@ -1,147 +1,376 @@
+import io
 import json
+import re
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from fixture_index import FixtureIndex
+from markets import MARKETS, Market, get_market
+from history_store import HISTORY_DB, HistoryStore
+from snapshot_delta import DELTA_DIR, DeltaStore
+from match_record import MatchRecord, json_default, serializable, split_teams
+from metrics import Metrics
+from odds_analytics import analyze
+
+# Heure de coup d'envoi telle qu'affichée dans les tableaux (ex: "01/02 12:30")
+KICKOFF_RE = re.compile(r'^\d{1,2}/\d{1,2}\s+\d{1,2}:\d{2}$')
+# Fragments de texte séparant les deux équipes dans une cellule de match
+TEAM_SEPARATORS = {'-', 'v', 'vs', 'vs.'}
+# Découpage d'une ligne de tableau markdown en cellules (espaces autour des '|' inclus)
+ROW_SPLIT_RE = re.compile(r'\s*\|\s*')
+# Les lignes d'en-tête de cotes contiennent aussi ' - ' mais ne sont pas des ligues : elles commencent
+# par un intitulé de colonne, alors qu'une ligue commence par son pays ("France - Ligue 1")
+LEAGUE_EXCLUDE_RE = re.compile(r'(?:1|X|2|Goals|Cards|Corners)\b')
+# Intitulés de colonnes d'une ligne d'en-tête ("Kick Off | Match | 1 | X | 2")
+COLUMN_LABEL_RE = re.compile(r'(?:Kick\s*Off|Match|Tip|Odds)\b', re.IGNORECASE)
+# Intitulé de ligue "Pays - Ligue" ("England - Premier League", "France - Ligue 1")
+LEAGUE_NAME_RE = re.compile(r'^[^\W\d][^|]*? - \S')
 
 class CrawlResultHandler:
-    def __init__(self):
+    def __init__(self, verbose: bool = False, metrics: Optional[Metrics] = None):
         self.filename_prefix = "football_predictions"
-        self.prediction_types = {
-            'match_of_the_day': 'Match of the Day',
-            'top10': 'Top 10 Predictions',
-            'accumulator': 'Accumulator Tips',
-            'ht_ft': 'HT/FT Tips',
-            'draw_no_bet': 'Draw No Bet',
-            'double_chance': 'Double Chance',
-            'special': 'Special Predictions',
-            'goalscorer': 'Goalscorer',
-            'btts': 'Both Teams to Score',
-            'correct_score': 'Correct Score',
-            'cards': 'Cards',
-            'corners': 'Corners',
-            'goals': 'Goals'
-        }
+        self.verbose = verbose
+        # Durées d'analyse et nombre de matches par type, si fourni
+        self.metrics = metrics
+        # Libellés des marchés, par clé canonique (voir `markets.py`)
+        self.prediction_types = {key: market.label for key, market in MARKETS.items()}
 
-    def _parse_matches(self, content: str, prediction_type: str) -> List[Dict]:
-        matches = []
+    def _parse_matches(self, content: str, prediction_type: str) -> List[MatchRecord]:
+        return list(self.iter_matches(io.StringIO(content), prediction_type))
+
+    def iter_matches(self, lines: Iterable[str], prediction_type: str,
+                     reference: Optional[datetime] = None) -> Iterator[MatchRecord]:
+        """Produit les matches un par un à partir des lignes d'un markdown crawl4ai.
+
+        `lines` peut être n'importe quel itérable de lignes (fichier ouvert,
+        `io.StringIO`...) : le contenu n'est jamais découpé en liste.
+        `reference` (par défaut maintenant) sert à déduire l'année des
+        coups d'envoi.
+        """
+        reference = reference or datetime.now()
         current_league = None
-        
-        print(f"[DEBUG] Analyzing content for {prediction_type}")
-        lines = content.split('\n')
-        
+        # Marché résolu une fois par page : aucune comparaison de chaînes par ligne
+        market = get_market(prediction_type)
+        prediction_type = market.key
+
+        if self.verbose:
+            print(f"[DEBUG] Analyzing content for {prediction_type}")
+
         for i, line in enumerate(lines):
-            if '|' in line:
-                parts = [p.strip() for p in line.split('|')]
-                
-                # Ignorer les lignes d'en-tête et de séparation
-                if '-+-' in line or not parts[0] or parts[0].startswith('Kick Off'):
-                    continue
-                
-                # Détecter une ligne de ligue
-                if len(parts) >= 3 and ' - ' in parts[0]:
-                    if not any(x in parts[0] for x in ['1', 'X', '2', 'Goals', 'Cards', 'Corners']):
-                        current_league = parts[0]
+            if '|' not in line or '-+-' in line:
+                continue
+            parts = ROW_SPLIT_RE.split(line.strip())
+            first = parts[0]
+
+            # Ignorer les lignes d'en-tête et de séparation
+            if not first or first.startswith('Kick Off'):
+                continue
+
+            # Détecter une ligne de ligue
+            if len(parts) >= 3 and ' - ' in first:
+                if not LEAGUE_EXCLUDE_RE.match(first):
+                    current_league = first
+                    if self.verbose:
                         print(f"[DEBUG] Found league: {current_league}")
+                continue
+
+            # Détecter un match selon le type de prédiction
+            if current_league and len(parts) >= 3 and first[0].isdigit():
+                try:
+                    # Le markdown colle les deux équipes : elles sont séparées ici, comme dans le HTML
+                    home, away = split_teams(parts[1])
+                    yield MatchRecord(
+                        current_league, first, home, away, prediction_type,
+                        self._market_odds(market, parts), self._market_info(market, parts), reference
+                    )
+                except Exception as e:
+                    print(f"[ERROR] Parsing match failed at line {i}: {e}")
+
+    def _parse_matches_html(self, html: str, prediction_type: str) -> List[MatchRecord]:
+        return list(self._iter_matches_html(html, prediction_type))
+
+    def _iter_matches_html(self, html: str, prediction_type: str,
+                           reference: Optional[datetime] = None) -> Iterator[MatchRecord]:
+        """Extrait les matches directement des tableaux HTML de la page.
+
+        Contrairement au markdown, chaque équipe est un élément distinct de
+        la cellule du match : les équipes domicile et extérieur sont donc
+        lues séparément, sans heuristique de découpage. Les lignes de ligue
+        sont reconnues à leur structure (voir `_is_league_row`), pas à leur
+        texte.
+        """
+        reference = reference or datetime.now()
+        current_league = None
+        market = get_market(prediction_type)
+        prediction_type = market.key
+        soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer('table'))
+
+        for row in soup.find_all('tr'):
+            cells = row.find_all(['td', 'th'], recursive=False)
+            if not cells:
+                continue
+            first = cells[0].get_text(' ', strip=True)
+
+            if KICKOFF_RE.match(first):
+                if not current_league or len(cells) < 3:
                     continue
-                
-                # Détecter un match selon le type de prédiction
-                if current_league and len(parts) >= 3:
-                    if parts[0] and parts[0][0].isdigit():
-                        try:
-                            match = {
-                                'league': current_league,
-                                'datetime': parts[0],
-                                'teams': parts[1],
-                                'prediction_type': prediction_type,
-                                'odds': self._parse_odds(parts, prediction_type),
-                                'additional_info': self._get_additional_info(prediction_type, parts)
-                            }
-                            matches.append(match)
-                            print(f"[DEBUG] Found match: {match['teams']}")
-                        except Exception as e:
-                            print(f"[ERROR] Parsing match failed at line {i}: {e}")
-                            continue
-
-        return matches
+                home, away = self._cell_teams(cells[1])
+                parts = [first, home + away] + [cell.get_text('', strip=True) for cell in cells[2:]]
+                yield MatchRecord(
+                    current_league, first, home, away, prediction_type,
+                    self._market_odds(market, parts), self._market_info(market, parts), reference
+                )
+            elif first and self._is_league_row(row, cells, first):
+                current_league = first
+
+    @staticmethod
+    def _is_league_row(row, cells, first: str) -> bool:
+        """Ligne d'intitulé de ligue, d'après la structure du tableau.
+
+        Les en-têtes de colonnes ("Kick Off", "Match", "1", "X"...) ne sont
+        jamais des ligues, qu'ils soient dans le `<thead>` ou en cellules
+        `<td>` dans le corps du tableau. Une ligne de ligue s'étend sur
+        plusieurs colonnes (`colspan`), porte une classe "league", a un
+        intitulé "Pays - Ligue" (même en cellules `<th>`, comme dans le
+        markdown de crawl4ai), ou est une ligne de cellules `<td>` sans
+        coup d'envoi.
+        """
+        if COLUMN_LABEL_RE.match(first) or LEAGUE_EXCLUDE_RE.match(first):
+            return False
+        if row.find_parent('thead') is not None:
+            return False
+        if any('league' in name for name in row.get('class', [])):
+            return True
+        if int(cells[0].get('colspan', 1) or 1) > 1:
+            return True
+        if LEAGUE_NAME_RE.match(first):
+            return True
+        return any(cell.name == 'td' for cell in cells)
+
+    @staticmethod
+    def _cell_teams(cell) -> tuple:
+        """Retourne (domicile, extérieur) à partir des éléments de la cellule du match"""
+        names = [text for text in cell.stripped_strings if text.lower() not in TEAM_SEPARATORS]
+        if len(names) >= 2:
+            return names[0], names[-1]
+        return (names[0] if names else ''), ''
+
+    def _iter_result(self, result, prediction_type: str,
+                     reference: Optional[datetime] = None) -> Iterator[MatchRecord]:
+        """Analyse une page scrapée, en lisant le HTML quand il est disponible"""
+        html: Optional[str] = getattr(result, 'html', None)
+        if html:
+            matches = self._iter_matches_html(html, prediction_type, reference)
+            first = next(matches, None)
+            if first is not None:
+                yield first
+                yield from matches
+                return
+        yield from self.iter_matches(io.StringIO(result.markdown), prediction_type, reference)
 
     def _parse_odds(self, parts: List[str], prediction_type: str) -> Dict[str, str]:
         """Parse les cotes selon le type de prédiction"""
-        odds = {}
-        try:
-            if prediction_type == 'match_of_the_day':
-                odds = {'1': parts[2].strip()}
-            elif prediction_type == 'correct_score':
-                odds = {'score': parts[2].strip(), 'odds': parts[3].strip()}
-            elif prediction_type == 'both_teams_to_score':
-                odds = {'yes': parts[2].strip(), 'no': parts[3].strip()}
-            elif prediction_type in ['goals', 'corners', 'cards']:
-                odds = {
-                    'line': parts[2].strip(),
-                    'over': parts[3].strip(),
-                    'under': parts[4].strip()
-                }
-            else:
-                odds = {
-                    '1': parts[2].strip() if len(parts) > 2 else 'N/A',
-                    'X': parts[3].strip() if len(parts) > 3 else 'N/A',
-                    '2': parts[4].strip() if len(parts) > 4 else 'N/A'
-                }
-        except Exception as e:
-            print(f"[ERROR] Parsing odds failed for {prediction_type}: {e}")
-            odds = {'error': str(e)}
-        return odds
+        return self._market_odds(get_market(prediction_type), parts)
 
     def _get_additional_info(self, prediction_type: str, parts: List[str]) -> Dict:
         """Récupère les informations additionnelles selon le type de prédiction"""
-        info = {}
+        return self._market_info(get_market(prediction_type), parts)
+
+    @staticmethod
+    def _market_odds(market: Market, parts: List[str]) -> Dict[str, str]:
         try:
-            if prediction_type == 'match_of_the_day':
-                info['confidence'] = 'High'
-            elif prediction_type == 'top10':
-                info['rank'] = parts[1].split('.')[0] if '.' in parts[1] else 'N/A'
-            elif prediction_type == 'accumulator_tips':
-                info['combined_odds'] = parts[-1] if len(parts) > 3 else 'N/A'
-            elif prediction_type == 'ht_ft_tips':
-                info['ht_prediction'] = parts[2] if len(parts) > 2 else 'N/A'
-                info['ft_prediction'] = parts[3] if len(parts) > 3 else 'N/A'
+            return market.parse_odds(parts)
+        except Exception as e:
+            print(f"[ERROR] Parsing odds failed for {market.key}: {e}")
+            return {'error': str(e)}
+
+    @staticmethod
+    def _market_info(market: Market, parts: List[str]) -> Dict:
+        try:
+            return market.parse_info(parts)
         except Exception as e:
             print(f"[ERROR] Getting additional info failed: {e}")
-        return info
+            return {}
+
+    def generate_filename(self, data: Optional[Dict[str, Any]] = None, prefix: Optional[str] = None) -> str:
+        """Génère un nom de fichier horodaté.
 
-    def generate_filename(self) -> str:
-        """Génère un nom de fichier unique avec horodatage"""
-        return f"{self.filename_prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        L'horodatage est celui du snapshot (`data['metadata']['timestamp']`)
+        s'il est fourni : un rejeu d'archive garde la date de
+        l'enregistrement et ne passe pas pour le snapshot le plus récent.
+        """
+        stamp = datetime.fromisoformat(data['metadata']['timestamp']) if data else datetime.now()
+        return f"{prefix or self.filename_prefix}_{stamp.strftime('%Y%m%d_%H%M%S')}.json"
     
-    def prepare_data(self, results: Dict[str, Any]) -> Dict[str, Any]:
-        """Prépare les données à partir de plusieurs résultats de scraping"""
+    def prepare_data(self, results: Dict[str, Any], workers: int = 1,
+                     executor: Optional[Executor] = None, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Prépare les données à partir de plusieurs résultats de scraping.
+
+        Les matches sont des `MatchRecord` ; ils sont convertis au schéma
+        JSON historique à la sérialisation (voir `save_result`). L'index
+        des rencontres (`FixtureIndex`) est construit une seule fois ici,
+        dans `data['fixtures']`, et réutilisé par le rendu et les autres
+        sorties ; il n'est jamais écrit dans le JSON.
+
+        Avec `workers > 1`, chaque type de prédiction est analysé dans un
+        processus séparé ; un `executor` existant (pool de processus ou de
+        threads) peut aussi être fourni pour être réutilisé entre plusieurs
+        appels. L'ordre des matches reste celui de `results`.
+
+        `now` (par défaut l'heure courante) date le snapshot et sert de
+        référence pour l'année des matches, par exemple lors du rejeu
+        d'une archive (voir `crawl_archive.py`).
+
+        Les analyses de cotes (`odds_analytics.analyze`) sont toujours
+        calculées, dans `data['analytics']`.
+        """
+        now = now or datetime.now()
+        if self.verbose:
+            print(f"[DEBUG] Processing {len(results)} prediction types")
+        return self.assemble(zip(results, self._parse_results(results, now, workers, executor)), now)
+
+    def assemble(self, matches_by_type: Iterable[Tuple[str, Iterable[MatchRecord]]],
+                 now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Assemble les données d'un snapshot à partir de paires (type, matches de la page).
+
+        Les matches peuvent être des itérables paresseux (voir
+        `prepare_data`) ou des listes déjà analysées, comme celles que le
+        daemon garde entre deux rafraîchissements : les pages ne sont
+        alors pas relues.
+        """
         all_matches = []
-        
-        print(f"[DEBUG] Processing {len(results)} prediction types")  # Debug
-        
-        for prediction_type, result in results.items():
-            matches = self._parse_matches(result.markdown, prediction_type)
-            all_matches.extend(matches)
+        prediction_types = set()
+        leagues = set()
+        fixtures = FixtureIndex()
+        now = now or datetime.now()
+
+        # Une seule passe sur les matches pour les listes et les métadonnées
+        started = time.perf_counter()
+        for prediction_type, matches in matches_by_type:
+            found = len(all_matches)
+            for match in matches:
+                all_matches.append(match)
+                fixtures.add(match)
+                prediction_types.add(match.prediction_type)
+                leagues.add(match.league)
+            if self.metrics is not None:
+                finished = time.perf_counter()
+                # Une liste a déjà été analysée (et mesurée) par l'appelant
+                if not isinstance(matches, list):
+                    self.metrics.observe('parse', finished - started, prediction_type=prediction_type)
+                self.metrics.count('matches', len(all_matches) - found, prediction_type=prediction_type)
+                started = finished
 
-        print(f"[DEBUG] Total matches found: {len(all_matches)}")  # Debug
-        print(f"[DEBUG] Prediction types found: {set(match['prediction_type'] for match in all_matches)}")  # Debug
+        if self.verbose:
+            print(f"[DEBUG] Total matches found: {len(all_matches)}")
+            print(f"[DEBUG] Prediction types found: {prediction_types}")
 
-        return {
+        data = {
             'url': 'https://onemillionpredictions.com',
             'matches': all_matches,
             'metadata': {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now.isoformat(),
                 'total_matches': len(all_matches),
-                'prediction_types': sorted(list(set(match['prediction_type'] for match in all_matches))),
-                'leagues': sorted(list(set(match['league'] for match in all_matches))),
-                'last_update': datetime.now().strftime('%d/%m/%Y %H:%M')
-            }
+                'prediction_types': sorted(prediction_types),
+                'leagues': sorted(leagues),
+                'last_update': now.strftime('%d/%m/%Y %H:%M')
+            },
+            'fixtures': fixtures
         }
-    
-    def save_result(self, result) -> str:
-        """Sauvegarde les résultats dans un fichier JSON"""
-        filename = self.generate_filename()
-        data = self.prepare_data(result)
+        # Marges par marché et values, calculées sur tableaux NumPy. Toujours calculées : le rendu
+        # les affiche et elles coûtent quelques millisecondes ; NumPy est une dépendance obligatoire
+        started = time.perf_counter()
+        data['analytics'] = analyze(data)
+        if self.metrics is not None:
+            self.metrics.observe('analytics', time.perf_counter() - started)
+        return data
+
+    def _parse_results(self, results: Dict[str, Any], reference: datetime, workers: int,
+                       executor: Optional[Executor]) -> Iterator[Iterable[MatchRecord]]:
+        """Produit les matches de chaque page, dans l'ordre de `results`"""
+        if executor is None and (workers <= 1 or len(results) <= 1):
+            for prediction_type, result in results.items():
+                yield self._iter_result(result, prediction_type, reference)
+            return
+
+        # Seul le HTML est envoyé aux workers quand il existe : le markdown
+        # n'est relu (dans ce processus) que si le HTML ne contient aucun tableau
+        jobs = []
+        for prediction_type, result in results.items():
+            html = getattr(result, 'html', None) or None
+            markdown = None if html else result.markdown
+            jobs.append((prediction_type, html, markdown, reference, self.verbose))
+
+        pool = executor or ProcessPoolExecutor(max_workers=min(workers, len(jobs)))
+        try:
+            for (prediction_type, result), matches in zip(results.items(), pool.map(_parse_page, jobs)):
+                if matches is None:
+                    matches = self.iter_matches(io.StringIO(result.markdown), prediction_type, reference)
+                yield matches
+        finally:
+            if executor is None:
+                pool.shutdown()
+
+    def write_json(self, data: Dict[str, Any], filename: Optional[str] = None) -> str:
+        """Écrit des données déjà préparées dans un nouveau fichier JSON (nom horodaté par défaut)"""
+        filename = filename or self.generate_filename(data)
         
         with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+            json.dump(serializable(data), f, indent=4, ensure_ascii=False, default=json_default)
             
-        return filename 
\ No newline at end of file
+        return filename
+
+    def write_fixtures(self, data: Dict[str, Any]) -> str:
+        """Écrit le snapshot au format normalisé : une entrée par rencontre, tous marchés confondus"""
+        filename = self.generate_filename(data, 'football_fixtures')
+        index = data.get('fixtures') or FixtureIndex.from_matches(
+            data['matches'], datetime.fromisoformat(data['metadata']['timestamp'])
+        )
+
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump({
+                'url': data['url'],
+                'metadata': data['metadata'],
+                **index.to_dict()
+            }, f, ensure_ascii=False, separators=(',', ':'))
+
+        return filename
+
+    def write_history(self, data: Dict[str, Any], path: str = HISTORY_DB) -> Optional[int]:
+        """Ajoute le snapshot à l'historique SQLite ; retourne son identifiant (None s'il y était déjà)"""
+        with HistoryStore(path) as store:
+            return store.append(data)
+
+    def write_delta(self, data: Dict[str, Any], directory: str = DELTA_DIR) -> Optional[str]:
+        """Enregistre seulement les changements depuis le snapshot précédent ; retourne le fichier écrit ou None"""
+        return DeltaStore(directory).save(data)
+
+    def save(self, result, workers: int = 1) -> Tuple[str, Dict[str, Any]]:
+        """Sauvegarde les résultats en JSON et retourne (fichier, données préparées).
+
+        Les données retournées peuvent être passées telles quelles à
+        `HtmlResultHandler.save_result`, sans relire le fichier.
+        """
+        data = self.prepare_data(result, workers)
+        return self.write_json(data), data
+
+    def save_result(self, result, workers: int = 1) -> str:
+        """Sauvegarde les résultats dans un fichier JSON"""
+        return self.save(result, workers)[0]
+
+
+def _parse_page(job) -> Optional[List[MatchRecord]]:
+    """Analyse une page dans un worker de `prepare_data`.
+
+    Retourne None si la page n'a que du HTML sans tableau exploitable :
+    le repli sur le markdown est alors fait par l'appelant.
+    """
+    prediction_type, html, markdown, reference, verbose = job
+    handler = CrawlResultHandler(verbose)
+    if html:
+        return list(handler._iter_matches_html(html, prediction_type, reference)) or None
+    return list(handler.iter_matches(io.StringIO(markdown), prediction_type, reference))
@@ -0,0 +1,272 @@
+import argparse
+import asyncio
+import signal
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+from build_manifest import hash_data
+from crawl_result_handler import CrawlResultHandler
+from html_result_handler import SEARCH_DIR, HtmlResultHandler
+from http_fetcher import HttpFetcher
+from match_record import MatchRecord
+from metrics import Metrics
+from scraper import (BASE_URL, DEFAULT_BACKEND, FETCH_BACKENDS, MAX_CONCURRENT_PAGES, MAX_RETRIES, PAGE_TIMEOUT,
+                     PREDICTION_TYPES, LazyCrawler, backend_options, make_browser_config, parse_backend,
+                     save_outputs, scrape_all)
+
+# Intervalle de rafraîchissement par défaut d'un type de prédiction (en secondes)
+DEFAULT_INTERVAL = 30 * 60
+# Les marchés principaux bougent plus souvent dans la journée
+REFRESH_INTERVALS = {
+    '1x2': 10 * 60,
+    'double_chance': 15 * 60,
+    'draw_no_bet': 15 * 60,
+    'goals': 15 * 60,
+    'both_teams_to_score': 15 * 60
+}
+# Délai avant de retenter une page dont le rafraîchissement a échoué
+RETRY_INTERVAL = 5 * 60
+# Budget (en secondes) d'un rafraîchissement
+REFRESH_BUDGET = 5 * 60
+STATUS_HOST = '127.0.0.1'
+STATUS_PORT = 8765
+
+# Clé interne (celle de `scrape_all`) -> segment d'URL ; None pour la page d'accueil
+MARKETS = {'1x2': None, **{pred_type.replace('-', '_'): pred_type for pred_type in PREDICTION_TYPES}}
+
+
+class PredictionDaemon:
+    """Service qui rafraîchit chaque type de prédiction à son propre rythme.
+
+    Le navigateur (`LazyCrawler`) et la session HTTP restent ouverts entre
+    deux rafraîchissements. Chaque page est analysée une seule fois, et
+    ses matches ne sont retenus que s'ils ont changé ; les sorties ne sont
+    regénérées que dans ce cas, à partir des matches retenus, et seules
+    les sections HTML des marchés modifiés sont rendues à nouveau. Un
+    serveur local expose l'état du service (`/health`, `/status`) et ses
+    mesures (`/metrics`).
+    """
+
+    def __init__(self, intervals: Optional[Dict[str, float]] = None, default_interval: float = DEFAULT_INTERVAL,
+                 max_concurrency: int = MAX_CONCURRENT_PAGES, page_timeout: float = PAGE_TIMEOUT,
+                 retries: int = MAX_RETRIES, default_backend: str = DEFAULT_BACKEND,
+                 backends: Optional[Dict[str, str]] = None,
+                 site_dir: Optional[str] = None, fixtures: bool = False, history_db: Optional[str] = None,
+                 delta_dir: Optional[str] = None, search: bool = False, verbose: bool = False):
+        intervals = {**REFRESH_INTERVALS, **(intervals or {})}
+        self.intervals = {key: intervals.get(key, default_interval) for key in MARKETS}
+        self.max_concurrency = max_concurrency
+        self.page_timeout = page_timeout
+        self.retries = retries
+        self.default_backend = default_backend
+        self.backends = FETCH_BACKENDS if backends is None else backends
+        self.output_options = (site_dir, fixtures, history_db, delta_dir, search)
+        self.verbose = verbose
+        self.metrics = Metrics()
+        self.json_handler = CrawlResultHandler(verbose, self.metrics)
+        # Les sections des marchés inchangés sont reprises du rendu précédent
+        self.html_handler = HtmlResultHandler(verbose, self.metrics, cache_sections=True)
+
+        self.started_at = datetime.now()
+        # Matches de la dernière page retenue et leur empreinte, par type : chaque page n'est analysée qu'une fois
+        self.records: Dict[str, List[MatchRecord]] = {}
+        self.fingerprints: Dict[str, str] = {}
+        self.markets: Dict[str, Dict[str, Any]] = {
+            key: {'last_fetch': None, 'last_change': None, 'failures': 0, 'matches': 0} for key in MARKETS
+        }
+        self.next_due = {key: 0.0 for key in MARKETS}
+        self.last_refresh: Optional[datetime] = None
+        self.last_outputs: List[str] = []
+        self.last_error: Optional[str] = None
+        self._stop = asyncio.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def due(self) -> List[str]:
+        now = time.monotonic()
+        return [key for key, due in self.next_due.items() if due <= now]
+
+    def _changed(self, key: str, result: Any) -> bool:
+        """Enregistre les matches de la page s'ils diffèrent de la dernière version retenue.
+
+        Les matches analysés ici sont ceux des sorties (voir `refresh`) :
+        la page n'est pas relue par `prepare_data`. Un marché inchangé
+        garde ses anciens `MatchRecord`, ce qui permet de réutiliser sa
+        section HTML.
+        """
+        started = time.perf_counter()
+        matches = list(self.json_handler._iter_result(result, key, datetime.now()))
+        self.metrics.observe('parse', time.perf_counter() - started, prediction_type=key)
+        fingerprint = hash_data(matches)
+        market = self.markets[key]
+        market['matches'] = len(matches)
+        if self.fingerprints.get(key) == fingerprint:
+            return False
+        self.fingerprints[key] = fingerprint
+        self.records[key] = matches
+        market['last_change'] = datetime.now().isoformat(timespec='seconds')
+        return True
+
+    async def refresh(self, browser, http, keys: List[str]) -> List[str]:
+        """Rafraîchit les types `keys` et regénère les sorties si l'un d'eux a changé.
+
+        Retourne les types dont les matches ont changé.
+        """
+        types = [MARKETS[key] for key in keys if MARKETS[key]]
+        with self.metrics.timer('scrape'):
+            results = await scrape_all(
+                browser, http, BASE_URL, types, self.max_concurrency, self.page_timeout, self.retries,
+                REFRESH_BUDGET, self.default_backend, self.backends, verbose=self.verbose, metrics=self.metrics,
+                homepage='1x2' in keys
+            )
+
+        changed = []
+        now = time.monotonic()
+        for key in keys:
+            market = self.markets[key]
+            result = results.get(key)
+            if result is None:
+                market['failures'] += 1
+                self.next_due[key] = now + min(RETRY_INTERVAL, self.intervals[key])
+                continue
+            market['last_fetch'] = datetime.now().isoformat(timespec='seconds')
+            self.next_due[key] = now + self.intervals[key]
+            if self._changed(key, result):
+                changed.append(key)
+        self.last_refresh = datetime.now()
+
+        if changed:
+            print(f"[DAEMON]... Marché(s) modifié(s) : {', '.join(changed)}")
+            # Matches déjà analysés, dans l'ordre habituel (1X2 en premier)
+            with self.metrics.timer('prepare'):
+                data = self.json_handler.assemble(
+                    (key, self.records[key]) for key in MARKETS if key in self.records
+                )
+            outputs = await save_outputs(data, self.json_handler, self.html_handler, self.metrics,
+                                         *self.output_options)
+            if outputs:
+                self.last_outputs = outputs
+        else:
+            fetched = [key for key in keys if key in results]
+            print(f"[DAEMON]... Aucun changement ({len(fetched)}/{len(keys)} page(s) rafraîchie(s))")
+        self.metrics.count('refreshes', changed='yes' if changed else 'no')
+        return changed
+
+    async def run(self):
+        async with LazyCrawler(make_browser_config()) as browser, \
+                HttpFetcher(max_connections=self.max_concurrency) as http:
+            while not self._stop.is_set():
+                keys = self.due()
+                if keys:
+                    try:
+                        await self.refresh(browser, http, keys)
+                        self.last_error = None
+                    except Exception as e:
+                        # Le service continue : les types concernés seront retentés
+                        self.last_error = f"{type(e).__name__}: {e}"
+                        print(f"[ERROR]... Rafraîchissement échoué : {self.last_error}")
+                        retry = time.monotonic() + RETRY_INTERVAL
+                        for key in keys:
+                            self.next_due[key] = max(self.next_due[key], retry)
+                delay = max(0.0, min(self.next_due.values()) - time.monotonic())
+                try:
+                    await asyncio.wait_for(self._stop.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    def healthy(self) -> bool:
+        """Au moins une page réussie, et un rafraîchissement récent"""
+        if self.last_refresh is None or not self.records:
+            return False
+        age = (datetime.now() - self.last_refresh).total_seconds()
+        return age <= 2 * max(self.intervals.values())
+
+    def status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'healthy': self.healthy(),
+            'last_refresh': self.last_refresh.isoformat(timespec='seconds') if self.last_refresh else None,
+            'last_outputs': self.last_outputs,
+            'last_error': self.last_error,
+            'markets': {
+                key: {**market, 'interval': self.intervals[key],
+                      'next_refresh_in': round(max(0.0, self.next_due[key] - now), 1)}
+                for key, market in self.markets.items()
+            }
+        }
+
+    async def start_server(self, host: str = STATUS_HOST, port: int = STATUS_PORT) -> web.AppRunner:
+        async def health(request):
+            healthy = self.healthy()
+            return web.json_response({'status': 'ok' if healthy else 'stale'}, status=200 if healthy else 503)
+
+        async def status(request):
+            return web.json_response(self.status())
+
+        async def metrics(request):
+            return web.Response(text=self.metrics.to_prometheus(), content_type='text/plain')
+
+        app = web.Application()
+        app.router.add_get('/health', health)
+        app.router.add_get('/status', status)
+        app.router.add_get('/metrics', metrics)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        print(f"[DAEMON]... État disponible sur http://{host}:{port}/status")
+        return runner
+
+
+async def serve(daemon: PredictionDaemon, host: str = STATUS_HOST, port: int = STATUS_PORT):
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, daemon.stop)
+    runner = await daemon.start_server(host, port)
+    try:
+        await daemon.run()
+    finally:
+        await runner.cleanup()
+        print("[DAEMON]... Arrêt du service")
+
+
+def parse_interval(text: str):
+    key, _, seconds = text.partition('=')
+    key = key.replace('-', '_')
+    if key not in MARKETS or not seconds:
+        raise argparse.ArgumentTypeError(f"attendu TYPE=SECONDES avec TYPE parmi {', '.join(MARKETS)}")
+    return key, float(seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rafraîchit les prédictions en continu avec un navigateur gardé ouvert")
+    parser.add_argument('--interval', type=parse_interval, action='append', default=[], metavar='TYPE=SECONDES',
+                        help="intervalle de rafraîchissement d'un type (ex: 1x2=600), répétable")
+    parser.add_argument('--default-interval', type=float, default=DEFAULT_INTERVAL,
+                        help=f"intervalle des autres types, en secondes (défaut : {DEFAULT_INTERVAL})")
+    parser.add_argument('--host', default=STATUS_HOST, help=f"adresse du serveur d'état (défaut : {STATUS_HOST})")
+    parser.add_argument('--port', type=int, default=STATUS_PORT, help=f"port du serveur d'état (défaut : {STATUS_PORT})")
+    parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENT_PAGES,
+                        help=f"nombre maximum de pages chargées en parallèle (défaut : {MAX_CONCURRENT_PAGES})")
+    parser.add_argument('--backend', type=parse_backend, action='append', default=[], metavar='[TYPE=]BACKEND',
+                        help=f"backend de récupération : BACKEND pour toutes les pages (défaut : {DEFAULT_BACKEND}) "
+                             f"ou TYPE=BACKEND pour un seul type (ex: goalscorer=browser), répétable")
+    parser.add_argument('--site-dir', default=None, help="génère aussi le site multi-pages dans ce dossier")
+    parser.add_argument('--fixtures', action='store_true', help="écrit aussi l'index des rencontres")
+    parser.add_argument('--history-db', default=None, help="ajoute chaque snapshot modifié à cette base SQLite")
+    parser.add_argument('--delta-dir', default=None, help="écrit des deltas dans ce dossier au lieu du JSON complet")
+    parser.add_argument('--search', action='store_true',
+                        help=f"ajoute un champ de recherche à la page HTML (index écrit dans {SEARCH_DIR}/)")
+    parser.add_argument('--verbose', action='store_true', help="affiche les messages de débogage")
+    args = parser.parse_args()
+
+    default_backend, backends = backend_options(args.backend)
+    daemon = PredictionDaemon(dict(args.interval), args.default_interval, args.concurrency,
+                              default_backend=default_backend, backends=backends, site_dir=args.site_dir, fixtures=args.fixtures,
+                              history_db=args.history_db, delta_dir=args.delta_dir, search=args.search,
+                              verbose=args.verbose)
+    asyncio.run(serve(daemon, args.host, args.port))
@@ -0,0 +1,146 @@
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from match_record import KICKOFF_FORMAT, MatchRecord, as_records
+
+FixtureKey = Tuple[str, Union[datetime, str], str, str]
+
+
+class Fixture:
+    """Un match et les prédictions de tous ses marchés"""
+
+    __slots__ = ('id', 'league', 'kickoff', 'home_team', 'away_team', 'markets')
+
+    def __init__(self, fixture_id: int, record: MatchRecord):
+        self.id = fixture_id
+        self.league = record.league
+        self.kickoff = record.kickoff
+        self.home_team = record.home_team
+        self.away_team = record.away_team
+        # type de prédiction -> enregistrement du marché
+        self.markets: Dict[str, MatchRecord] = {}
+
+    @property
+    def date(self) -> Optional[date]:
+        return self.kickoff.date() if self.kickoff else None
+
+    def __repr__(self) -> str:
+        return f"Fixture({self.id}, {self.league!r}, {self.home_team!r}, {self.away_team!r}, {sorted(self.markets)})"
+
+
+class FixtureIndex:
+    """Index des matches regroupant tous les marchés d'une même rencontre.
+
+    Chaque rencontre est identifiée par (ligue, coup d'envoi, domicile,
+    extérieur) et n'apparaît qu'une fois, avec les cotes de chaque marché.
+    Les recherches par clé, ligue, équipe et date sont en O(1).
+
+    `sections` regroupe aussi les enregistrements par marché puis par
+    ligue, dans leur ordre d'ajout : c'est la structure des pages HTML.
+    """
+
+    def __init__(self):
+        self.fixtures: List[Fixture] = []
+        self._by_key: Dict[FixtureKey, Fixture] = {}
+        self._by_league: Dict[str, List[Fixture]] = {}
+        self._by_team: Dict[str, List[Fixture]] = {}
+        self._by_date: Dict[date, List[Fixture]] = {}
+        # type de prédiction -> ligue -> enregistrements
+        self.sections: Dict[str, Dict[str, List[MatchRecord]]] = {}
+
+    @classmethod
+    def from_matches(cls, matches: Iterable[Union[MatchRecord, Dict]],
+                     reference: Optional[datetime] = None) -> 'FixtureIndex':
+        index = cls()
+        for record in as_records(matches, reference):
+            index.add(record)
+        return index
+
+    @staticmethod
+    def key(record: Union[MatchRecord, Fixture]) -> FixtureKey:
+        kickoff = record.kickoff if record.kickoff is not None else record.datetime
+        return record.league, kickoff, record.home_team, record.away_team
+
+    def add(self, record: MatchRecord) -> Fixture:
+        key = self.key(record)
+        fixture = self._by_key.get(key)
+        if fixture is None:
+            fixture = Fixture(len(self.fixtures), record)
+            self.fixtures.append(fixture)
+            self._by_key[key] = fixture
+            self._by_league.setdefault(fixture.league, []).append(fixture)
+            for team in (fixture.home_team, fixture.away_team):
+                if team:
+                    self._by_team.setdefault(team.lower(), []).append(fixture)
+            if fixture.date:
+                self._by_date.setdefault(fixture.date, []).append(fixture)
+        fixture.markets[record.prediction_type] = record
+        self.sections.setdefault(record.prediction_type, {}).setdefault(record.league, []).append(record)
+        return fixture
+
+    def get(self, league: str, kickoff: Union[datetime, str], home_team: str,
+            away_team: str = '') -> Optional[Fixture]:
+        return self._by_key.get((league, kickoff, home_team, away_team))
+
+    def fixture_of(self, record: MatchRecord) -> Optional[Fixture]:
+        """Rencontre à laquelle appartient un enregistrement de marché"""
+        return self._by_key.get(self.key(record))
+
+    def by_league(self, league: str) -> List[Fixture]:
+        return self._by_league.get(league, [])
+
+    def by_team(self, team: str) -> List[Fixture]:
+        return self._by_team.get(team.lower(), [])
+
+    def by_date(self, day: date) -> List[Fixture]:
+        return self._by_date.get(day, [])
+
+    @property
+    def leagues(self) -> List[str]:
+        return list(self._by_league)
+
+    def records(self) -> Iterator[MatchRecord]:
+        """Tous les enregistrements de marché, rencontre par rencontre"""
+        for fixture in self.fixtures:
+            yield from fixture.markets.values()
+
+    def __len__(self) -> int:
+        return len(self.fixtures)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Format normalisé : chaque ligue et chaque rencontre n'apparaissent qu'une fois"""
+        league_ids = {league: i for i, league in enumerate(self._by_league)}
+        fixtures = []
+        for fixture in self.fixtures:
+            any_record = next(iter(fixture.markets.values()))
+            entry = {
+                'id': fixture.id,
+                'league': league_ids[fixture.league],
+                'kickoff': fixture.kickoff.isoformat(timespec='minutes') if fixture.kickoff else any_record.datetime,
+                'home': fixture.home_team,
+                'away': fixture.away_team,
+                'markets': {pred_type: record.odds for pred_type, record in fixture.markets.items()}
+            }
+            info = {pred_type: record.info for pred_type, record in fixture.markets.items() if record.info}
+            if info:
+                entry['info'] = info
+            fixtures.append(entry)
+        return {'leagues': list(league_ids), 'fixtures': fixtures}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'FixtureIndex':
+        index = cls()
+        leagues = data['leagues']
+        for entry in data['fixtures']:
+            try:
+                kickoff = datetime.fromisoformat(entry['kickoff'])
+                datetime_text = kickoff.strftime(KICKOFF_FORMAT)
+            except ValueError:
+                kickoff, datetime_text = None, entry['kickoff']
+            info = entry.get('info', {})
+            for pred_type, odds in entry['markets'].items():
+                index.add(MatchRecord(
+                    leagues[entry['league']], datetime_text, entry['home'], entry['away'],
+                    pred_type, odds, info.get(pred_type), kickoff or datetime.now()
+                ))
+        return index
@@ -0,0 +1,176 @@
+import argparse
+import glob
+import json
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from match_record import as_records
+
+HISTORY_DB = 'history.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    taken_at TEXT NOT NULL UNIQUE,
+    url TEXT
+);
+CREATE TABLE IF NOT EXISTS leagues (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS teams (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+-- Une ligne par cote : (snapshot, match, marché, sélection)
+CREATE TABLE IF NOT EXISTS odds (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    kickoff TEXT,
+    league_id INTEGER NOT NULL REFERENCES leagues(id),
+    home_id INTEGER NOT NULL REFERENCES teams(id),
+    away_id INTEGER REFERENCES teams(id),
+    market TEXT NOT NULL,
+    selection TEXT NOT NULL,
+    price REAL,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS odds_kickoff ON odds(kickoff);
+CREATE INDEX IF NOT EXISTS odds_league_kickoff ON odds(league_id, kickoff);
+CREATE INDEX IF NOT EXISTS odds_market_kickoff ON odds(market, kickoff);
+CREATE INDEX IF NOT EXISTS odds_snapshot ON odds(snapshot_id);
+"""
+
+ScanRow = Tuple[str, Optional[str], str, str, Optional[str], str, str, Optional[float], Optional[str]]
+
+
+class HistoryStore:
+    """Historique des snapshots dans une base SQLite, en ajout seul.
+
+    Chaque cote est une ligne indexée par coup d'envoi, ligue et marché :
+    un parcours d'une saison filtré sur une ligue ou un marché ne lit que
+    les lignes concernées, sans ouvrir aucun fichier JSON.
+    """
+
+    def __init__(self, path: str = HISTORY_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        self._ids: Dict[Tuple[str, str], int] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _id(self, table: str, name: str) -> int:
+        key = (table, name)
+        if key not in self._ids:
+            self.conn.execute(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", (name,))
+            self._ids[key] = self.conn.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()[0]
+        return self._ids[key]
+
+    def append(self, data: Dict[str, Any]) -> Optional[int]:
+        """Ajoute un snapshot (données de `prepare_data` ou d'un fichier JSON).
+
+        Un snapshot déjà présent (même horodatage) est ignoré ; retourne
+        l'identifiant du snapshot ajouté, ou None.
+        """
+        taken_at = data['metadata']['timestamp']
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO snapshots (taken_at, url) VALUES (?, ?)", (taken_at, data.get('url'))
+            )
+            if not cursor.rowcount:
+                return None
+            snapshot_id = cursor.lastrowid
+            self.conn.executemany(
+                "INSERT INTO odds VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._rows(snapshot_id, data['matches'], datetime.fromisoformat(taken_at))
+            )
+        return snapshot_id
+
+    def _rows(self, snapshot_id: int, matches: Iterable, reference: datetime) -> Iterator[tuple]:
+        for record in as_records(matches, reference):
+            kickoff = record.kickoff.isoformat(timespec='minutes') if record.kickoff else None
+            league_id = self._id('leagues', record.league)
+            home_id = self._id('teams', record.home_team)
+            away_id = self._id('teams', record.away_team) if record.away_team else None
+            for selection, value in zip(record.odds_keys, record.odds_values):
+                if value is None:
+                    continue
+                price, text = (value, None) if isinstance(value, float) else (None, value)
+                yield (snapshot_id, kickoff, league_id, home_id, away_id,
+                       record.prediction_type, selection, price, text)
+
+    def import_json(self, paths: Iterable[str]) -> int:
+        """Importe des snapshots JSON existants ; retourne le nombre de snapshots ajoutés"""
+        added = 0
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                if self.append(json.load(f)) is not None:
+                    added += 1
+                    print(f"[HISTORY]... ✓ {path} importé")
+        return added
+
+    def scan(self, start: Optional[str] = None, end: Optional[str] = None,
+             league: Optional[str] = None, market: Optional[str] = None) -> Iterator[ScanRow]:
+        """Parcourt les cotes dont le coup d'envoi est dans [start, end[ (dates ISO).
+
+        Chaque ligne vaut (snapshot, coup d'envoi, ligue, domicile,
+        extérieur, marché, sélection, cote, valeur texte).
+        """
+        clauses, params = [], []
+        if start:
+            clauses.append("o.kickoff >= ?")
+            params.append(start)
+        if end:
+            clauses.append("o.kickoff < ?")
+            params.append(end)
+        if league:
+            clauses.append("l.name = ?")
+            params.append(league)
+        if market:
+            clauses.append("o.market = ?")
+            params.append(market)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.conn.execute(f"""
+            SELECT s.taken_at, o.kickoff, l.name, h.name, a.name, o.market, o.selection, o.price, o.value
+            FROM odds o
+            JOIN snapshots s ON s.id = o.snapshot_id
+            JOIN leagues l ON l.id = o.league_id
+            JOIN teams h ON h.id = o.home_id
+            LEFT JOIN teams a ON a.id = o.away_id
+            {where}
+            ORDER BY o.kickoff, s.taken_at
+        """, params)
+
+    def snapshots(self) -> Iterator[Tuple[int, str]]:
+        return self.conn.execute("SELECT id, taken_at FROM snapshots ORDER BY taken_at")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Historique des prédictions (SQLite)")
+    parser.add_argument('--db', default=HISTORY_DB, help=f"base SQLite (défaut : {HISTORY_DB})")
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_cmd = commands.add_parser('import', help="importe des snapshots JSON")
+    import_cmd.add_argument('pattern', nargs='?', default='football_predictions_*.json')
+    query_cmd = commands.add_parser('query', help="affiche les cotes d'une période")
+    query_cmd.add_argument('--start', help="date de début incluse (AAAA-MM-JJ)")
+    query_cmd.add_argument('--end', help="date de fin exclue (AAAA-MM-JJ)")
+    query_cmd.add_argument('--league')
+    query_cmd.add_argument('--market')
+    args = parser.parse_args()
+
+    with HistoryStore(args.db) as store:
+        if args.command == 'import':
+            added = store.import_json(sorted(glob.glob(args.pattern)))
+            print(f"[HISTORY]... {added} snapshot(s) ajouté(s) à {args.db}")
+        else:
+            for row in store.scan(args.start, args.end, args.league, args.market):
+                print(' | '.join('' if value is None else str(value) for value in row))
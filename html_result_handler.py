@@ -1,82 +1,414 @@
+import hashlib
 import json
+import os
+import time
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from pathlib import Path
 
+from fixture_index import FixtureIndex
+from markets import MARKETS, get_market
+from match_record import MatchRecord, split_teams
+from metrics import Metrics
+from search_index import build_search_index
+
+# Fragments statiques de la page, définis une seule fois et assemblés par
+# `HtmlResultHandler.iter_html` (les accolades des gabarits sont des champs `str.format`)
+PAGE_HEAD = """
+        <!DOCTYPE html>
+        <html lang="fr">
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <meta name="description" content="Prédictions de football mises à jour quotidiennement">
+            <meta name="keywords" content="football, prédictions, paris sportifs, 1X2, match du jour">
+            <title>Prédictions Football</title>
+            <link rel="icon" type="image/png" href="data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAACAAAAAgCAYAAABzenr0AAAABHNCSVQICAgIfAhkiAAAAAlwSFlzAAAA7AAAAOwBeShxvQAAABl0RVh0U29mdHdhcmUAd3d3Lmlua3NjYXBlLm9yZ5vuPBoAAAL0SURBVFiF7ZdNiFZVGMd/z7lvM42NhY0fA4MutJAkyGhRi8BGELJFuBKCFi1aJERBq2jTIoQgaBG0CTdBQUSrwE0QgRQYFhFE0YczfeAwOvk5fszce57/LO6dO/e+7zsz7zsK0R8u73PO89zz/M/5P+c+F/7nyCRO9UTjBVWdrar3i8hDqtopIjNF5JKInBeR4yLyg4gcCcPwz4bxVPV+EXlYVeeJyF0iclNELovISVX9XkQOh2F4pZ58Mj4+Xv2uqpOBV4EPgKmN5r4JfAG8HgTB9VqnariqPgp8BsxpGLk2TgEbwjD8thp+W3hVXQZ8STp4D7BWVR9Q1WlZTFWdpqoPqupaYA/pAr0LfKWqK6rhN9OiqncCx4BZwDFgUxiGh+sEfwxYD6wApgC/AcvDMDyTjlmiqn3ALcABngzD8GS1r6r2AHuBhcBBYEMYhtfrwMeBd4AngWnACWB1GIbHq2IsBl4SkS4R6QF2A6+EYXiz2i8Mw9+BZ4HfgUXA+8BzqjqnTowlwOfAbOAQ8EwYhhdvg6vqVBHZAXwI3AF8DKyqhkMy+L8iskFVHwO+A7qAT1V1ZaOJUtX1wA5gMvApsD4Mw5Fa/qp6l4h8A7wNBMAHYRi+VM8XoA/oBw4Aa8MwHK3nXIVfCewCWoFdwAtBEIzV81fVNuBLYDlwGFgThuGlevFUdTqwG1gKHAfWhWF4oZG/iMwQkb3AE8CvwKowDH9q5J+JsQzYCUwBvgaeDcNwqFEMVZ0L7APmAWeA1WEY/tJovExz+oEW4AtgfRiGN+r5q2oH8BmwGhgBXg3DcHsz8TPNOQTcC+wHng/DcKSWv6q2Ax8BzwEjwFtBEHzUbPxMc34E7gH2Ak83gk8D9gGPAkPApjAMP24mfhZjPnAEaAfeBd5oYPk7gS3AJmAMeDsMw/ebja+qU0TkbRG5ISKbReT5IAj+quXfjOZkPu0i8qSI9IrIYhGZKSKXROSciPwsIj+JyNEgCP5uNt7/HP8A/ZmTxKiQ+lMAAAAASUVORK5CYII=">
+            """
+PAGE_HEADER = """
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>⚽ Prédictions Football</h1>
+                    <p>Mis à jour le """
+PAGE_NAV = """</p>
+                </div>
+
+                <div class="predictions-nav">
+        """
+NAV_BUTTON = """
+                    <button class="prediction-type-btn" data-type="{pred_type}" onclick="showPrediction('{pred_type}')">
+                        {icon} {name}
+                    </button>
+                """
+NAV_END = """
+                </div>
+        """
+SECTION_START = """
+                <div id="{pred_type}" class="prediction-section">
+                    <div class="prediction-header">
+                        <h2>{icon} {name}</h2>
+                        <p class="prediction-description">{description}</p>
+                    </div>
+            """
+SECTION_MARGIN = """
+                    <p class="prediction-margin">Marge moyenne du bookmaker : {overround:.1%}</p>
+            """
+SECTION_END = """
+                </div>
+            """
+PAGE_END = """
+                <script>
+                function showPrediction(predType) {
+                    // Cacher toutes les sections
+                    document.querySelectorAll('.prediction-section').forEach(section => {
+                        section.classList.remove('active');
+                    });
+                    // Afficher la section sélectionnée
+                    document.getElementById(predType).classList.add('active');
+                    
+                    // Mettre à jour les boutons
+                    document.querySelectorAll('.prediction-type-btn').forEach(btn => {
+                        btn.classList.remove('active');
+                    });
+                    event.target.classList.add('active');
+                }
+
+                // Afficher la première section au chargement
+                document.addEventListener('DOMContentLoaded', function() {
+                    const firstButton = document.querySelector('.prediction-type-btn');
+                    if (firstButton) {
+                        firstButton.click();
+                    }
+                });
+                </script>
+            </div>
+        </body>
+        </html>
+        """
+LEAGUE_START = """
+            <div class="league-section">
+                <div class="league-header">
+                    <h2>🏆 {league_name}</h2>
+                </div>
+                <table>
+                    <thead>
+                        <tr>
+                            <th>Heure</th>
+                            <th>Match</th>
+                            <th>Cotes</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+        """
+MATCH_ROW = """
+                        <tr data-fixture="{fixture_id}">
+                            <td>{datetime}</td>
+                            <td>
+                                <div class="match-teams">
+                                    <span class="team-home">{home_team}</span>
+                                    <span class="vs">vs</span>
+                                    <span class="team-away">{away_team}</span>
+                                </div>
+                            </td>
+                            <td>
+                                <div class="odds-container">
+                                    {odds_html}
+                                </div>
+                            </td>
+                        </tr>
+            """
+LEAGUE_END = """
+                    </tbody>
+                </table>
+            </div>
+        """
+
+# Recherche par équipe, ligue ou date dans un index chargé à la demande (voir `search_index.py`)
+SEARCH_PREFIX = "football_search"
+# Dossier des index de recherche des pages autonomes : sortie de build, jamais versionnée
+SEARCH_DIR = "search"
+SEARCH_BOX = """
+                <div class="search-box">
+                    <input type="search" id="search-input" data-src="{index_src}" autocomplete="off"
+                           placeholder="Rechercher une équipe, une ligue ou une date (jj/mm)">
+                    <ul id="search-results"></ul>
+                </div>
+        """
+SEARCH_CSS = """
+        .search-box {
+            background: white;
+            padding: 15px;
+            border-radius: 8px;
+            margin-bottom: 20px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }
+
+        #search-input {
+            width: 100%;
+            box-sizing: border-box;
+            padding: 10px;
+            border: 1px solid var(--border-color);
+            border-radius: 4px;
+            font-size: 1em;
+        }
+
+        #search-results {
+            list-style: none;
+            margin: 0;
+            padding: 0;
+        }
+
+        #search-results li {
+            padding: 8px 0;
+            border-bottom: 1px solid var(--border-color);
+        }
+
+        #search-results button {
+            margin: 5px 5px 0 0;
+            padding: 4px 8px;
+            border: none;
+            border-radius: 4px;
+            background: #f0f2f5;
+            cursor: pointer;
+        }
+
+        tr.search-hit {
+            background-color: #fff3cd;
+        }
+        """
+SEARCH_SCRIPT = r"""(function () {
+    var input = document.getElementById('search-input');
+    var list = document.getElementById('search-results');
+    var MAX_RESULTS = 20;
+    var index = null;
+    var loading = null;
+
+    // Même normalisation et même découpage que `search_index.py`
+    function normalize(text) {
+        return text.toLowerCase().normalize('NFKD').replace(/[\u0300-\u036f]/g, '');
+    }
+
+    function tokens(text) {
+        return normalize(text).match(/[a-z0-9]+(?:[\/-][0-9]+)*/g) || [];
+    }
+
+    function load() {
+        if (!loading) {
+            loading = fetch(input.dataset.src)
+                .then(function (response) {
+                    if (!response.ok) {
+                        throw new Error(response.status);
+                    }
+                    return response.json();
+                })
+                .then(function (data) {
+                    index = data;
+                })
+                .catch(function () {
+                    loading = null;
+                });
+        }
+        return loading;
+    }
+
+    // Rencontres dont un mot commence par `prefix` : dichotomie dans les mots triés
+    function lookup(prefix) {
+        var terms = index.terms;
+        var low = 0;
+        var high = terms.length;
+        while (low < high) {
+            var mid = (low + high) >> 1;
+            if (terms[mid] < prefix) {
+                low = mid + 1;
+            } else {
+                high = mid;
+            }
+        }
+        var ids = new Set();
+        for (var i = low; i < terms.length && terms[i].lastIndexOf(prefix, 0) === 0; i++) {
+            index.postings[i].forEach(function (id) {
+                ids.add(id);
+            });
+        }
+        return ids;
+    }
+
+    // Chaque mot saisi doit correspondre : intersection des rencontres trouvées
+    function search(query) {
+        var found = null;
+        tokens(query).forEach(function (word) {
+            var ids = lookup(word);
+            found = found === null ? ids : new Set(Array.from(found).filter(function (id) {
+                return ids.has(id);
+            }));
+        });
+        return found === null ? [] : Array.from(found).sort(function (a, b) {
+            return a - b;
+        });
+    }
+
+    function navButton(predType) {
+        return document.querySelector('.prediction-type-btn[data-type="' + predType + '"]');
+    }
+
+    // Affiche le marché et met la rencontre en évidence ; dans le site
+    // multi-pages, la section peut être en cours de chargement
+    function open(predType, id) {
+        var button = navButton(predType);
+        if (button) {
+            button.click();
+        }
+        var tries = 0;
+        (function highlight() {
+            var section = document.getElementById(predType);
+            var row = section && section.querySelector('tr[data-fixture="' + id + '"]');
+            if (row) {
+                document.querySelectorAll('tr.search-hit').forEach(function (hit) {
+                    hit.classList.remove('search-hit');
+                });
+                row.classList.add('search-hit');
+                row.scrollIntoView({behavior: 'smooth', block: 'center'});
+            } else if (tries++ < 100) {
+                setTimeout(highlight, 50);
+            }
+        })();
+    }
+
+    function message(text) {
+        var item = document.createElement('li');
+        item.textContent = text;
+        list.appendChild(item);
+    }
+
+    function render(ids) {
+        list.innerHTML = '';
+        ids.slice(0, MAX_RESULTS).forEach(function (id) {
+            var fixture = index.fixtures[id];
+            var item = document.createElement('li');
+            var title = document.createElement('div');
+            title.textContent = fixture[1] + ' · ' + fixture[2] + (fixture[3] ? ' vs ' + fixture[3] : '')
+                + ' · ' + index.leagues[fixture[0]];
+            item.appendChild(title);
+            fixture[4].forEach(function (market) {
+                var predType = index.markets[market];
+                var button = navButton(predType);
+                var link = document.createElement('button');
+                link.textContent = button ? button.textContent.trim() : predType;
+                link.addEventListener('click', function () {
+                    open(predType, id);
+                });
+                item.appendChild(link);
+            });
+            list.appendChild(item);
+        });
+        if (ids.length > MAX_RESULTS) {
+            message('… ' + (ids.length - MAX_RESULTS) + ' autre(s) rencontre(s)');
+        } else if (!ids.length && input.value.trim()) {
+            message('Aucune rencontre trouvée');
+        }
+    }
+
+    if (input) {
+        input.addEventListener('focus', load);
+        input.addEventListener('input', function () {
+            load().then(function () {
+                if (index) {
+                    render(search(input.value));
+                }
+            });
+        });
+    }
+})();
+"""
+
+# Version multi-pages (voir `HtmlResultHandler.save_site`)
+HASH_LENGTH = 10
+SITE_NAV_BUTTON = """
+                    <button class="prediction-type-btn" data-type="{pred_type}" data-src="{src}">
+                        {icon} {name}
+                    </button>
+                """
+SITE_END = """
+                <div id="predictions"></div>
+                <script src="{script_src}" defer></script>
+            </div>
+        </body>
+        </html>
+        """
+SITE_CSS = """
+        .loading {
+            text-align: center;
+            color: #666;
+            padding: 20px;
+        }
+        """
+SITE_SCRIPT = """(function () {
+    // Fragments déjà demandés, par type de prédiction
+    var requests = {};
+    var container = document.getElementById('predictions');
+
+    function show(button) {
+        var predType = button.dataset.type;
+        document.querySelectorAll('.prediction-type-btn').forEach(function (btn) {
+            btn.classList.toggle('active', btn === button);
+        });
+        document.querySelectorAll('.prediction-section').forEach(function (section) {
+            section.classList.toggle('active', section.id === predType);
+        });
+        if (requests[predType]) {
+            return;
+        }
+        container.classList.add('loading');
+        requests[predType] = fetch(button.dataset.src)
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.status);
+                }
+                return response.text();
+            })
+            .then(function (html) {
+                container.insertAdjacentHTML('beforeend', html);
+                var section = document.getElementById(predType);
+                if (section && button.classList.contains('active')) {
+                    section.classList.add('active');
+                }
+            })
+            .catch(function () {
+                delete requests[predType];
+            })
+            .finally(function () {
+                container.classList.remove('loading');
+            });
+    }
+
+    document.querySelectorAll('.prediction-type-btn').forEach(function (button) {
+        button.addEventListener('click', function () {
+            show(button);
+        });
+    });
+
+    // Afficher la première section au chargement
+    var firstButton = document.querySelector('.prediction-type-btn');
+    if (firstButton) {
+        show(firstButton);
+    }
+})();
+"""
+
 class HtmlResultHandler:
-    def __init__(self):
+    def __init__(self, verbose: bool = False, metrics: Optional[Metrics] = None, cache_sections: bool = False):
         self.filename_prefix = "football_predictions"
+        self.verbose = verbose
+        # Durée de rendu de chaque section, si fourni
+        self.metrics = metrics
+        # Dernière section rendue par type, avec ses entrées (voir `_section`) ; None : pas de cache
+        self.section_cache: Optional[Dict[str, Tuple[List[MatchRecord], tuple, str]]] = {} if cache_sections else None
+        # Icône, nom et description de chaque marché, dans l'ordre de la navigation (voir `markets.py`)
         self.prediction_types = {
-            '1x2': {
-                'icon': '🎯',
-                'name': '1X2',
-                'description': 'Paris sur le résultat final du match (Victoire, Nul, Défaite)'
-            },
-            'match_of_the_day': {
-                'icon': '🌟',
-                'name': 'Match du Jour',
-                'description': 'Sélection premium du jour avec la meilleure analyse'
-            },
-            'top10': {
-                'icon': '🔝',
-                'name': 'Top 10 Prédictions',
-                'description': 'Les 10 meilleures prédictions du jour'
-            },
-            'accumulator_tips': {
-                'icon': '💫',
-                'name': 'Combinés (ACCA)',
-                'description': 'Combinaisons de paris à forte valeur'
-            },
-            'ht_ft_tips': {
-                'icon': '⏱️',
-                'name': 'Mi-temps/Fin de match',
-                'description': 'Prédictions sur les scores à la mi-temps et fin de match'
-            },
-            'draw_no_bet': {
-                'icon': '🛡️',
-                'name': 'Draw No Bet (DNB)',
-                'description': 'Paris avec remboursement en cas de match nul'
-            },
-            'double_chance': {
-                'icon': '2️⃣',
-                'name': 'Double Chance',
-                'description': 'Deux résultats possibles sur trois'
-            },
-            'special': {
-                'icon': '✨',
-                'name': 'Prédictions Spéciales',
-                'description': 'Sélections spéciales avec analyse approfondie'
-            },
-            'goalscorer': {
-                'icon': '⚽',
-                'name': 'Buteurs',
-                'description': 'Prédictions sur les buteurs du match'
-            },
-            'both_teams_to_score': {
-                'icon': '🥅',
-                'name': 'Les Deux Équipes Marquent (BTTS)',
-                'description': 'Prédictions sur les buts des deux équipes'
-            },
-            'correct_score': {
-                'icon': '📊',
-                'name': 'Score Exact',
-                'description': 'Prédictions du score final exact'
-            },
-            'cards': {
-                'icon': '🟨',
-                'name': 'Cartons',
-                'description': 'Prédictions sur les cartons jaunes et rouges'
-            },
-            'corners': {
-                'icon': '🚩',
-                'name': 'Corners',
-                'description': 'Prédictions sur le nombre de corners'
-            },
-            'goals': {
-                'icon': '⚽',
-                'name': 'Buts',
-                'description': 'Prédictions sur le nombre de buts'
-            }
+            key: {'icon': market.icon, 'name': market.name, 'description': market.description}
+            for key, market in MARKETS.items()
         }
         self.template_css = """
         :root {
@@ -284,213 +616,300 @@ class HtmlResultHandler:
             border-radius: 8px;
             box-shadow: 0 2px 4px rgba(0,0,0,0.1);
         }
+
+        .odd-box.value {
+            background: #d4edda;
+            color: #155724;
+        }
+
+        .prediction-margin {
+            color: #666;
+            font-size: 0.85em;
+            margin: -10px 0 20px;
+        }
         """
 
     def _split_teams(self, teams_str: str) -> tuple:
-        """Sépare la chaîne des équipes en équipe domicile et extérieur"""
-        # Supprimer les espaces inutiles
-        teams_str = teams_str.strip()
-        
-        # Trouver la position où la deuxième équipe commence
-        # en cherchant la première lettre majuscule après quelques caractères
-        for i in range(3, len(teams_str)):
-            if teams_str[i].isupper():
-                return teams_str[:i].strip(), teams_str[i:].strip()
-        
-        # Si pas de séparation trouvée, retourner la chaîne entière comme équipe domicile
-        return teams_str, ""
+        """Sépare la chaîne des équipes en équipe domicile et extérieur (anciens JSON)"""
+        return split_teams(teams_str)
 
     def generate_html(self, result_data: Dict) -> str:
-        print(f"[DEBUG] Available prediction types in data: {result_data['metadata']['prediction_types']}")
-        print(f"[DEBUG] Total matches: {len(result_data['matches'])}")
-        
-        # Grouper les matches par type de prédiction et par ligue
-        predictions_by_type = {}
-        for match in result_data['matches']:
-            pred_type = match['prediction_type']
-            if pred_type not in predictions_by_type:
-                predictions_by_type[pred_type] = {}
-            
-            league = match['league']
-            if league not in predictions_by_type[pred_type]:
-                predictions_by_type[pred_type][league] = []
-            
-            predictions_by_type[pred_type][league].append(match)
-
-        html = f"""
-        <!DOCTYPE html>
-        <html lang="fr">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <meta name="description" content="Prédictions de football mises à jour quotidiennement">
-            <meta name="keywords" content="football, prédictions, paris sportifs, 1X2, match du jour">
-            <title>Prédictions Football</title>
-            <link rel="icon" type="image/png" href="data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAACAAAAAgCAYAAABzenr0AAAABHNCSVQICAgIfAhkiAAAAAlwSFlzAAAA7AAAAOwBeShxvQAAABl0RVh0U29mdHdhcmUAd3d3Lmlua3NjYXBlLm9yZ5vuPBoAAAL0SURBVFiF7ZdNiFZVGMd/z7lvM42NhY0fA4MutJAkyGhRi8BGELJFuBKCFi1aJERBq2jTIoQgaBG0CTdBQUSrwE0QgRQYFhFE0YczfeAwOvk5fszce57/LO6dO/e+7zsz7zsK0R8u73PO89zz/M/5P+c+F/7nyCRO9UTjBVWdrar3i8hDqtopIjNF5JKInBeR4yLyg4gcCcPwz4bxVPV+EXlYVeeJyF0iclNELovISVX9XkQOh2F4pZ58Mj4+Xv2uqpOBV4EPgKmN5r4JfAG8HgTB9VqnariqPgp8BsxpGLk2TgEbwjD8thp+W3hVXQZ8STp4D7BWVR9Q1WlZTFWdpqoPqupaYA/pAr0LfKWqK6rhN9OiqncCx4BZwDFgUxiGh+sEfwxYD6wApgC/AcvDMDyTjlmiqn3ALcABngzD8GS1r6r2AHuBhcBBYEMYhtfrwMeBd4AngWnACWB1GIbHq2IsBl4SkS4R6QF2A6+EYXiz2i8Mw9+BZ4HfgUXA+8BzqjqnTowlwOfAbOAQ8EwYhhdvg6vqVBHZAXwI3AF8DKyqhkMy+L8iskFVHwO+A7qAT1V1ZaOJUtX1wA5gMvApsD4Mw5Fa/qp6l4h8A7wNBMAHYRi+VM8XoA/oBw4Aa8MwHK3nXIVfCewCWoFdwAtBEIzV81fVNuBLYDlwGFgThuGlevFUdTqwG1gKHAfWhWF4oZG/iMwQkb3AE8CvwKowDH9q5J+JsQzYCUwBvgaeDcNwqFEMVZ0L7APmAWeA1WEY/tJovExz+oEW4AtgfRiGN+r5q2oH8BmwGhgBXg3DcHsz8TPNOQTcC+wHng/DcKSWv6q2Ax8BzwEjwFtBEHzUbPxMc34E7gH2Ak83gk8D9gGPAkPApjAMP24mfhZjPnAEaAfeBd5oYPk7gS3AJmAMeDsMw/ebja+qU0TkbRG5ISKbReT5IAj+quXfjOZkPu0i8qSI9IrIYhGZKSKXROSciPwsIj+JyNEgCP5uNt7/HP8A/ZmTxKiQ+lMAAAAASUVORK5CYII=">
-            <style>{self.template_css}</style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>⚽ Prédictions Football</h1>
-                    <p>Mis à jour le {datetime.fromisoformat(result_data['metadata']['timestamp']).strftime('%d/%m/%Y à %H:%M')}</p>
-                </div>
+        return ''.join(self.iter_html(result_data))
 
-                <div class="predictions-nav">
+    def iter_html(self, result_data: Dict, search_src: Optional[str] = None,
+                  grouped: Optional[Tuple] = None) -> Iterator[str]:
+        """Produit la page HTML morceau par morceau.
+
+        Le temps de rendu est linéaire en nombre de matches et la page
+        complète n'est jamais construite en mémoire quand les morceaux sont
+        écrits directement dans un fichier (voir `save_result`).
+
+        Avec `search_src` (chemin de l'index de `search_index`), la page
+        contient un champ de recherche. `grouped` évite de regrouper à
+        nouveau les matches déjà passés à `_group_matches`.
         """
+        reference, predictions_by_type, fixtures = grouped or self._group_matches(result_data)
+        analytics = result_data.get('analytics') or {}
+
+        yield PAGE_HEAD
+        yield '<style>'
+        yield self.template_css
+        if search_src:
+            yield SEARCH_CSS
+        yield '</style>'
+        yield PAGE_HEADER
+        yield reference.strftime('%d/%m/%Y à %H:%M')
+        yield PAGE_NAV
 
         # Ajouter les boutons de navigation
         for pred_type, info in self.prediction_types.items():
             if pred_type in predictions_by_type:
-                html += f"""
-                    <button class="prediction-type-btn" onclick="showPrediction('{pred_type}')">
-                        {info['icon']} {info['name']}
-                    </button>
-                """
+                yield NAV_BUTTON.format(pred_type=pred_type, icon=info['icon'], name=info['name'])
 
-        html += """
-                </div>
-        """
+        yield NAV_END
+        if search_src:
+            yield SEARCH_BOX.format(index_src=search_src)
 
         # Générer les sections pour chaque type de prédiction
         for pred_type, leagues in predictions_by_type.items():
-            info = self.prediction_types[pred_type]
-            html += f"""
-                <div id="{pred_type}" class="prediction-section">
-                    <div class="prediction-header">
-                        <h2>{info['icon']} {info['name']}</h2>
-                        <p class="prediction-description">{info['description']}</p>
-                    </div>
-            """
-
-            for league_name, matches in leagues.items():
-                html += self._generate_league_section(league_name, matches)
-
-            html += """
-                </div>
-            """
-
-        # Ajouter le JavaScript pour la navigation
-        html += """
-                <script>
-                function showPrediction(predType) {
-                    // Cacher toutes les sections
-                    document.querySelectorAll('.prediction-section').forEach(section => {
-                        section.classList.remove('active');
-                    });
-                    // Afficher la section sélectionnée
-                    document.getElementById(predType).classList.add('active');
-                    
-                    // Mettre à jour les boutons
-                    document.querySelectorAll('.prediction-type-btn').forEach(btn => {
-                        btn.classList.remove('active');
-                    });
-                    event.target.classList.add('active');
-                }
-
-                // Afficher la première section au chargement
-                document.addEventListener('DOMContentLoaded', function() {
-                    const firstButton = document.querySelector('.prediction-type-btn');
-                    if (firstButton) {
-                        firstButton.click();
-                    }
-                });
-                </script>
-            </div>
-        </body>
-        </html>
+            section = self._section(pred_type, leagues, analytics, fixtures)
+            if self.metrics is not None:
+                section = self._timed(section, 'render', prediction_type=pred_type)
+            yield from section
+
+        # JavaScript de recherche et de navigation, fin de page
+        if search_src:
+            yield '<script>'
+            yield SEARCH_SCRIPT
+            yield '</script>'
+        yield PAGE_END
+
+    def _timed(self, chunks: Iterator[str], stage: str, **labels) -> Iterator[str]:
+        """Relaie `chunks` en ne chronométrant que leur production.
+
+        Le temps passé par le consommateur entre deux morceaux (écriture
+        du fichier, compression...) n'est pas compté dans l'étape.
         """
-        
-        return html
-
-    def _generate_league_section(self, league_name: str, matches: List[Dict]) -> str:
+        elapsed = 0.0
+        while True:
+            started = time.perf_counter()
+            chunk = next(chunks, None)
+            elapsed += time.perf_counter() - started
+            if chunk is None:
+                break
+            yield chunk
+        self.metrics.observe(stage, elapsed, **labels)
+
+    def _group_matches(self, result_data: Dict) -> Tuple[datetime, Dict[str, Dict[str, List[MatchRecord]]],
+                                                         FixtureIndex]:
+        """Matches par type de prédiction puis par ligue, et index des rencontres.
+
+        L'index construit par `prepare_data` (`result_data['fixtures']`)
+        est utilisé tel quel ; il n'est construit ici que pour des données
+        relues d'un fichier JSON.
+        """
+        if self.verbose:
+            print(f"[DEBUG] Available prediction types in data: {result_data['metadata']['prediction_types']}")
+            print(f"[DEBUG] Total matches: {len(result_data['matches'])}")
+
+        reference = datetime.fromisoformat(result_data['metadata']['timestamp'])
+        fixtures = result_data.get('fixtures')
+        if fixtures is None:
+            fixtures = FixtureIndex.from_matches(result_data['matches'], reference)
+        return reference, fixtures.sections, fixtures
+
+    def search_index(self, predictions_by_type: Dict[str, Dict[str, List[MatchRecord]]],
+                     fixtures: FixtureIndex) -> Dict[str, Any]:
+        """Index de recherche des rencontres, les marchés dans l'ordre de la navigation"""
+        markets = [pred_type for pred_type in self.prediction_types if pred_type in predictions_by_type]
+        return build_search_index(fixtures, markets, self._split_teams)
+
+    def _iter_section(self, pred_type: str, leagues: Dict[str, List[MatchRecord]], analytics: Optional[Dict],
+                      fixtures: FixtureIndex) -> Iterator[str]:
+        info = self.prediction_types[pred_type]
+        yield SECTION_START.format(
+            pred_type=pred_type, icon=info['icon'], name=info['name'], description=info['description']
+        )
+
+        # Résultats de `odds_analytics.analyze`, s'ils sont présents dans les données
+        analytics = analytics or {}
+        overround = analytics.get('markets', {}).get(pred_type, {}).get('overround')
+        if overround is not None:
+            yield SECTION_MARGIN.format(overround=overround)
+        values = self._value_selections(analytics, pred_type)
+
+        for league_name, matches in leagues.items():
+            yield from self._iter_league_section(league_name, matches, fixtures, values)
+
+        yield SECTION_END
+
+    def _section(self, pred_type: str, leagues: Dict[str, List[MatchRecord]], analytics: Optional[Dict],
+                 fixtures: FixtureIndex) -> Iterator[str]:
+        """Morceaux HTML d'une section, repris du cache si ses entrées n'ont pas changé.
+
+        Sans cache, la section est produite au fil de l'eau. Avec cache
+        (`cache_sections`, utilisé par le daemon), elle est réutilisée tant
+        que ses enregistrements sont les mêmes objets (un marché non
+        rafraîchi garde ses `MatchRecord`), que leurs identifiants de
+        rencontre et que les analyses du marché sont inchangés : seuls les
+        marchés modifiés sont rendus à nouveau.
+        """
+        if self.section_cache is None:
+            return self._iter_section(pred_type, leagues, analytics, fixtures)
+        analytics = analytics or {}
+        records = [match for matches in leagues.values() for match in matches]
+        inputs = (list(leagues), [fixtures.fixture_of(match).id for match in records],
+                  analytics.get('markets', {}).get(pred_type), self._value_selections(analytics, pred_type))
+        cached = self.section_cache.get(pred_type)
+        if (cached is not None and len(cached[0]) == len(records)
+                and all(old is new for old, new in zip(cached[0], records)) and cached[1] == inputs):
+            if self.metrics is not None:
+                self.metrics.count('sections_reused', prediction_type=pred_type)
+            return iter((cached[2],))
+        html = ''.join(self._iter_section(pred_type, leagues, analytics, fixtures))
+        # Les enregistrements sont gardés avec la section : leur identité reste valable
+        self.section_cache[pred_type] = (records, inputs, html)
+        return iter((html,))
+
+    def _generate_league_section(self, league_name: str, matches: List[MatchRecord], fixtures: FixtureIndex) -> str:
         """Génère le HTML pour une section de ligue"""
-        html = f"""
-            <div class="league-section">
-                <div class="league-header">
-                    <h2>🏆 {league_name}</h2>
-                </div>
-                <table>
-                    <thead>
-                        <tr>
-                            <th>Heure</th>
-                            <th>Match</th>
-                            <th>Cotes</th>
-                        </tr>
-                    </thead>
-                    <tbody>
+        return ''.join(self._iter_league_section(league_name, matches, fixtures))
+
+    @staticmethod
+    def _value_selections(analytics: Dict, pred_type: str) -> Dict[Tuple[str, str, str], set]:
+        """Sélections signalées comme value, par (ligue, heure, équipes)"""
+        values = {}
+        for bet in analytics.get('value_bets', []):
+            if bet['prediction_type'] == pred_type:
+                values.setdefault((bet['league'], bet['datetime'], bet['teams']), set()).add(bet['selection'])
+        return values
+
+    def _iter_league_section(self, league_name: str, matches: List[MatchRecord], fixtures: FixtureIndex,
+                             values: Optional[Dict[Tuple[str, str, str], set]] = None) -> Iterator[str]:
+        """Génère les lignes d'une ligue.
+
+        `fixtures` donne l'identifiant de rencontre de chaque ligne
+        (attribut `data-fixture`, utilisé par la recherche).
         """
-        
+        values = values or {}
+        yield LEAGUE_START.format(league_name=league_name)
+
         for match in matches:
-            home_team, away_team = self._split_teams(match['teams'])
-            
+            # Les équipes sont séparées à l'analyse ; seuls les anciens JSON les ont concaténées
+            if match.away_team:
+                home_team, away_team = match.home_team, match.away_team
+            else:
+                home_team, away_team = self._split_teams(match.home_team)
+
             # Générer l'affichage des cotes selon le type de prédiction
-            odds_html = self._generate_odds_html(match)
-            
-            html += f"""
-                        <tr>
-                            <td>{match['datetime']}</td>
-                            <td>
-                                <div class="match-teams">
-                                    <span class="team-home">{home_team}</span>
-                                    <span class="vs">vs</span>
-                                    <span class="team-away">{away_team}</span>
-                                </div>
-                            </td>
-                            <td>
-                                <div class="odds-container">
-                                    {odds_html}
-                                </div>
-                            </td>
-                        </tr>
-            """
+            yield MATCH_ROW.format(
+                fixture_id=fixtures.fixture_of(match).id,
+                datetime=match.datetime,
+                home_team=home_team,
+                away_team=away_team,
+                odds_html=self._generate_odds_html(match, values.get((match.league, match.datetime, match.teams), ()))
+            )
 
-        html += """
-                    </tbody>
-                </table>
-            </div>
+        yield LEAGUE_END
+
+    def _generate_odds_html(self, match: MatchRecord, value_selections=()) -> str:
+        """Génère le HTML pour les cotes selon le type de prédiction.
+
+        Les sélections de `value_selections` sont mises en évidence.
         """
-        return html
-
-    def _generate_odds_html(self, match: Dict) -> str:
-        """Génère le HTML pour les cotes selon le type de prédiction"""
-        prediction_type = match['prediction_type']
-        odds = match['odds']
-        
-        if prediction_type in ['goals', 'corners', 'cards']:
-            return f"""
-                <div class="odd-box">{odds.get('line', 'N/A')}</div>
-                <div class="odd-box">Over {odds.get('over', 'N/A')}</div>
-                <div class="odd-box">Under {odds.get('under', 'N/A')}</div>
-            """
-        elif prediction_type == 'both_teams_to_score':
-            return f"""
-                <div class="odd-box">Yes {odds.get('yes', 'N/A')}</div>
-                <div class="odd-box">No {odds.get('no', 'N/A')}</div>
-            """
-        elif prediction_type == 'correct_score':
-            return f"""
-                <div class="odd-box">{odds.get('score', 'N/A')}</div>
-                <div class="odd-box">{odds.get('odds', 'N/A')}</div>
-            """
-        elif prediction_type == 'match_of_the_day':
-            return f"""
-                <div class="odd-box">{odds.get('1', 'N/A')}</div>
-            """
-        else:
-            # Format par défaut pour les autres types (1X2)
-            return f"""
-                <div class="odd-box">{odds.get('1', 'N/A')}</div>
-                <div class="odd-box">{odds.get('X', 'N/A')}</div>
-                <div class="odd-box">{odds.get('2', 'N/A')}</div>
-            """
+        return get_market(match.prediction_type).render_odds(match.odds, value_selections)
+
+    def save_site(self, result_data: Dict, output_dir: str = 'site') -> str:
+        """Génère la version multi-pages du site et retourne le chemin de l'index.
 
-    def save_result(self, result_data: Dict) -> str:
-        """Sauvegarde le résultat en HTML"""
-        html_content = self.generate_html(result_data)
-        filename = f"{self.filename_prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-        
+        `index.html` ne contient que l'en-tête et la navigation ; chaque type
+        de prédiction est un fragment HTML (`markets/`) chargé à la demande
+        par le script. La feuille de style, le script et les fragments ont
+        un nom contenant le hash de leur contenu (`assets/`, `markets/`) et
+        peuvent donc être mis en cache indéfiniment. Les anciennes versions
+        de ces fichiers sont supprimées.
+        """
+        root = Path(output_dir)
+        written = set()
+
+        def write_hashed(subdir: str, name: str, extension: str, content: str) -> str:
+            data = content.encode('utf-8')
+            path = root / subdir / f"{name}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}.{extension}"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if not path.exists():
+                path.write_bytes(data)
+            written.add(path)
+            return path.relative_to(root).as_posix()
+
+        reference, predictions_by_type, fixtures = self._group_matches(result_data)
+        analytics = result_data.get('analytics') or {}
+        css_href = write_hashed('assets', 'style', 'css', self.template_css + SITE_CSS + SEARCH_CSS)
+        script_src = write_hashed('assets', 'app', 'js', SITE_SCRIPT)
+        search_script_src = write_hashed('assets', 'search', 'js', SEARCH_SCRIPT)
+        search_src = write_hashed('assets', 'search', 'json', json.dumps(
+            self.search_index(predictions_by_type, fixtures), ensure_ascii=False, separators=(',', ':')
+        ))
+
+        index = [
+            PAGE_HEAD,
+            f'<link rel="stylesheet" href="{css_href}">',
+            PAGE_HEADER,
+            reference.strftime('%d/%m/%Y à %H:%M'),
+            PAGE_NAV
+        ]
+        for pred_type, info in self.prediction_types.items():
+            if pred_type in predictions_by_type:
+                fragment_src = write_hashed(
+                    'markets', pred_type, 'html',
+                    ''.join(self._section(pred_type, predictions_by_type[pred_type], analytics, fixtures))
+                )
+                index.append(SITE_NAV_BUTTON.format(
+                    pred_type=pred_type, src=fragment_src, icon=info['icon'], name=info['name']
+                ))
+        index.append(NAV_END)
+        index.append(SEARCH_BOX.format(index_src=search_src))
+        index.append(f'<script src="{search_script_src}" defer></script>')
+        index.append(SITE_END.format(script_src=script_src))
+
+        index_path = root / 'index.html'
+        with open(index_path, 'w', encoding='utf-8') as f:
+            f.writelines(index)
+
+        for subdir in ('assets', 'markets'):
+            for path in (root / subdir).iterdir():
+                if path not in written:
+                    path.unlink()
+
+        return str(index_path)
+
+    def search_filename(self, filename: str, search_dir: str = SEARCH_DIR) -> str:
+        """Index de recherche d'une page : `football_search_<date>.json` dans `search_dir`"""
+        stamp = os.path.splitext(os.path.basename(filename))[0][len(self.filename_prefix) + 1:]
+        return os.path.join(search_dir, f"{SEARCH_PREFIX}_{stamp}.json")
+
+    def save_result(self, result_data: Dict, filename: Optional[str] = None,
+                    search_dir: Optional[str] = None) -> str:
+        """Sauvegarde le résultat en HTML (nom horodaté par défaut), écrit au fil du rendu.
+
+        Avec `search_dir`, la page contient un champ de recherche et son
+        index est écrit dans ce dossier (voir `search_filename`) ; la page
+        ne le charge qu'à la première recherche. Sans lui, l'index n'est
+        pas construit.
+        """
+        # Horodatage du snapshot, pas de l'écriture : un rejeu garde la date de l'enregistrement
+        stamp = datetime.fromisoformat(result_data['metadata']['timestamp'])
+        filename = filename or f"{self.filename_prefix}_{stamp.strftime('%Y%m%d_%H%M%S')}.html"
+
+        grouped = self._group_matches(result_data)
+        search_src = None
+        if search_dir:
+            search_file = self.search_filename(filename, search_dir)
+            os.makedirs(search_dir, exist_ok=True)
+            with open(search_file, 'w', encoding='utf-8') as f:
+                json.dump(self.search_index(grouped[1], grouped[2]), f, ensure_ascii=False, separators=(',', ':'))
+            # Chemin relatif à la page, qui peut être publiée avec son dossier d'index
+            search_src = Path(os.path.relpath(search_file, os.path.dirname(filename) or '.')).as_posix()
         with open(filename, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-            
+            f.writelines(self.iter_html(result_data, search_src, grouped))
+
         return filename 
\ No newline at end of file
@@ -0,0 +1,108 @@
+import asyncio
+import re
+from typing import Dict, Optional
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+# Cellule de tableau contenant une heure de coup d'envoi (ex: "<td>01/02 12:30</td>")
+MATCH_CELL_RE = re.compile(r'<t[dh][^>]*>\s*(?:<[^>]+>\s*)*\d{1,2}/\d{1,2}\s+\d{1,2}:\d{2}\s*<', re.IGNORECASE)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                  'Chrome/116.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9,fr;q=0.8'
+}
+
+
+def html_to_markdown(html: str) -> str:
+    """Convertit les tableaux d'une page HTML au format markdown produit par crawl4ai.
+
+    Seuls les tableaux sont conservés : c'est tout ce que lit
+    `CrawlResultHandler`. Le texte de chaque cellule est concaténé sans
+    séparateur, comme le fait crawl4ai (ex: "Nottingham ForestBrighton").
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    lines = []
+    for table in soup.find_all('table'):
+        for row in table.find_all('tr'):
+            cells = row.find_all(['th', 'td'])
+            if not cells:
+                continue
+            lines.append(' | '.join(cell.get_text('', strip=True) for cell in cells))
+            if all(cell.name == 'th' for cell in cells):
+                lines.append('|'.join('---' for _ in cells))
+        lines.append('')
+    return '\n'.join(lines)
+
+
+class HttpResult:
+    """Résultat d'une page récupérée sans navigateur.
+
+    Expose les attributs de `CrawlResult` utilisés par les handlers
+    (`url`, `html`, `markdown`, `success`, `error_message`, `status_code`).
+    Le markdown n'est calculé qu'au premier accès : `CrawlResultHandler`
+    lit directement le HTML et n'en a normalement pas besoin.
+    """
+
+    def __init__(self, url: str, html: str = '', success: bool = False,
+                 error_message: Optional[str] = None, status_code: Optional[int] = None):
+        self.url = url
+        self.html = html
+        self.success = success
+        self.error_message = error_message
+        self.status_code = status_code
+        self._markdown = None
+
+    @property
+    def markdown(self) -> str:
+        if self._markdown is None:
+            self._markdown = html_to_markdown(self.html) if self.html else ''
+        return self._markdown
+
+    def has_match_rows(self) -> bool:
+        """Indique si la page contient déjà les tableaux de prédictions (rendu serveur)"""
+        return bool(MATCH_CELL_RE.search(self.html))
+
+
+class HttpFetcher:
+    """Récupère les pages rendues côté serveur avec une session aiohttp partagée.
+
+    Les connexions sont réutilisées entre les pages (keep-alive) et leur
+    nombre est plafonné par `max_connections`.
+    """
+
+    def __init__(self, max_connections: int = 8, timeout: float = 30,
+                 headers: Optional[Dict[str, str]] = None):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.headers = headers or DEFAULT_HEADERS
+        self._session = None
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers=self.headers
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def fetch(self, url: str) -> HttpResult:
+        """Télécharge une page ; les erreurs réseau sont renvoyées dans le résultat"""
+        try:
+            async with self._session.get(url) as response:
+                html = await response.text()
+                if response.status >= 400:
+                    return HttpResult(url, html, False, f"HTTP {response.status}", response.status)
+                return HttpResult(url, html, True, status_code=response.status)
+        except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeDecodeError) as e:
+            return HttpResult(url, success=False, error_message=f"{type(e).__name__}: {e}")
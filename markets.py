@@ -0,0 +1,168 @@
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from match_record import MISSING
+
+# Nature d'une colonne de cotes : cote, ligne (ex: 2.5 buts) ou sélection en texte (score, buteur...)
+PRICE, LINE, TEXT = 'price', 'line', 'text'
+
+Parts = List[str]
+InfoExtractor = Callable[[Parts], str]
+
+
+def constant(value: str) -> InfoExtractor:
+    return lambda parts: value
+
+
+def last_cell(minimum: int) -> InfoExtractor:
+    """Dernière cellule de la ligne, si la ligne en a plus de `minimum`"""
+    return lambda parts: parts[-1] if len(parts) > minimum else MISSING
+
+
+def rank() -> InfoExtractor:
+    """Rang préfixant le nom du match ("3. Arsenal...")"""
+    return lambda parts: parts[1].split('.')[0] if '.' in parts[1] else MISSING
+
+
+def pick_half(half: int) -> InfoExtractor:
+    """Mi-temps (0) ou fin de match (1) d'une sélection "1/X" en première colonne de cote"""
+    def extract(parts: Parts) -> str:
+        halves = parts[2].split('/') if len(parts) > 2 else []
+        return halves[half].strip() if len(halves) == 2 else MISSING
+    return extract
+
+
+def compile_market(market: 'Market') -> Tuple[Callable, Callable, Callable]:
+    """Fonctions d'analyse des cotes, d'analyse des informations et de rendu, spécialisées pour ce marché"""
+    positions = tuple((key, position) for position, (key, _) in enumerate(market.columns, 2))
+    if market.strict:
+        def parse_odds(parts: Parts) -> Dict[str, str]:
+            return {key: parts[position].strip() for key, position in positions}
+    else:
+        def parse_odds(parts: Parts) -> Dict[str, str]:
+            count = len(parts)
+            return {key: parts[position].strip() if position < count else MISSING for key, position in positions}
+
+    extractors = tuple(market.info.items())
+
+    def parse_info(parts: Parts) -> Dict[str, str]:
+        return {key: extract(parts) for key, extract in extractors}
+
+    # Gabarit des cases de cotes, identique pour toutes les lignes du marché
+    kinds = dict(market.columns)
+    template = '\n' + ''.join(
+        f'                <div class="{{}}">{prefix.replace("{", "{{").replace("}", "}}")}{{}}</div>\n'
+        for _, prefix in market.display
+    ) + '            '
+    # Seules les cases de cote peuvent être signalées comme value
+    boxes = tuple((key, kinds.get(key) == PRICE) for key, _ in market.display)
+
+    def render_odds(odds: Dict[str, str], value_selections=()) -> str:
+        values = []
+        for key, highlight in boxes:
+            values.append('odd-box value' if highlight and key in value_selections else 'odd-box')
+            values.append(odds.get(key, MISSING))
+        return template.format(*values)
+
+    return parse_odds, parse_info, render_odds
+
+
+class Market:
+    """Description déclarative d'un marché : colonnes, informations et affichage.
+
+    `columns` liste les cotes lues après les cellules heure et match, avec
+    leur nature. Si `strict`, une colonne manquante est une erreur ;
+    sinon elle vaut "N/A". `info` associe chaque information additionnelle
+    à son extracteur. `display` donne, case par case, la cote affichée et
+    son préfixe. L'analyse et le rendu sont compilés une fois pour toutes
+    (voir `compile_market`).
+    """
+
+    def __init__(self, key: str, label: str, icon: str, name: str, description: str,
+                 columns: Sequence[Tuple[str, str]] = (('1', PRICE), ('X', PRICE), ('2', PRICE)),
+                 strict: bool = False, info: Optional[Dict[str, InfoExtractor]] = None,
+                 display: Optional[Sequence[Tuple[str, str]]] = None, aliases: Sequence[str] = ()):
+        self.key = key
+        self.label = label
+        self.icon = icon
+        self.name = name
+        self.description = description
+        self.columns = tuple(columns)
+        self.strict = strict
+        self.info = info or {}
+        self.display = tuple(display) if display is not None else tuple((key, '') for key, _ in self.columns)
+        self.aliases = tuple(aliases)
+        # parse_odds(parts), parse_info(parts) et render_odds(odds, value_selections)
+        self.parse_odds, self.parse_info, self.render_odds = compile_market(self)
+
+    def __repr__(self) -> str:
+        return f"Market({self.key!r})"
+
+
+OVER_UNDER = ((('line', LINE), ('over', PRICE), ('under', PRICE)),
+              (('line', ''), ('over', 'Over '), ('under', 'Under ')))
+
+# Registre des marchés, dans l'ordre d'affichage de la navigation
+MARKETS: Dict[str, Market] = {market.key: market for market in (
+    Market('1x2', '1X2', '🎯', '1X2',
+           'Paris sur le résultat final du match (Victoire, Nul, Défaite)'),
+    Market('match_of_the_day', 'Match of the Day', '🌟', 'Match du Jour',
+           'Sélection premium du jour avec la meilleure analyse',
+           columns=(('1', PRICE),), strict=True, info={'confidence': constant('High')}),
+    Market('top10', 'Top 10 Predictions', '🔝', 'Top 10 Prédictions',
+           'Les 10 meilleures prédictions du jour', info={'rank': rank()}),
+    Market('accumulator_tips', 'Accumulator Tips', '💫', 'Combinés (ACCA)',
+           'Combinaisons de paris à forte valeur',
+           info={'combined_odds': last_cell(3)}, aliases=('accumulator',)),
+    Market('ht_ft_tips', 'HT/FT Tips', '⏱️', 'Mi-temps/Fin de match',
+           'Prédictions sur les scores à la mi-temps et fin de match',
+           columns=(('1', TEXT), ('X', PRICE), ('2', PRICE)),
+           info={'ht_prediction': pick_half(0), 'ft_prediction': pick_half(1)}, aliases=('ht_ft',)),
+    Market('draw_no_bet', 'Draw No Bet', '🛡️', 'Draw No Bet (DNB)',
+           'Paris avec remboursement en cas de match nul'),
+    Market('double_chance', 'Double Chance', '2️⃣', 'Double Chance',
+           'Deux résultats possibles sur trois'),
+    Market('special', 'Special Predictions', '✨', 'Prédictions Spéciales',
+           'Sélections spéciales avec analyse approfondie',
+           columns=(('1', TEXT), ('X', PRICE), ('2', PRICE))),
+    Market('goalscorer', 'Goalscorer', '⚽', 'Buteurs',
+           'Prédictions sur les buteurs du match',
+           columns=(('1', TEXT), ('X', PRICE), ('2', PRICE))),
+    Market('both_teams_to_score', 'Both Teams to Score', '🥅', 'Les Deux Équipes Marquent (BTTS)',
+           'Prédictions sur les buts des deux équipes',
+           columns=(('yes', PRICE), ('no', PRICE)), strict=True,
+           display=(('yes', 'Yes '), ('no', 'No ')), aliases=('btts',)),
+    Market('correct_score', 'Correct Score', '📊', 'Score Exact',
+           'Prédictions du score final exact',
+           columns=(('score', TEXT), ('odds', PRICE)), strict=True),
+    Market('cards', 'Cards', '🟨', 'Cartons',
+           'Prédictions sur les cartons jaunes et rouges',
+           columns=OVER_UNDER[0], strict=True, display=OVER_UNDER[1]),
+    Market('corners', 'Corners', '🚩', 'Corners',
+           'Prédictions sur le nombre de corners',
+           columns=OVER_UNDER[0], strict=True, display=OVER_UNDER[1]),
+    Market('goals', 'Goals', '⚽', 'Buts',
+           'Prédictions sur le nombre de buts',
+           columns=OVER_UNDER[0], strict=True, display=OVER_UNDER[1]),
+)}
+
+# Autres orthographes d'une clé de marché (segments d'URL, anciennes clés)
+ALIASES = {alias: market.key for market in MARKETS.values() for alias in market.aliases}
+
+def market_key(key: str) -> str:
+    """Clé canonique d'un marché ('ht-ft-tips', 'ht_ft' -> 'ht_ft_tips')"""
+    key = key.replace('-', '_')
+    return ALIASES.get(key, key)
+
+
+def get_market(key: str) -> Market:
+    key = market_key(key)
+    market = MARKETS.get(key)
+    return market if market is not None else _fallback_market(key)
+
+
+# Marchés inconnus du registre : colonnes 1/X/2, comme le 1X2.
+# Les clés viennent des pages scrapées : le cache est borné (un processus long, comme le daemon, ne grossit pas)
+@lru_cache(maxsize=64)
+def _fallback_market(key: str) -> Market:
+    return Market(key, key, '', key, '')
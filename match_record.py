@@ -0,0 +1,196 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+# Format des heures de coup d'envoi affichées par le site (ex: "01/02 12:30")
+KICKOFF_FORMAT = '%d/%m %H:%M'
+# Seules les valeurs purement numériques sont des cotes (pas "2:2", "X/X" ou un nom de joueur)
+NUMBER_RE = re.compile(r'^\d+(?:\.\d+)?$')
+MISSING = 'N/A'
+# Clés des données préparées qui ne vivent qu'en mémoire (index des rencontres) : jamais sérialisées
+IN_MEMORY_KEYS = frozenset({'fixtures'})
+
+OddsValue = Union[float, str, None]
+
+# Tuples de clés de cotes partagés entre tous les matches d'un même marché
+_ODDS_KEYS: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+# Année bissextile servant seulement à analyser "jj/mm" avant de fixer la vraie année
+_LEAP_YEAR = 2000
+
+
+def parse_kickoff(text: str, reference: datetime) -> Optional[datetime]:
+    """Convertit "jj/mm HH:MM" en datetime, l'année étant déduite de `reference`.
+
+    Un match de janvier scrapé en décembre (ou l'inverse) est placé dans
+    l'année suivante (ou précédente).
+    """
+    return _parse_kickoff(text, reference.year, reference.month)
+
+
+@lru_cache(maxsize=8192)
+def _parse_kickoff(text: str, year: int, month: int) -> Optional[datetime]:
+    # Les mêmes heures reviennent dans chaque marché et chaque snapshot : `strptime` n'est appelé qu'une fois
+    # Sans année, strptime prend 1900 et rejette le 29/02 : on analyse avec une année bissextile
+    try:
+        kickoff = datetime.strptime(f"{_LEAP_YEAR} {text}", f"%Y {KICKOFF_FORMAT}")
+    except ValueError:
+        return None
+    if kickoff.month - month > 6:
+        year -= 1
+    elif month - kickoff.month > 6:
+        year += 1
+    try:
+        return kickoff.replace(year=year)
+    except ValueError:  # 29/02 hors année bissextile
+        return None
+
+
+def split_teams(teams: str) -> Tuple[str, str]:
+    """Sépare les équipes concaténées d'une ligne markdown ("Nottingham ForestBrighton").
+
+    La seconde équipe commence à la première majuscule collée à une
+    minuscule ou à un chiffre ("Schalke 04Magdeburg"), sinon à la première
+    majuscule au-delà des trois premiers caractères ("NECPSV Eindhoven").
+    Sans séparation trouvée, la chaîne entière est l'équipe domicile.
+    Heuristique : le HTML, quand il est disponible, donne les équipes
+    séparément.
+    """
+    teams = teams.strip()
+    for i in range(3, len(teams)):
+        if teams[i].isupper() and (teams[i - 1].islower() or teams[i - 1].isdigit()):
+            return teams[:i].strip(), teams[i:].strip()
+    for i in range(3, len(teams)):
+        if teams[i].isupper():
+            return teams[:i].strip(), teams[i:].strip()
+    return teams, ''
+
+
+def _to_value(text: str) -> OddsValue:
+    if text == MISSING:
+        return None
+    return float(text) if NUMBER_RE.match(text) else text
+
+
+def _to_text(key: str, value: OddsValue) -> str:
+    """Format par défaut d'une cote, pour les valeurs sans texte d'origine"""
+    if value is None:
+        return MISSING
+    if isinstance(value, float):
+        # Le site affiche les lignes et les cotes >= 10 avec une décimale ("2.5", "15.0")
+        return f"{value:.1f}" if key == 'line' or value >= 10 else f"{value:.2f}"
+    return value
+
+
+class MatchRecord:
+    """Prédiction d'un match pour un marché, en représentation compacte.
+
+    Les cotes sont stockées en float (None pour "N/A", texte pour les
+    sélections comme "2:2" ou un nom de buteur) et le coup d'envoi en
+    datetime. Le texte d'origine des cotes est conservé dès qu'il diffère
+    du format par défaut ("2.0", "12.50", "2.425") : `to_dict()` restitue
+    le schéma JSON historique à l'identique.
+    """
+
+    __slots__ = ('league', 'kickoff', 'home_team', 'away_team', 'prediction_type',
+                 'odds_keys', 'odds_values', 'info', '_datetime_text', '_odds_texts')
+
+    def __init__(self, league: str, datetime_text: str, home_team: str, away_team: str,
+                 prediction_type: str, odds: Dict[str, str], info: Optional[Dict] = None,
+                 reference: Optional[datetime] = None):
+        self.league = league
+        self.kickoff = parse_kickoff(datetime_text, reference or datetime.now())
+        # Le texte d'origine n'est conservé que s'il ne se déduit pas du datetime
+        if self.kickoff is not None and self.kickoff.strftime(KICKOFF_FORMAT) == datetime_text:
+            self._datetime_text = None
+        else:
+            self._datetime_text = datetime_text
+        self.home_team = home_team
+        self.away_team = away_team
+        self.prediction_type = prediction_type
+        keys = tuple(odds)
+        self.odds_keys = _ODDS_KEYS.setdefault(keys, keys)
+        self.odds_values = tuple(_to_value(value) for value in odds.values())
+        # Textes d'origine, seulement si l'un d'eux ne se déduit pas de sa valeur
+        texts = tuple(odds.values())
+        if all(text == _to_text(key, value) for key, value, text in zip(keys, self.odds_values, texts)):
+            self._odds_texts = None
+        else:
+            self._odds_texts = texts
+        self.info = info or None
+
+    @classmethod
+    def from_dict(cls, match: Dict[str, Any], reference: Optional[datetime] = None) -> 'MatchRecord':
+        """Reconstruit un enregistrement à partir du schéma JSON"""
+        home, away = match.get('home_team'), match.get('away_team')
+        if not away:
+            home, away = match['teams'], ''
+        return cls(match['league'], match['datetime'], home, away, match['prediction_type'],
+                   match['odds'], match.get('additional_info'), reference)
+
+    @property
+    def datetime(self) -> str:
+        """Heure de coup d'envoi au format du site ("jj/mm HH:MM")"""
+        if self._datetime_text is not None:
+            return self._datetime_text
+        return self.kickoff.strftime(KICKOFF_FORMAT)
+
+    @property
+    def teams(self) -> str:
+        """Équipes concaténées, comme dans les tableaux du site"""
+        return self.home_team + self.away_team
+
+    @property
+    def odds(self) -> Dict[str, str]:
+        """Cotes au format texte du schéma JSON (texte d'origine)"""
+        if self._odds_texts is not None:
+            return dict(zip(self.odds_keys, self._odds_texts))
+        return {key: _to_text(key, value) for key, value in zip(self.odds_keys, self.odds_values)}
+
+    @property
+    def prices(self) -> Dict[str, float]:
+        """Cotes numériques uniquement"""
+        return {key: value for key, value in zip(self.odds_keys, self.odds_values)
+                if isinstance(value, float)}
+
+    @property
+    def additional_info(self) -> Dict:
+        return self.info or {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            'league': self.league,
+            'datetime': self.datetime,
+            'teams': self.teams,
+            'prediction_type': self.prediction_type,
+            'odds': self.odds,
+            'additional_info': self.additional_info
+        }
+        if self.away_team:
+            data['home_team'] = self.home_team
+            data['away_team'] = self.away_team
+        return data
+
+    def __repr__(self) -> str:
+        return f"MatchRecord({self.prediction_type!r}, {self.league!r}, {self.datetime!r}, {self.teams!r})"
+
+
+def as_records(matches: Iterable[Union[MatchRecord, Dict]],
+               reference: Optional[datetime] = None) -> Iterator[MatchRecord]:
+    """Convertit au besoin des matches au format JSON en `MatchRecord`"""
+    reference = reference or datetime.now()
+    for match in matches:
+        yield match if isinstance(match, MatchRecord) else MatchRecord.from_dict(match, reference)
+
+
+def serializable(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Données préparées sans leurs objets en mémoire (voir `IN_MEMORY_KEYS`), prêtes pour `json.dump`"""
+    return {key: value for key, value in data.items() if key not in IN_MEMORY_KEYS}
+
+
+def json_default(obj: Any) -> Any:
+    """Hook `default` de `json.dump` pour sérialiser les `MatchRecord`"""
+    if isinstance(obj, MatchRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
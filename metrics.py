@@ -0,0 +1,128 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+METRICS_PREFIX = 'football'
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _write_atomic(path: str, text: str):
+    """Écrit via un fichier temporaire : un lecteur ne voit jamais un fichier à moitié écrit"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class Metrics:
+    """Chronomètres et compteurs d'un passage du pipeline.
+
+    Chaque mesure porte des étiquettes (type de prédiction, statut...).
+    Les durées d'une même étape et d'un même jeu d'étiquettes sont
+    cumulées (somme, nombre, maximum) ; le tout s'exporte en JSON et au
+    format textfile de Prometheus (node_exporter).
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        # (étape, étiquettes) -> [somme, nombre, maximum]
+        self.timings: Dict[Tuple[str, Labels], List[float]] = {}
+        # (compteur, étiquettes) -> valeur
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+
+    def observe(self, stage: str, seconds: float, **labels):
+        entry = self.timings.setdefault((stage, _labels(labels)), [0.0, 0, 0.0])
+        entry[0] += seconds
+        entry[1] += 1
+        entry[2] = max(entry[2], seconds)
+
+    @contextmanager
+    def timer(self, stage: str, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def wrap(self, function: Callable, stage: str, **labels) -> Callable:
+        """Version chronométrée de `function` (par exemple pour `asyncio.to_thread`)"""
+        def timed(*args, **kwargs):
+            with self.timer(stage, **labels):
+                return function(*args, **kwargs)
+        return timed
+
+    def count(self, name: str, value: float = 1, **labels):
+        key = (name, _labels(labels))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def stage_totals(self) -> Dict[str, float]:
+        """Durée totale de chaque étape, toutes étiquettes confondues"""
+        totals: Dict[str, float] = {}
+        for (stage, _), (seconds, _, _) in self.timings.items():
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'started_at': self.started_at,
+            'duration_seconds': round(time.perf_counter() - self._start, 6),
+            'timings': [
+                {'stage': stage, 'labels': dict(labels), 'seconds': round(total, 6),
+                 'count': count, 'max_seconds': round(maximum, 6)}
+                for (stage, labels), (total, count, maximum) in self.timings.items()
+            ],
+            'counters': [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in self.counters.items()
+            ]
+        }
+
+    def to_prometheus(self) -> str:
+        lines = [
+            f"# HELP {METRICS_PREFIX}_stage_seconds Durée des étapes du pipeline",
+            f"# TYPE {METRICS_PREFIX}_stage_seconds summary"
+        ]
+        for (stage, labels), (total, count, _) in sorted(self.timings.items()):
+            label_text = _format_labels((('stage', stage),) + labels)
+            lines.append(f"{METRICS_PREFIX}_stage_seconds_sum{label_text} {total:.6f}")
+            lines.append(f"{METRICS_PREFIX}_stage_seconds_count{label_text} {count}")
+        for name in sorted({name for name, _ in self.counters}):
+            lines.append(f"# TYPE {METRICS_PREFIX}_{name}_total counter")
+            for (counter, labels), value in sorted(self.counters.items()):
+                if counter == name:
+                    lines.append(f"{METRICS_PREFIX}_{name}_total{_format_labels(labels)} {value:g}")
+        lines.append(f"# TYPE {METRICS_PREFIX}_run_timestamp_seconds gauge")
+        lines.append(f"{METRICS_PREFIX}_run_timestamp_seconds {self.started_at:.3f}")
+        lines.append(f"# TYPE {METRICS_PREFIX}_run_duration_seconds gauge")
+        lines.append(f"{METRICS_PREFIX}_run_duration_seconds {time.perf_counter() - self._start:.6f}")
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path: str) -> str:
+        _write_atomic(path, json.dumps(self.to_dict(), indent=4, ensure_ascii=False))
+        return path
+
+    def write_prometheus(self, path: str) -> str:
+        _write_atomic(path, self.to_prometheus())
+        return path
+
+    def summary(self) -> str:
+        """Résumé d'une ligne : durée de chaque étape"""
+        return ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in self.stage_totals().items())
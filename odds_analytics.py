@@ -0,0 +1,227 @@
+import argparse
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from match_record import NUMBER_RE, MatchRecord
+
+# Marchés dont toutes les issues sont cotées : (sélections du livre, nombre d'issues gagnantes)
+BOOKS = {
+    '1x2': (('1', 'X', '2'), 1),
+    'double_chance': (('1', 'X', '2'), 2),  # 1X, X2, 12 : deux sélections gagnent toujours
+    'draw_no_bet': (('1', 'X'), 1),  # domicile, extérieur (remboursé si nul)
+    'both_teams_to_score': (('yes', 'no'), 1),
+    'goals': (('over', 'under'), 1),
+    'corners': (('over', 'under'), 1),
+    'cards': (('over', 'under'), 1),
+}
+# Issues du 1X2 (domicile, nul, extérieur) couvertes par chaque sélection double chance
+DOUBLE_CHANCE = np.array([[1, 1, 0], [0, 1, 1], [1, 0, 1]], dtype=float)
+# Écart minimum entre cote proposée et cote juste pour signaler une value
+VALUE_EDGE = 0.0
+
+Row = Tuple[str, str, str, str, str, str, str, float]
+
+
+def _record_rows(records: Iterable[MatchRecord], snapshot: str) -> Iterable[Row]:
+    for record in records:
+        for selection, value in zip(record.odds_keys, record.odds_values):
+            if isinstance(value, float):
+                yield (snapshot, record.datetime, record.league, record.home_team, record.away_team,
+                       record.prediction_type, selection, value)
+
+
+def _dict_rows(matches: Iterable[Dict[str, Any]], snapshot: str) -> Iterable[Row]:
+    """Comme `_record_rows`, directement sur le schéma JSON (sans analyser les dates)"""
+    for match in matches:
+        if isinstance(match, MatchRecord):
+            yield from _record_rows((match,), snapshot)
+            continue
+        home, away = match.get('home_team'), match.get('away_team')
+        if not away:
+            home, away = match['teams'], ''
+        for selection, text in match['odds'].items():
+            if NUMBER_RE.match(text):
+                yield (snapshot, match['datetime'], match['league'], home, away,
+                       match['prediction_type'], selection, float(text))
+
+
+def factorize(keys: Iterable, count: int) -> Tuple[List, np.ndarray]:
+    """Code entier de chaque clé, par table de hachage (en O(n), sans tri de chaînes)"""
+    index: Dict[Any, int] = {}
+    codes = np.fromiter((index.setdefault(key, len(index)) for key in keys), dtype=np.intp, count=count)
+    return list(index), codes
+
+
+class OddsArrays:
+    """Cotes d'un ou plusieurs snapshots en tableaux NumPy, une ligne par cote.
+
+    Chaque ligne porte le code de son snapshot, de sa rencontre, de son
+    livre (rencontre × marché), de son marché et de sa sélection : tous les
+    calculs sont des opérations sur tableaux entiers (`bincount`,
+    indexation), sans boucle Python par match.
+    """
+
+    def __init__(self, rows: Sequence[Row]):
+        count = len(rows)
+        columns = list(zip(*rows)) or [()] * 8
+        self.price = np.array(columns[7], dtype=float)
+        markets, self.market = factorize(columns[5], count)
+        selections, self.selection = factorize(columns[6], count)
+        self.markets = np.array(markets, dtype=str)
+        self.selections = np.array(selections, dtype=str)
+        # Rencontre : snapshot, coup d'envoi, ligue, équipes ; livre : rencontre et marché
+        fixtures, self.fixture = factorize(zip(*columns[:5]), count)
+        self.fixture_count = len(fixtures)
+        self.book_keys, self.book = factorize(zip(*columns[:6]), count)
+        self.book_count = len(self.book_keys)
+        # Marché de chaque livre, lu sur sa première ligne
+        first = np.zeros(self.book_count, dtype=np.intp)
+        first[self.book[::-1]] = np.arange(count)[::-1]
+        self.book_market = self.market[first]
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    @classmethod
+    def from_records(cls, records: Iterable[MatchRecord], snapshot: str = '') -> 'OddsArrays':
+        return cls(list(_record_rows(records, snapshot)))
+
+    @classmethod
+    def from_snapshots(cls, snapshots: Iterable[Dict[str, Any]]) -> 'OddsArrays':
+        """Charge les données de `prepare_data` (ou des fichiers JSON) de plusieurs snapshots"""
+        rows = []
+        for data in snapshots:
+            rows.extend(_dict_rows(data['matches'], data['metadata']['timestamp']))
+        return cls(rows)
+
+    @classmethod
+    def from_history(cls, store, start: Optional[str] = None, end: Optional[str] = None,
+                     league: Optional[str] = None, market: Optional[str] = None) -> 'OddsArrays':
+        """Charge une période de l'historique SQLite (voir `HistoryStore.scan`)"""
+        rows = [
+            (taken_at, kickoff or '', league_name, home, away or '', market_name, selection, price)
+            for taken_at, kickoff, league_name, home, away, market_name, selection, price, _
+            in store.scan(start, end, league, market) if price is not None
+        ]
+        return cls(rows)
+
+    def _lookup(self, table: Dict[str, Dict[str, Any]], default: Any) -> np.ndarray:
+        """Valeur de `table[marché][sélection]` pour chaque ligne"""
+        values = np.full((len(self.markets), len(self.selections)), default, dtype=float)
+        for i, market in enumerate(self.markets):
+            for j, selection in enumerate(self.selections):
+                values[i, j] = table.get(market, {}).get(selection, default)
+        return values[self.market, self.selection]
+
+    def implied_probabilities(self) -> np.ndarray:
+        """Probabilité implicite de chaque cote (1 / cote)"""
+        return 1.0 / self.price
+
+    def overround(self) -> np.ndarray:
+        """Marge du bookmaker par livre (NaN si le livre est incomplet)"""
+        position = self._lookup({m: {s: i for i, s in enumerate(book)} for m, (book, _) in BOOKS.items()}, -1)
+        in_book = position >= 0
+        total = np.bincount(self.book[in_book], self.implied_probabilities()[in_book], minlength=self.book_count)
+        count = np.bincount(self.book[in_book], minlength=self.book_count)
+        sizes = np.array([len(BOOKS[m][0]) if m in BOOKS else 0 for m in self.markets])[self.book_market]
+        winners = np.array([BOOKS[m][1] if m in BOOKS else 1 for m in self.markets])[self.book_market]
+        complete = (sizes > 0) & (count == sizes)
+        return np.where(complete, total / winners - 1.0, np.nan)
+
+    def fair_probabilities(self) -> np.ndarray:
+        """Probabilités implicites sans la marge, par ligne (NaN hors livre complet)"""
+        margin = self.overround()[self.book]
+        return self.implied_probabilities() / (1.0 + margin)
+
+    def model_probabilities(self) -> np.ndarray:
+        """Probabilité de chaque sélection double chance / draw no bet déduite du 1X2 de la rencontre"""
+        fair = self.fair_probabilities()
+        outcomes = np.full((self.fixture_count, 3), np.nan)
+        rows = self.markets[self.market] == '1x2'
+        position = self._lookup({'1x2': {'1': 0, 'X': 1, '2': 2}}, -1).astype(int)
+        rows &= position >= 0
+        outcomes[self.fixture[rows], position[rows]] = fair[rows]
+
+        model = np.full(len(self), np.nan)
+        fixture_outcomes = outcomes[self.fixture]
+        dc = self._lookup({'double_chance': {'1': 0, 'X': 1, '2': 2}}, -1).astype(int)
+        rows = dc >= 0
+        model[rows] = np.einsum('ij,ij->i', fixture_outcomes[rows], DOUBLE_CHANCE[dc[rows]])
+        dnb = self._lookup({'draw_no_bet': {'1': 0, 'X': 2}}, -1).astype(int)
+        rows = dnb >= 0
+        home_away = fixture_outcomes[rows][:, 0] + fixture_outcomes[rows][:, 2]
+        model[rows] = fixture_outcomes[rows, dnb[rows]] / home_away
+        return model
+
+    def value_edges(self) -> np.ndarray:
+        """Espérance de gain d'une mise unitaire (cote × probabilité − 1) selon le 1X2"""
+        return self.price * self.model_probabilities() - 1.0
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Marge moyenne, minimum et maximum par marché"""
+        margins = self.overround()
+        summary = {}
+        counts = np.bincount(self.book_market, minlength=len(self.markets))
+        valid = ~np.isnan(margins)
+        sums = np.bincount(self.book_market[valid], margins[valid], minlength=len(self.markets))
+        priced = np.bincount(self.book_market[valid], minlength=len(self.markets))
+        for code, market in enumerate(self.markets):
+            entry = {'matches': int(counts[code])}
+            if priced[code]:
+                market_margins = margins[valid & (self.book_market == code)]
+                entry['overround'] = round(float(sums[code] / priced[code]), 4)
+                entry['overround_min'] = round(float(market_margins.min()), 4)
+                entry['overround_max'] = round(float(market_margins.max()), 4)
+            summary[str(market)] = entry
+        return summary
+
+    def value_bets(self, edge: float = VALUE_EDGE) -> List[Dict[str, Any]]:
+        """Sélections dont la cote dépasse la cote juste du 1X2, meilleure value d'abord"""
+        edges = self.value_edges()
+        model = self.model_probabilities()
+        rows = np.flatnonzero(edges > edge)
+        rows = rows[np.argsort(-edges[rows], kind='stable')]
+        bets = []
+        for row in rows:
+            _, kickoff, league, home, away, market = self.book_keys[self.book[row]]
+            bets.append({
+                'league': league, 'datetime': kickoff, 'teams': home + away,
+                'prediction_type': market, 'selection': str(self.selections[self.selection[row]]),
+                'price': float(self.price[row]), 'probability': round(float(model[row]), 4),
+                'edge': round(float(edges[row]), 4)
+            })
+        return bets
+
+
+def analyze(data: Dict[str, Any], edge: float = VALUE_EDGE) -> Dict[str, Any]:
+    """Analyse des cotes d'un snapshot, à ranger dans `data['analytics']`"""
+    arrays = OddsArrays.from_snapshots([data])
+    if not len(arrays):
+        return {'markets': {}, 'value_bets': []}
+    return {'markets': arrays.summary(), 'value_bets': arrays.value_bets(edge)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Marges et values des cotes d'un ou plusieurs snapshots")
+    parser.add_argument('paths', nargs='*', help="snapshots JSON (football_predictions_*.json)")
+    parser.add_argument('--db', help="lit l'historique SQLite au lieu de fichiers JSON")
+    parser.add_argument('--start', help="date de début incluse (AAAA-MM-JJ), avec --db")
+    parser.add_argument('--end', help="date de fin exclue (AAAA-MM-JJ), avec --db")
+    parser.add_argument('--edge', type=float, default=VALUE_EDGE,
+                        help=f"écart minimum pour signaler une value (défaut : {VALUE_EDGE})")
+    args = parser.parse_args()
+
+    if args.db:
+        from history_store import HistoryStore
+        with HistoryStore(args.db) as store:
+            arrays = OddsArrays.from_history(store, args.start, args.end)
+    else:
+        snapshots = []
+        for path in args.paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                snapshots.append(json.load(f))
+        arrays = OddsArrays.from_snapshots(snapshots)
+    print(json.dumps({'markets': arrays.summary(), 'value_bets': arrays.value_bets(args.edge)},
+                     indent=4, ensure_ascii=False))
@@ -0,0 +1,144 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import time
+from datetime import date
+from typing import Any, List, Optional, Tuple
+
+from crawl_archive import ArchivedResult, page_record, page_result
+
+PAGE_CACHE_DIR = '.page_cache'
+# Durée de validité d'une page (en secondes) : les cotes bougent dans la journée
+DEFAULT_TTL = 3 * 60 * 60
+# Taille maximum du cache sur disque ; au-delà, les pages les moins récemment lues sont supprimées
+MAX_CACHE_BYTES = 50 * 1024 * 1024
+CACHE_FILE_SUFFIX = '.json.gz'
+
+
+def today() -> str:
+    """Jour des prédictions (AAAA-MM-JJ) : les pages scrapées sont celles du jour"""
+    return date.today().isoformat()
+
+
+class PageCache:
+    """Cache disque des pages scrapées, indexé par URL et jour des prédictions.
+
+    Chaque page réussie est stockée compressée (gzip) dans son propre
+    fichier, préfixé par le jour : une page de la veille n'est jamais
+    servie et elle est supprimée au premier nettoyage. Une page plus
+    vieille que `ttl` secondes est refaite. Au-delà de `max_bytes`, les
+    pages les moins récemment lues (date de modification) sont supprimées.
+    """
+
+    def __init__(self, directory: str = PAGE_CACHE_DIR, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = MAX_CACHE_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def _path(self, url: str, day: str) -> str:
+        digest = hashlib.sha256(f"{day}|{url}".encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.directory, f"{day}_{digest}{CACHE_FILE_SUFFIX}")
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def get(self, url: str, day: Optional[str] = None) -> Optional[ArchivedResult]:
+        """Page en cache pour `url` et le jour `day` (aujourd'hui par défaut), None si absente ou expirée"""
+        path = self._path(url, day or today())
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError):
+            # Entrée illisible (écriture interrompue) : elle sera refaite
+            self._remove(path)
+            return None
+        if entry.get('url') != url or time.time() - entry['fetched_at'] > self.ttl:
+            self._remove(path)
+            return None
+        # La date de modification sert de date de dernier accès pour l'éviction
+        os.utime(path)
+        return page_result(entry['page'])
+
+    def put(self, url: str, result: Any, key: Optional[str] = None, day: Optional[str] = None) -> Optional[str]:
+        """Met en cache une page réussie ; retourne le fichier écrit"""
+        if not getattr(result, 'success', False):
+            return None
+        day = day or today()
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(url, day)
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            json.dump({'url': url, 'day': day, 'fetched_at': time.time(), 'page': page_record(key, result)},
+                      f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+        self.prune(day)
+        return path
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """(dernier accès, taille, chemin) de chaque page en cache"""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(CACHE_FILE_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def prune(self, day: Optional[str] = None) -> int:
+        """Supprime les pages des autres jours, puis les moins récemment lues au-delà de `max_bytes`"""
+        prefix = f"{day or today()}_"
+        removed = 0
+        kept = []
+        for entry in self.entries():
+            if os.path.basename(entry[2]).startswith(prefix):
+                kept.append(entry)
+            else:
+                self._remove(entry[2])
+                removed += 1
+        total = sum(size for _, size, _ in kept)
+        for _, size, path in sorted(kept):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> int:
+        entries = self.entries()
+        for _, _, path in entries:
+            self._remove(path)
+        return len(entries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cache disque des pages scrapées")
+    parser.add_argument('--dir', default=PAGE_CACHE_DIR, help=f"dossier du cache (défaut : {PAGE_CACHE_DIR})")
+    parser.add_argument('command', choices=['stats', 'prune', 'clear'],
+                        help="stats : contenu du cache ; prune : nettoyage ; clear : vide le cache")
+    args = parser.parse_args()
+
+    cache = PageCache(args.dir)
+    if args.command == 'stats':
+        entries = cache.entries()
+        days = sorted({os.path.basename(path).split('_', 1)[0] for _, _, path in entries})
+        print(f"[CACHE]... {len(entries)} page(s), {sum(size for _, size, _ in entries) / 1e6:.1f} Mo"
+              + (f", jour(s) : {', '.join(days)}" if days else ""))
+    elif args.command == 'prune':
+        print(f"[CACHE]... {cache.prune()} page(s) supprimée(s)")
+    else:
+        print(f"[CACHE]... {cache.clear()} page(s) supprimée(s)")
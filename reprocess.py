@@ -0,0 +1,231 @@
+import argparse
+import glob
+import gzip
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from build_manifest import BuildManifest, hash_bytes, hash_file
+from crawl_archive import load_archive, recorded_at
+from crawl_result_handler import CrawlResultHandler
+from html_result_handler import HtmlResultHandler
+from match_record import as_records
+from odds_analytics import analyze
+from snapshot_delta import DeltaStore
+
+OUTPUT_DIR = 'reprocessed'
+MANIFEST_NAME = 'reprocess_manifest.json'
+STAMP_FORMAT = '%Y%m%d_%H%M%S'
+JSON_SNAPSHOT_RE = re.compile(r'football_predictions_(\d{8}_\d{6})\.json$')
+# Modules dont le code détermine les sorties : toute modification rend les sorties périmées
+PIPELINE_MODULES = ('crawl_result_handler.py', 'html_result_handler.py', 'match_record.py', 'odds_analytics.py',
+                    'fixture_index.py', 'search_index.py', 'crawl_archive.py', 'markets.py', 'snapshot_delta.py',
+                    'build_manifest.py', 'reprocess.py')
+# Sources envoyées au pool en avance, par processus : borne la mémoire du processus principal
+IN_FLIGHT_PER_WORKER = 2
+
+# Handlers du processus (créés une fois par processus du pool)
+_handlers: Optional[Tuple[CrawlResultHandler, HtmlResultHandler]] = None
+
+
+def code_hash() -> str:
+    """Hash du code du pipeline"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    return hash_bytes(''.join(hash_file(os.path.join(root, name)) for name in PIPELINE_MODULES).encode('ascii'))
+
+
+def _archive_stamp(path: str) -> str:
+    # Seul l'en-tête (première ligne) est lu
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return recorded_at(json.loads(f.readline())).strftime(STAMP_FORMAT)
+
+
+def _json_stamp(path: str) -> str:
+    match = JSON_SNAPSHOT_RE.search(os.path.basename(path))
+    if match:
+        return match.group(1)
+    with open(path, 'r', encoding='utf-8') as f:
+        return datetime.fromisoformat(json.load(f)['metadata']['timestamp']).strftime(STAMP_FORMAT)
+
+
+def list_jobs(archives: Iterable[str], snapshots: Iterable[str], delta_dir: Optional[str] = None
+              ) -> List[Dict[str, Any]]:
+    """Sources à retraiter, une par sortie ; une archive l'emporte sur un snapshot de même date.
+
+    Deux archives enregistrées à la même seconde écriraient les mêmes
+    fichiers : seule la première est retenue. Seuls les noms et les dates
+    sont lus ici : chaque source (y compris un snapshot du dossier de
+    deltas, reconstruit par `DeltaStore.rebuild`) est chargée par le
+    processus qui la traite.
+    """
+    jobs, seen = [], {}
+    for path in archives:
+        stamp = _archive_stamp(path)
+        if stamp in seen:
+            print(f"[REPROCESS]... {path} ignorée : même date ({stamp}) que {seen[stamp]}")
+            continue
+        seen[stamp] = path
+        jobs.append({'kind': 'archive', 'source': path, 'stamp': stamp})
+    for path in snapshots:
+        stamp = _json_stamp(path)
+        if stamp not in seen:
+            seen[stamp] = path
+            jobs.append({'kind': 'json', 'source': path, 'stamp': stamp})
+    if delta_dir:
+        for stamp, _, _ in DeltaStore(delta_dir).files():
+            if stamp not in seen:
+                seen[stamp] = delta_dir
+                jobs.append({'kind': 'delta', 'source': delta_dir, 'stamp': stamp})
+    return jobs
+
+
+def input_hash(job: Dict[str, Any], code: str, chains: Optional[Dict[str, Dict[str, str]]] = None) -> str:
+    """Hash des entrées d'une source.
+
+    `chains` (dossier de deltas -> `DeltaStore.chain_hashes`) est complété
+    au fil des appels : chaque fichier de deltas n'est haché qu'une fois
+    par exécution.
+    """
+    if job['kind'] == 'delta':
+        # Un snapshot du dossier de deltas dépend de sa base et des deltas qui la suivent
+        chains = {} if chains is None else chains
+        if job['source'] not in chains:
+            chains[job['source']] = DeltaStore(job['source']).chain_hashes()
+        source = chains[job['source']].get(job['stamp'], '')
+    else:
+        source = hash_file(job['source'])
+    return hash_bytes(f"{code}:{job['kind']}:{source}".encode('ascii'))
+
+
+def _init_worker():
+    global _handlers
+    _handlers = (CrawlResultHandler(), HtmlResultHandler())
+
+
+def process(job: Dict[str, Any], output_dir: str) -> List[str]:
+    """Retraite une source et retourne les fichiers écrits.
+
+    Une archive de pages est analysée à nouveau (`prepare_data`) ; un
+    snapshot JSON, déjà analysé, est seulement renormalisé et ses
+    analyses de cotes recalculées. Le JSON et la page HTML sont ensuite
+    écrits sous la date de la source.
+    """
+    json_handler, html_handler = _handlers or (CrawlResultHandler(), HtmlResultHandler())
+    if job['kind'] == 'archive':
+        results, header = load_archive(job['source'])
+        data = json_handler.prepare_data(results, now=recorded_at(header))
+    else:
+        if job['kind'] == 'delta':
+            data = DeltaStore(job['source']).rebuild(job['stamp'])
+        else:
+            with open(job['source'], 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        reference = datetime.fromisoformat(data['metadata']['timestamp'])
+        data['matches'] = list(as_records(data['matches'], reference))
+        data['analytics'] = analyze(data)
+
+    base = os.path.join(output_dir, f"football_predictions_{job['stamp']}")
+    json_file = json_handler.write_json(data, f"{base}.json")
+    html_file = html_handler.save_result(data, f"{base}.html")
+    return [json_file, html_file]
+
+
+def reprocess(jobs: List[Dict[str, Any]], output_dir: str = OUTPUT_DIR, workers: int = 1,
+              force: bool = False) -> Tuple[int, int, int]:
+    """Retraite les sources sur un pool de processus ; retourne (retraitées, à jour, en échec).
+
+    Le manifeste du dossier de sortie est enregistré après chaque source :
+    une exécution interrompue reprend là où elle s'était arrêtée.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = BuildManifest(os.path.join(output_dir, MANIFEST_NAME))
+    code = code_hash()
+    done = failed = 0
+
+    # Sources à jour écartées avant de commencer : l'estimation du temps restant ne porte que sur les autres
+    chains: Dict[str, Dict[str, str]] = {}
+    todo = []
+    for job in jobs:
+        job_hash = input_hash(job, code, chains)
+        if force or not manifest.is_up_to_date(job['stamp'], job_hash):
+            todo.append((job, job_hash))
+    skipped = len(jobs) - len(todo)
+    started = time.perf_counter()
+
+    def finish(job: Dict[str, Any], job_hash: str, outputs: Optional[List[str]], error: Optional[BaseException]):
+        nonlocal done, failed
+        if error is not None:
+            failed += 1
+            print(f"[ERROR]... {job['source']} ({job['stamp']}) : {type(error).__name__}: {error}")
+            return
+        done += 1
+        manifest.record(job['stamp'], job_hash, outputs)
+        manifest.save()
+        elapsed = time.perf_counter() - started
+        remaining = len(todo) - done - failed
+        print(f"[REPROCESS]... {done + skipped + failed}/{len(jobs)} ({done / elapsed:.1f}/s, "
+              f"reste ~{remaining * elapsed / done:.0f}s) : {job['kind']} {job['stamp']} -> {outputs[1]}")
+
+    if workers <= 1:
+        _init_worker()
+        for job, job_hash in todo:
+            try:
+                outputs, error = process(job, output_dir), None
+            except Exception as e:
+                outputs, error = None, e
+            finish(job, job_hash, outputs, error)
+        return done, skipped, failed
+
+    pending = {}
+    queue = iter(todo)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        while True:
+            # Jamais plus de IN_FLIGHT_PER_WORKER sources par processus en attente
+            while len(pending) < workers * IN_FLIGHT_PER_WORKER:
+                item = next(queue, None)
+                if item is None:
+                    break
+                pending[pool.submit(process, item[0], output_dir)] = item
+            if not pending:
+                break
+            completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in completed:
+                job, job_hash = pending.pop(future)
+                error = future.exception()
+                finish(job, job_hash, None if error else future.result(), error)
+    return done, skipped, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Régénère le JSON et le HTML de tous les snapshots archivés")
+    parser.add_argument('--archives', default=None, metavar='MOTIF',
+                        help="archives de pages à réanalyser (ex: 'archives/*.jsonl.gz', voir `test.py --record`)")
+    parser.add_argument('--snapshots', default='football_predictions_*.json', metavar='MOTIF',
+                        help="snapshots JSON à régénérer (défaut : football_predictions_*.json)")
+    parser.add_argument('--delta-dir', default=None, help="régénère aussi les snapshots de ce dossier de deltas")
+    parser.add_argument('-o', '--output-dir', default=OUTPUT_DIR,
+                        help=f"dossier des fichiers régénérés (défaut : {OUTPUT_DIR})")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="processus de retraitement (défaut : nombre de cœurs)")
+    parser.add_argument('--force', action='store_true', help="régénère même les sorties à jour")
+    args = parser.parse_args()
+
+    archives = sorted(glob.glob(args.archives)) if args.archives else []
+    snapshots = sorted(path for path in glob.glob(args.snapshots)
+                       if os.path.dirname(os.path.abspath(path)) != os.path.abspath(args.output_dir))
+    start = time.perf_counter()
+    try:
+        done, skipped, failed = reprocess(list_jobs(archives, snapshots, args.delta_dir), args.output_dir,
+                                          args.workers, args.force)
+    except KeyboardInterrupt:
+        print("[REPROCESS]... Interrompu : relancer la même commande pour reprendre")
+        sys.exit(130)
+    print(f"[REPROCESS]... Terminé en {time.perf_counter() - start:.1f}s : {done} retraité(s), "
+          f"{skipped} déjà à jour, {failed} en échec")
+    if failed:
+        sys.exit(1)
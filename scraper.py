@@ -0,0 +1,344 @@
+import argparse
+import asyncio
+import random
+import time
+from crawl4ai import AsyncWebCrawler
+from crawl4ai.async_configs import BrowserConfig, CrawlerRunConfig, CacheMode
+from build_manifest import BuildManifest, hash_data
+from metrics import Metrics
+from html_result_handler import SEARCH_DIR
+from page_cache import today
+
+BASE_URL = "https://onemillionpredictions.com"
+
+# Nombre maximum de pages chargées simultanément
+MAX_CONCURRENT_PAGES = 4
+
+# Délai maximum (en secondes) d'une tentative de chargement de page
+PAGE_TIMEOUT = 90
+# Nombre de nouvelles tentatives après un échec ou un timeout
+MAX_RETRIES = 2
+# Backoff exponentiel entre deux tentatives : BACKOFF_BASE * 2^n, plafonné à BACKOFF_MAX
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 30.0
+# Budget global (en secondes) de la phase de scraping
+SCRAPE_BUDGET = 15 * 60
+
+# Backend de récupération par défaut : 'http' (aiohttp, repli sur le
+# navigateur si la page n'est pas rendue côté serveur) ou 'browser' (Chromium)
+DEFAULT_BACKEND = 'http'
+BACKENDS = ('http', 'browser')
+# Backend propre à certains types (clé de `scrape_all` -> backend), par
+# exemple les pages qui nécessitent toujours le navigateur (rendu JS) ;
+# complété en ligne de commande par `--backend TYPE=BACKEND`
+FETCH_BACKENDS = {}
+
+PREDICTION_TYPES = [
+    'match-of-the-day',
+    'top10',
+    'accumulator-tips',
+    'ht-ft-tips',
+    'draw-no-bet',
+    'double-chance',
+    'special',
+    'goalscorer',
+    'both-teams-to-score',
+    'correct-score',
+    'cards',
+    'corners',
+    'goals'
+]
+
+# Clés des pages de `scrape_all` : la page d'accueil (1X2) puis chaque type
+PAGE_KEYS = ['1x2'] + [pred_type.replace('-', '_') for pred_type in PREDICTION_TYPES]
+
+def parse_backend(text):
+    """Argument `--backend` : BACKEND pour toutes les pages, ou TYPE=BACKEND pour un seul type.
+
+    Retourne (clé de la page ou None, backend).
+    """
+    key, _, backend = text.rpartition('=')
+    key = key.replace('-', '_') or None
+    if backend not in BACKENDS or (key is not None and key not in PAGE_KEYS):
+        raise argparse.ArgumentTypeError(f"attendu BACKEND ou TYPE=BACKEND, avec BACKEND parmi {', '.join(BACKENDS)} "
+                                         f"et TYPE parmi {', '.join(PAGE_KEYS)}")
+    return key, backend
+
+def backend_options(values, default_backend=DEFAULT_BACKEND):
+    """(backend par défaut, backends par type) à partir des valeurs de `parse_backend`"""
+    backends = dict(FETCH_BACKENDS)
+    for key, backend in values:
+        if key is None:
+            default_backend = backend
+        else:
+            backends[key] = backend
+    return default_backend, backends
+
+class LazyCrawler:
+    """Démarre le navigateur (AsyncWebCrawler) à la première page qui en a besoin.
+
+    Si toutes les pages sont servies par le backend HTTP, Chromium n'est
+    jamais lancé.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._crawler = None
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._crawler is not None:
+            await self._crawler.close()
+            self._crawler = None
+
+    async def get(self):
+        async with self._lock:
+            if self._crawler is None:
+                print("[FETCH]... Démarrage du navigateur")
+                self._crawler = await AsyncWebCrawler(config=self.config).start()
+        return self._crawler
+
+def prediction_url(base_url, prediction_type):
+    return f"{base_url}/today-football-predictions/{prediction_type}/"
+
+async def scrape_homepage(crawler, base_url):
+    """Scrape la page d'accueil (prédictions 1X2)"""
+    result = await crawler.arun(
+        url=base_url,
+        config=CrawlerRunConfig(
+            word_count_threshold=10,
+            excluded_tags=['form', 'header'],
+            exclude_external_links=True,
+            process_iframes=True,
+            remove_overlay_elements=True,
+            cache_mode=CacheMode.BYPASS
+        )
+    )
+    return result
+
+async def scrape_predictions(crawler, base_url, prediction_type, verbose=False):
+    url = prediction_url(base_url, prediction_type)
+    if verbose:
+        print(f"[DEBUG] Scraping URL: {url}")
+
+    result = await crawler.arun(
+        url=url,
+        config=CrawlerRunConfig(
+            word_count_threshold=10,
+            excluded_tags=['form', 'header'],
+            exclude_external_links=True,
+            process_iframes=True,
+            remove_overlay_elements=True,
+            cache_mode=CacheMode.BYPASS,
+            launch_options={
+                'headless': True,
+                'args': ['--no-sandbox', '--disable-setuid-sandbox']
+            }
+        )
+    )
+    
+    if result.success:
+        if verbose:
+            print(f"[DEBUG] Content length: {len(result.markdown)}")
+            print(f"[DEBUG] First 200 chars: {result.markdown[:200]}")
+    else:
+        print(f"[ERROR] Failed to scrape {url}: {result.error_message}")
+    
+    return result
+
+def make_browser_config():
+    return BrowserConfig(
+        verbose=True,
+        launch_options={
+            'headless': True,
+            'args': [
+                '--no-sandbox',
+                '--disable-setuid-sandbox',
+                '--disable-dev-shm-usage',
+                '--single-process'
+            ]
+        }
+    )
+
+async def fetch_with_retry(label, fetch, semaphore, timeout=PAGE_TIMEOUT, retries=MAX_RETRIES):
+    """Exécute `fetch()` avec un délai maximum par tentative et des reprises.
+
+    Chaque tentative occupe une place du pool de pages ; l'attente entre deux
+    tentatives (backoff exponentiel avec jitter) se fait hors du pool.
+    Une exception levée par `fetch()` est traitée comme un échec de la
+    tentative. Retourne le dernier résultat obtenu, ou None si aucune
+    tentative n'a abouti à un résultat.
+    """
+    result = None
+    for attempt in range(retries + 1):
+        async with semaphore:
+            print(f"[FETCH]... Scraping {label}" + (f" (tentative {attempt + 1})" if attempt else ""))
+            try:
+                result = await asyncio.wait_for(fetch(), timeout)
+                if result.success:
+                    return result
+                error = result.error_message
+            except asyncio.TimeoutError:
+                error = f"timeout après {timeout}s"
+            except Exception as e:
+                # Erreur du navigateur ou du réseau (navigation, Playwright...) : retentée comme un échec.
+                # `CancelledError` (budget écoulé) n'hérite pas d'Exception et interrompt les reprises.
+                error = f"{type(e).__name__}: {e}"
+
+        if attempt < retries:
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+            print(f"[RETRY]... {label} : {error}, nouvelle tentative dans {delay:.1f}s")
+            await asyncio.sleep(delay)
+        else:
+            print(f"[ERROR]... Failed to scrape {label}: {error}")
+    return result
+
+async def scrape_all(browser, http, base_url, prediction_types, max_concurrency=MAX_CONCURRENT_PAGES,
+                     page_timeout=PAGE_TIMEOUT, retries=MAX_RETRIES, budget=SCRAPE_BUDGET,
+                     default_backend=DEFAULT_BACKEND, backends=FETCH_BACKENDS, verbose=False, metrics=None,
+                     cache=None, homepage=True):
+    """Scrape la page d'accueil et tous les types de prédictions en parallèle.
+
+    Chaque page est d'abord demandée en HTTP simple (`http`, un
+    `HttpFetcher`) si son backend est 'http' ; elle n'est chargée dans le
+    navigateur partagé (`browser`, un `LazyCrawler`) que si le HTML statique
+    ne contient pas les tableaux de prédictions, ou si son backend est
+    'browser'. Au plus `max_concurrency` pages sont chargées en même temps. Chaque page dispose de `page_timeout`
+    secondes par tentative et de `retries` reprises. Une fois le budget
+    global `budget` écoulé, les pages restantes sont abandonnées.
+
+    Retourne un dictionnaire type -> résultat ne contenant que les pages
+    scrapées avec succès, dans l'ordre de `prediction_types` (1X2 en premier,
+    sauf si `homepage` est faux).
+    La durée, les tentatives et la taille de chaque page sont ajoutées à
+    `metrics` (un `Metrics`) s'il est fourni.
+
+    Avec un `PageCache` (`cache`), une page déjà récupérée aujourd'hui et
+    encore valide n'est pas refaite ; chaque page réussie y est ajoutée.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    metrics = metrics or Metrics()
+    # Jour fixé au lancement : un scraping à cheval sur minuit reste cohérent
+    day = today()
+
+    def job(key, label, url, browser_fetch, *args):
+        async def fetch():
+            metrics.count('attempts', prediction_type=key)
+            if backends.get(key, default_backend) == 'http':
+                result = await http.fetch(url)
+                if result.success and result.has_match_rows():
+                    return result
+                reason = result.error_message if not result.success else "pas de tableau dans le HTML statique"
+                print(f"[FETCH]... {label} : {reason}, repli sur le navigateur")
+                metrics.count('browser_fallbacks', prediction_type=key)
+            return await browser_fetch(await browser.get(), base_url, *args)
+
+        async def timed_fetch():
+            if cache is not None:
+                cached = await asyncio.to_thread(cache.get, url, day)
+                if cached is not None:
+                    print(f"[CACHE]... {label} servi depuis le cache")
+                    metrics.count('pages', prediction_type=key, status='cached')
+                    return cached
+            start = time.perf_counter()
+            try:
+                result = await fetch_with_retry(label, fetch, semaphore, page_timeout, retries)
+            finally:
+                metrics.observe('fetch', time.perf_counter() - start, prediction_type=key)
+            success = result is not None and result.success
+            metrics.count('pages', prediction_type=key, status='success' if success else 'failure')
+            if success:
+                # Octets UTF-8 et non caractères : les pages contiennent des accents et des symboles
+                text = result.html or str(result.markdown or '')
+                metrics.count('bytes', len(text.encode('utf-8')), prediction_type=key)
+                if cache is not None:
+                    await asyncio.to_thread(cache.put, url, result, key, day)
+            return result
+
+        return asyncio.create_task(timed_fetch())
+
+    jobs = {'1x2': job('1x2', 'homepage (1X2)', base_url, scrape_homepage)} if homepage else {}
+    for pred_type in prediction_types:
+        key = pred_type.replace('-', '_')
+        jobs[key] = job(key, pred_type, prediction_url(base_url, pred_type), scrape_predictions, pred_type, verbose)
+
+    _, pending = await asyncio.wait(jobs.values(), timeout=budget)
+    if pending:
+        print(f"[ERROR]... Budget de {budget}s écoulé, {len(pending)} page(s) abandonnée(s)")
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    results = {}
+    for key, task in jobs.items():
+        if task.cancelled():
+            continue
+        if task.exception() is not None:
+            print(f"[ERROR]... Failed to scrape {key}: {task.exception()}")
+            continue
+        result = task.result()
+        if result is not None and result.success:
+            results[key] = result
+    return results
+
+async def save_outputs(result_data, json_handler, html_handler, metrics, site_dir=None, fixtures=False,
+                       history_db=None, delta_dir=None, search=False):
+    """Écrit le snapshot préparé (JSON ou delta, HTML, index, site) et l'historique.
+
+    Avec `search`, la page HTML a un champ de recherche et son index est
+    écrit dans `SEARCH_DIR`.
+
+    Retourne les fichiers écrits, ou None si les prédictions sont
+    identiques au dernier snapshot (voir `BuildManifest`).
+    """
+    # L'historique reçoit chaque scraping, même identique au précédent
+    if history_db:
+        await asyncio.to_thread(metrics.wrap(json_handler.write_history, 'write', output='history'),
+                                result_data, history_db)
+        print(f"[SAVE HISTORY]... ✓ Snapshot ajouté à {history_db}")
+
+    # Ne rien réécrire si les prédictions sont identiques au dernier snapshot
+    manifest = BuildManifest()
+    input_hash = hash_data({'matches': result_data['matches'], 'site_dir': site_dir, 'fixtures': fixtures,
+                            'delta_dir': delta_dir, 'search': search})
+    if manifest.is_up_to_date('snapshot', input_hash):
+        print(f"[SKIP]... Prédictions inchangées, snapshot conservé : {', '.join(manifest.outputs('snapshot'))}")
+        return None
+
+    # Écrire le JSON et le HTML en parallèle à partir des mêmes données
+    # En mode delta, seuls les changements depuis le dernier snapshot sont écrits
+    writes = [
+        asyncio.to_thread(metrics.wrap(json_handler.write_delta, 'write', output='delta'), result_data, delta_dir)
+        if delta_dir else asyncio.to_thread(metrics.wrap(json_handler.write_json, 'write', output='json'), result_data),
+        asyncio.to_thread(metrics.wrap(html_handler.save_result, 'write', output='html'), result_data, None,
+                          SEARCH_DIR if search else None)
+    ]
+    if fixtures:
+        writes.append(asyncio.to_thread(metrics.wrap(json_handler.write_fixtures, 'write', output='fixtures'),
+                                        result_data))
+    if site_dir:
+        writes.append(asyncio.to_thread(metrics.wrap(html_handler.save_site, 'write', output='site'),
+                                        result_data, site_dir))
+    json_file, html_file, *extra = await asyncio.gather(*writes)
+    if json_file:
+        print(f"[SAVE JSON]... ✓ Résultats sauvegardés dans {json_file}")
+    else:
+        print(f"[SAVE JSON]... Aucune cote modifiée depuis le dernier snapshot de {delta_dir}/")
+    print(f"[SAVE HTML]... ✓ Page HTML générée dans {html_file}")
+    outputs = [json_file, html_file] if json_file else [html_file]
+    if search:
+        outputs.append(html_handler.search_filename(html_file))
+    if fixtures:
+        fixtures_file = extra.pop(0)
+        outputs.append(fixtures_file)
+        print(f"[SAVE JSON]... ✓ Index des rencontres sauvegardé dans {fixtures_file}")
+    if site_dir:
+        outputs.append(site_dir)
+        print(f"[SAVE SITE]... ✓ Site multi-pages généré dans {extra.pop(0)}")
+
+    manifest.record('snapshot', input_hash, outputs)
+    manifest.save()
+    return outputs
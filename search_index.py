@@ -0,0 +1,62 @@
+import re
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fixture_index import FixtureIndex
+
+SEARCH_INDEX_VERSION = 1
+# Mots recherchables : lettres et chiffres, les dates ("01/02", "2025-02-01") restant d'un seul tenant.
+# Le script de recherche (`SEARCH_SCRIPT`) découpe la saisie avec la même expression.
+TOKEN_RE = re.compile(r'[a-z0-9]+(?:[/-][0-9]+)*')
+
+
+def normalize(text: str) -> str:
+    """Minuscules sans accents, comme `normalize` côté navigateur"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokens(text: str) -> List[str]:
+    return TOKEN_RE.findall(normalize(text))
+
+
+def build_search_index(fixtures: FixtureIndex, markets: Sequence[str],
+                       split_teams: Optional[Callable[[str], Tuple[str, str]]] = None) -> Dict[str, Any]:
+    """Index inversé compact : mot (équipe, ligue, date) -> identifiants de rencontres.
+
+    Les identifiants sont ceux de `fixtures` (attribut `data-fixture` des
+    lignes de la page). Les mots sont triés pour une recherche par préfixe
+    (dichotomie) dans le navigateur ; chaque rencontre est décrite une
+    seule fois, avec les marchés où elle apparaît (indices de `markets`).
+    `split_teams` sépare les équipes concaténées des pages lues en markdown.
+    """
+    market_ids = {market: i for i, market in enumerate(markets)}
+    league_ids: Dict[str, int] = {}
+    postings: Dict[str, List[int]] = {}
+    entries = []
+    for fixture in fixtures.fixtures:
+        home, away = fixture.home_team, fixture.away_team
+        if not away and split_teams is not None:
+            home, away = split_teams(home)
+        record = next(iter(fixture.markets.values()))
+        league = league_ids.setdefault(fixture.league, len(league_ids))
+        entries.append([
+            league, record.datetime, home, away,
+            sorted(market_ids[market] for market in fixture.markets if market in market_ids)
+        ])
+
+        words = tokens(home) + tokens(away) + tokens(fixture.league) + tokens(record.datetime.split(' ')[0])
+        if fixture.date:
+            words.append(fixture.date.isoformat())
+        for word in set(words):
+            postings.setdefault(word, []).append(fixture.id)
+
+    terms = sorted(postings)
+    return {
+        'version': SEARCH_INDEX_VERSION,
+        'markets': list(markets),
+        'leagues': list(league_ids),
+        'fixtures': entries,
+        'terms': terms,
+        'postings': [postings[term] for term in terms]
+    }
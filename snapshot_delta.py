@@ -0,0 +1,267 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from build_manifest import hash_file
+from match_record import MatchRecord
+
+DELTA_DIR = 'snapshots'
+SNAPSHOT_FILE_RE = re.compile(r'^(base|delta)_(\d{8}_\d{6})\.json$')
+STAMP_FORMAT = '%Y%m%d_%H%M%S'
+# Un delta plus gros que cette fraction de sa base est remplacé par une nouvelle base
+REBASE_RATIO = 0.5
+# Nombre maximum de deltas à rejouer pour reconstruire un snapshot
+MAX_CHAIN = 100
+
+
+def match_key(match: Dict[str, Any]) -> str:
+    """Identifiant d'une prédiction : marché, ligue, coup d'envoi et équipes"""
+    return '|'.join((match['prediction_type'], match['league'], match['datetime'], match['teams']))
+
+
+def _as_dicts(matches: Iterable) -> List[Dict[str, Any]]:
+    return [match.to_dict() if isinstance(match, MatchRecord) else match for match in matches]
+
+
+def diff(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Différence entre deux snapshots au format de `prepare_data`.
+
+    Seuls les matches ajoutés (avec leur position), retirés et ceux dont
+    les cotes ou les informations ont changé sont enregistrés.
+    """
+    old_matches = {match_key(match): match for match in _as_dicts(old['matches'])}
+    new_matches = _as_dicts(new['matches'])
+    added, changed = [], {}
+    for position, match in enumerate(new_matches):
+        key = match_key(match)
+        previous = old_matches.pop(key, None)
+        if previous is None:
+            added.append([position, match])
+            continue
+        change = {}
+        if match['odds'] != previous['odds']:
+            change['odds'] = match['odds']
+        if match['additional_info'] != previous['additional_info']:
+            change['additional_info'] = match['additional_info']
+        if change:
+            changed[key] = change
+    return {
+        'timestamp': new['metadata']['timestamp'],
+        'previous': old['metadata']['timestamp'],
+        'url': new.get('url'),
+        'metadata': new['metadata'],
+        'added': added,
+        'removed': list(old_matches),
+        'changed': changed
+    }
+
+
+def apply(data: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Applique un delta à un snapshot et retourne le snapshot suivant"""
+    removed = set(delta['removed'])
+    matches = []
+    for match in _as_dicts(data['matches']):
+        key = match_key(match)
+        if key in removed:
+            continue
+        change = delta['changed'].get(key)
+        if change:
+            match = {**match, **change}
+        matches.append(match)
+    for position, match in delta['added']:
+        matches.insert(position, match)
+    return {'url': delta.get('url', data.get('url')), 'matches': matches, 'metadata': delta['metadata']}
+
+
+def _stamp(data: Dict[str, Any]) -> str:
+    return datetime.fromisoformat(data['metadata']['timestamp']).strftime(STAMP_FORMAT)
+
+
+def _dump(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+class DeltaStore:
+    """Snapshots stockés sous forme d'une base complète suivie de deltas.
+
+    Chaque scraping n'écrit que les changements depuis le snapshot
+    précédent (`delta_<date>.json`) ; une nouvelle base (`base_<date>.json`)
+    est écrite quand le delta devient trop gros ou la chaîne trop longue.
+    N'importe quel snapshot se reconstruit en rejouant les deltas sur la
+    base qui le précède.
+    """
+
+    def __init__(self, directory: str = DELTA_DIR):
+        self.directory = directory
+
+    def files(self) -> List[Tuple[str, str, str]]:
+        """(horodatage, genre, chemin) de tous les fichiers, du plus ancien au plus récent"""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            match = SNAPSHOT_FILE_RE.match(name)
+            if match:
+                entries.append((match.group(2), match.group(1), os.path.join(self.directory, name)))
+        # À horodatage égal, la base passe avant le delta
+        return sorted(entries)
+
+    def _load(self, path: str) -> Dict[str, Any]:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def chain(self, stamp: Optional[str] = None) -> List[Tuple[str, str, str]]:
+        """Fichiers dont dépend le snapshot `stamp` (le plus récent par défaut).
+
+        Dernière base antérieure à `stamp` et deltas qui la suivent jusqu'à
+        `stamp`, sous la forme (horodatage, genre, chemin).
+        """
+        files = [entry for entry in self.files() if stamp is None or entry[0] <= stamp]
+        bases = [i for i, (_, kind, _) in enumerate(files) if kind == 'base']
+        return files[bases[-1]:] if bases else []
+
+    def chain_hashes(self) -> Dict[str, str]:
+        """Empreinte de la chaîne (voir `chain`) de chaque snapshot, par horodatage.
+
+        Calculée en un seul passage : chaque fichier n'est haché qu'une
+        fois et l'empreinte d'un snapshot prolonge celle du précédent,
+        jusqu'à la base suivante.
+        """
+        hashes: Dict[str, str] = {}
+        digest = None
+        for stamp, kind, path in self.files():
+            if kind == 'base':
+                digest = hashlib.sha256()
+            if digest is None:
+                continue  # delta antérieur à la première base : pas de chaîne
+            digest.update(hash_file(path).encode('ascii'))
+            hashes[stamp] = digest.copy().hexdigest()
+        return hashes
+
+    def rebuild(self, stamp: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Reconstruit le snapshot à la date `stamp` (AAAAMMJJ_HHMMSS), le plus récent par défaut"""
+        chain = self.chain(stamp)
+        if not chain:
+            return None
+        data = self._load(chain[0][2])
+        for _, _, path in chain[1:]:
+            data = apply(data, self._load(path))
+        return data
+
+    def iter_snapshots(self) -> Iterator[Dict[str, Any]]:
+        """Tous les snapshots reconstruits, du plus ancien au plus récent"""
+        data = None
+        for _, kind, path in self.files():
+            content = self._load(path)
+            if kind == 'base':
+                data = content
+            elif data is not None:
+                data = apply(data, content)
+            else:
+                continue
+            yield data
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        return self.rebuild()
+
+    def save(self, data: Dict[str, Any]) -> Optional[str]:
+        """Enregistre un nouveau snapshot ; retourne le fichier écrit, ou None si rien n'a changé"""
+        os.makedirs(self.directory, exist_ok=True)
+        chain = self.chain()
+        stamp = _stamp(data)
+        full = {'url': data.get('url'), 'matches': _as_dicts(data['matches']), 'metadata': data['metadata']}
+        if chain:
+            previous = self.rebuild()
+            delta = diff(previous, full)
+            if not (delta['added'] or delta['removed'] or delta['changed']):
+                return None
+            text = _dump(delta)
+            base_size = os.path.getsize(chain[0][2])
+            # Le delta doit redonner exactement le snapshot (ordre compris), sinon nouvelle base
+            if (len(chain) <= MAX_CHAIN and len(text) <= base_size * REBASE_RATIO
+                    and apply(previous, delta)['matches'] == full['matches']):
+                return self._write(f"delta_{stamp}.json", text)
+        return self._write(f"base_{stamp}.json", _dump(full))
+
+    def _write(self, name: str, text: str) -> str:
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def timeline(self, key: str) -> Iterator[Tuple[str, Dict[str, str]]]:
+        """Évolution des cotes d'une prédiction (clé de `match_key`) : (horodatage, cotes)"""
+        odds = None
+        for _, kind, path in self.files():
+            content = self._load(path)
+            if kind == 'base':
+                current = next((match['odds'] for match in content['matches'] if match_key(match) == key), None)
+                timestamp = content['metadata']['timestamp']
+            else:
+                timestamp = content['timestamp']
+                current = odds
+                if key in content['removed']:
+                    current = None
+                change = content['changed'].get(key)
+                if change and 'odds' in change:
+                    current = change['odds']
+                for _, match in content['added']:
+                    if match_key(match) == key:
+                        current = match['odds']
+            if current is not None and current != odds:
+                yield timestamp, current
+            odds = current
+
+    def import_json(self, paths: Iterable[str]) -> int:
+        """Convertit des snapshots JSON complets en base + deltas ; retourne le nombre de fichiers écrits"""
+        snapshots = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                snapshots.append(json.load(f))
+        written = 0
+        known = {stamp for stamp, _, _ in self.files()}
+        for data in sorted(snapshots, key=lambda snapshot: snapshot['metadata']['timestamp']):
+            if _stamp(data) in known:
+                continue
+            path = self.save(data)
+            if path:
+                written += 1
+                print(f"[DELTA]... ✓ {path} écrit")
+        return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshots des prédictions en base + deltas")
+    parser.add_argument('--dir', default=DELTA_DIR, help=f"dossier des snapshots (défaut : {DELTA_DIR})")
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_cmd = commands.add_parser('import', help="convertit des snapshots JSON complets")
+    import_cmd.add_argument('pattern', nargs='?', default='football_predictions_*.json')
+    rebuild_cmd = commands.add_parser('rebuild', help="reconstruit un snapshot complet")
+    rebuild_cmd.add_argument('stamp', nargs='?', help="date du snapshot (AAAAMMJJ_HHMMSS), le dernier par défaut")
+    rebuild_cmd.add_argument('-o', '--output', help="fichier JSON de sortie (sortie standard par défaut)")
+    timeline_cmd = commands.add_parser('timeline', help="évolution des cotes d'une prédiction")
+    timeline_cmd.add_argument('key', help="marché|ligue|jj/mm HH:MM|équipes")
+    args = parser.parse_args()
+
+    store = DeltaStore(args.dir)
+    if args.command == 'import':
+        written = store.import_json(sorted(glob.glob(args.pattern)))
+        print(f"[DELTA]... {written} fichier(s) écrit(s) dans {args.dir}/")
+    elif args.command == 'rebuild':
+        data = store.rebuild(args.stamp)
+        if data is None:
+            parser.error(f"aucun snapshot dans {args.dir}/")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4, ensure_ascii=False)
+            print(f"[SAVE JSON]... ✓ Snapshot reconstruit dans {args.output}")
+        else:
+            print(json.dumps(data, indent=4, ensure_ascii=False))
+    else:
+        for timestamp, odds in store.timeline(args.key):
+            print(f"{timestamp} | {' '.join(f'{k}={v}' for k, v in odds.items())}")
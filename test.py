@@ -1,114 +1,149 @@
+import argparse
 import asyncio
-from crawl4ai import AsyncWebCrawler
-from crawl4ai.async_configs import BrowserConfig, CrawlerRunConfig, CacheMode
 from crawl_result_handler import CrawlResultHandler
-from html_result_handler import HtmlResultHandler
-import json
+from html_result_handler import SEARCH_DIR, HtmlResultHandler
+from http_fetcher import HttpFetcher
+from crawl_archive import load_archive, recorded_at, save_archive
+from metrics import Metrics
+from page_cache import DEFAULT_TTL, PAGE_CACHE_DIR, PageCache
+from scraper import (BASE_URL, DEFAULT_BACKEND, FETCH_BACKENDS, MAX_CONCURRENT_PAGES, MAX_RETRIES, PAGE_TIMEOUT,
+                     PREDICTION_TYPES, SCRAPE_BUDGET, LazyCrawler, backend_options, make_browser_config,
+                     parse_backend, save_outputs, scrape_all)
 
-async def scrape_predictions(crawler, base_url, prediction_type):
-    url = f"{base_url}/today-football-predictions/{prediction_type}/"
-    print(f"[DEBUG] Scraping URL: {url}")
-    
-    result = await crawler.arun(
-        url=url,
-        config=CrawlerRunConfig(
-            word_count_threshold=10,
-            excluded_tags=['form', 'header'],
-            exclude_external_links=True,
-            process_iframes=True,
-            remove_overlay_elements=True,
-            cache_mode=CacheMode.ENABLED,
-            launch_options={
-                'headless': True,
-                'args': ['--no-sandbox', '--disable-setuid-sandbox']
-            }
-        )
-    )
-    
-    if result.success:
-        print(f"[DEBUG] Content length: {len(result.markdown)}")
-        print(f"[DEBUG] First 200 chars: {result.markdown[:200]}")
-    else:
-        print(f"[ERROR] Failed to scrape {url}: {result.error_message}")
-    
-    return result
+async def main(max_concurrency=MAX_CONCURRENT_PAGES, page_timeout=PAGE_TIMEOUT,
+               retries=MAX_RETRIES, budget=SCRAPE_BUDGET, default_backend=DEFAULT_BACKEND,
+               parse_workers=1, site_dir=None, fixtures=False, history_db=None,
+               delta_dir=None, record=None, replay=None, verbose=False,
+               metrics_file=None, prometheus_file=None, cache_dir=PAGE_CACHE_DIR, cache_ttl=DEFAULT_TTL,
+               search=False, backends=FETCH_BACKENDS):
+    metrics = Metrics()
+    try:
+        json_handler = CrawlResultHandler(verbose, metrics)
+        html_handler = HtmlResultHandler(verbose, metrics)
 
-async def main():
-    browser_config = BrowserConfig(
-        verbose=True,
-        launch_options={
-            'headless': True,
-            'args': [
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-                '--single-process'
-            ]
-        }
-    )
-    json_handler = CrawlResultHandler()
-    html_handler = HtmlResultHandler()
-
-    base_url = "https://onemillionpredictions.com"
-    results = {}
-
-    async with AsyncWebCrawler(config=browser_config) as crawler:
-        # D'abord scraper la page d'accueil pour les prédictions 1X2
-        print(f"[FETCH]... Scraping homepage (1X2)")
-        home_result = await crawler.arun(
-            url=base_url,
-            config=CrawlerRunConfig(
-                word_count_threshold=10,
-                excluded_tags=['form', 'header'],
-                exclude_external_links=True,
-                process_iframes=True,
-                remove_overlay_elements=True,
-                cache_mode=CacheMode.ENABLED
-            )
-        )
-        if home_result.success:
-            results['1x2'] = home_result
+        now = None
+        if replay:
+            # Rejeu d'une archive : ni réseau ni navigateur
+            with metrics.timer('replay'):
+                results, header = await asyncio.to_thread(load_archive, replay)
+            now = recorded_at(header)
+            print(f"[REPLAY]... {len(results)} page(s) relue(s) depuis {replay}")
         else:
-            print(f"[ERROR]... Failed to scrape homepage: {home_result.error_message}")
-
-        # Ensuite scraper les autres types de prédictions
-        prediction_types = [
-            'match-of-the-day',
-            'top10',
-            'accumulator-tips',
-            'ht-ft-tips',
-            'draw-no-bet',
-            'double-chance',
-            'special',
-            'goalscorer',
-            'both-teams-to-score',
-            'correct-score',
-            'cards',
-            'corners',
-            'goals'
-        ]
-
-        for pred_type in prediction_types:
-            print(f"[FETCH]... Scraping {pred_type}")
-            result = await scrape_predictions(crawler, base_url, pred_type)
-            if result.success:
-                results[pred_type.replace('-', '_')] = result
-            else:
-                print(f"[ERROR]... Failed to scrape {pred_type}: {result.error_message}")
+            browser_config = make_browser_config()
+            # Cache des pages du jour ; désactivé si `cache_dir` est None
+            cache = PageCache(cache_dir, cache_ttl) if cache_dir else None
+            async with LazyCrawler(browser_config) as browser, HttpFetcher(max_connections=max_concurrency) as http:
+                with metrics.timer('scrape'):
+                    results = await scrape_all(
+                        browser, http, BASE_URL, PREDICTION_TYPES, max_concurrency, page_timeout, retries, budget,
+                        default_backend, backends, verbose=verbose, metrics=metrics, cache=cache
+                    )
+            if record and results:
+                await asyncio.to_thread(save_archive, results, record, BASE_URL)
+                print(f"[RECORD]... ✓ {len(results)} page(s) enregistrée(s) dans {record}")
 
         # Sauvegarder toutes les données
         if results:
-            # Sauvegarder en JSON
-            json_file = json_handler.save_result(results)
-            print(f"[SAVE JSON]... ✓ Résultats sauvegardés dans {json_file}")
+            with metrics.timer('prepare'):
+                result_data = json_handler.prepare_data(results, parse_workers, now=now)
 
-            # Charger les données JSON pour la conversion en HTML
-            with open(json_file, 'r', encoding='utf-8') as f:
-                result_data = json.load(f)
+            await save_outputs(result_data, json_handler, html_handler, metrics, site_dir, fixtures,
+                               history_db, delta_dir, search)
+    finally:
+        # Les mesures sont exportées même si le snapshot est inchangé ou si une étape échoue
+        print(f"[METRICS]... {metrics.summary()}")
+        if metrics_file:
+            metrics.write_json(metrics_file)
+        if prometheus_file:
+            metrics.write_prometheus(prometheus_file)
 
-            # Sauvegarder en HTML
-            html_file = html_handler.save_result(result_data)
-            print(f"[SAVE HTML]... ✓ Page HTML générée dans {html_file}")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scrape les prédictions football du jour")
+    parser.add_argument(
+        '--concurrency', type=int, default=MAX_CONCURRENT_PAGES,
+        help=f"nombre maximum de pages chargées en parallèle (défaut : {MAX_CONCURRENT_PAGES})"
+    )
+    parser.add_argument(
+        '--page-timeout', type=float, default=PAGE_TIMEOUT,
+        help=f"délai maximum d'une tentative par page, en secondes (défaut : {PAGE_TIMEOUT})"
+    )
+    parser.add_argument(
+        '--retries', type=int, default=MAX_RETRIES,
+        help=f"nombre de nouvelles tentatives par page (défaut : {MAX_RETRIES})"
+    )
+    parser.add_argument(
+        '--budget', type=float, default=SCRAPE_BUDGET,
+        help=f"budget global du scraping, en secondes (défaut : {SCRAPE_BUDGET})"
+    )
+    parser.add_argument(
+        '--backend', type=parse_backend, action='append', default=[], metavar='[TYPE=]BACKEND',
+        help=f"backend de récupération : BACKEND pour toutes les pages (défaut : {DEFAULT_BACKEND}) "
+             f"ou TYPE=BACKEND pour un seul type (ex: goalscorer=browser), répétable"
+    )
+    parser.add_argument(
+        '--parse-workers', type=int, default=1,
+        help="nombre de processus pour analyser les pages (défaut : 1, analyse séquentielle)"
+    )
+    parser.add_argument(
+        '--site-dir', default=None,
+        help="génère aussi la version multi-pages du site dans ce dossier"
+    )
+    parser.add_argument(
+        '--fixtures', action='store_true',
+        help="écrit aussi le snapshot normalisé par rencontre (football_fixtures_*.json)"
+    )
+    parser.add_argument(
+        '--search', action='store_true',
+        help=f"ajoute un champ de recherche à la page HTML (index écrit dans {SEARCH_DIR}/)"
+    )
+    parser.add_argument(
+        '--history-db', default=None,
+        help="ajoute aussi le snapshot à cet historique SQLite (voir history_store.py)"
+    )
+    parser.add_argument(
+        '--delta-dir', default=None,
+        help="n'écrit que les changements depuis le dernier snapshot de ce dossier (voir snapshot_delta.py) "
+             "au lieu d'un JSON complet"
+    )
+    parser.add_argument(
+        '--verbose', action='store_true',
+        help="affiche les messages de débogage (pages, lignes analysées)"
+    )
+    parser.add_argument(
+        '--metrics', default=None, metavar='FILE',
+        help="écrit les durées et compteurs de chaque étape dans ce fichier JSON"
+    )
+    parser.add_argument(
+        '--prometheus', default=None, metavar='FILE',
+        help="écrit les mêmes mesures au format textfile de Prometheus (.prom)"
+    )
+    parser.add_argument(
+        '--cache-dir', default=PAGE_CACHE_DIR,
+        help=f"dossier du cache des pages du jour (défaut : {PAGE_CACHE_DIR})"
+    )
+    parser.add_argument(
+        '--cache-ttl', type=float, default=DEFAULT_TTL,
+        help=f"durée de validité d'une page en cache, en secondes (défaut : {DEFAULT_TTL})"
+    )
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help="récupère toutes les pages sans passer par le cache"
+    )
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument(
+        '--record', default=None, metavar='ARCHIVE',
+        help="enregistre aussi les pages scrapées dans cette archive (.jsonl.gz)"
+    )
+    source.add_argument(
+        '--replay', default=None, metavar='ARCHIVE',
+        help="rejoue une archive enregistrée avec --record au lieu de scraper (ni réseau, ni navigateur)"
+    )
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    args = parse_args()
+    default_backend, backends = backend_options(args.backend)
+    asyncio.run(main(args.concurrency, args.page_timeout, args.retries, args.budget, default_backend,
+                     args.parse_workers, args.site_dir, args.fixtures, args.history_db,
+                     args.delta_dir, args.record, args.replay, args.verbose, args.metrics, args.prometheus,
+                     None if args.no_cache else args.cache_dir, args.cache_ttl, args.search, backends))
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from crawl_result_handler import CrawlResultHandler
+
+REFERENCE = datetime(2025, 2, 1)
+
+# En-tête de colonnes en cellules <td> dans le corps du tableau, entre chaque ligue (ligne `colspan`) et ses matches
+TD_HEADER_TABLE = """
+<table><tbody>
+<tr class="league"><td colspan="2">England - Premier League</td><td>1</td><td>X</td><td>2</td></tr>
+<tr><td>Kick Off</td><td>Match</td><td>1</td><td>X</td><td>2</td></tr>
+<tr><td>01/02 12:30</td><td><span>Nottingham Forest</span><span>Brighton</span></td>
+    <td>2.10</td><td>3.40</td><td>3.50</td></tr>
+<tr><td colspan="2">France - Ligue 1</td><td>1</td><td>X</td><td>2</td></tr>
+<tr><td>Kick Off</td><td>Match</td><td>1</td><td>X</td><td>2</td></tr>
+<tr><td>01/02 21:00</td><td><span>Lille</span><span>Nantes</span></td>
+    <td>1.60</td><td>4.00</td><td>5.50</td></tr>
+</tbody></table>
+"""
+
+# Ligues en cellules <th>, comme l'implique le markdown de crawl4ai (ligne d'en-tête puis séparateur)
+TH_LEAGUE_TABLE = """
+<table>
+<thead><tr><th>Kick Off</th><th>Match</th><th>1</th><th>X</th><th>2</th></tr></thead>
+<tbody>
+<tr><th>England - Premier League</th><th>1</th><th>X</th><th>2</th></tr>
+<tr><td>01/02 12:30</td><td><span>Nottingham Forest</span><span>Brighton</span></td>
+    <td>2.10</td><td>3.40</td><td>3.50</td></tr>
+<tr><th>Spain - LaLiga2</th><th>1</th><th>X</th><th>2</th></tr>
+<tr><td>01/02 18:00</td><td><span>Racing Santander</span><span>Eibar</span></td>
+    <td>1.90</td><td>3.20</td><td>4.10</td></tr>
+</tbody></table>
+"""
+
+
+def _parse(html):
+    return list(CrawlResultHandler()._iter_matches_html(html, '1x2', REFERENCE))
+
+
+def test_td_header_rows_are_not_leagues():
+    matches = _parse(TD_HEADER_TABLE)
+    assert [(m.league, m.home_team, m.away_team) for m in matches] == [
+        ('England - Premier League', 'Nottingham Forest', 'Brighton'),
+        ('France - Ligue 1', 'Lille', 'Nantes'),
+    ]
+    assert matches[0].odds == {'1': '2.10', 'X': '3.40', '2': '3.50'}
+
+
+def test_th_league_rows_are_leagues():
+    matches = _parse(TH_LEAGUE_TABLE)
+    assert [(m.league, m.home_team, m.away_team) for m in matches] == [
+        ('England - Premier League', 'Nottingham Forest', 'Brighton'),
+        ('Spain - LaLiga2', 'Racing Santander', 'Eibar'),
+    ]